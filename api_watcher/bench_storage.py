@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Benchmark for snapshot storage modes
+Сравнивает full и delta хранение истории: объём в БД и время восстановления версий
+
+Использование:
+    python bench_storage.py [--versions 30] [--sections 400] [--interval 10] [--rewrite-every 0]
+
+--rewrite-every N переписывает страницу целиком каждую N-ю версию (худший случай для diff);
+для больших спецификаций: --sections 20000 --rewrite-every 5
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api_watcher.storage.database import DatabaseManager, Snapshot, SnapshotBlob
+
+URL = "https://developers.example.com/docs/api"
+
+
+def make_page(rng: random.Random, sections: int) -> list:
+    """Страница документации как список разделов (минифицированный HTML, без переводов строк)"""
+    return [
+        f'<section id="m{i}"><h2>Method {i}</h2><p>POST /v1/items/{i} creates an item.</p>'
+        f'<table><tr><td>name</td><td>string</td><td>{rng.choice(["required", "optional"])}</td></tr>'
+        f'<tr><td>limit</td><td>integer</td><td>Max {rng.randint(10, 500)}</td></tr></table></section>'
+        for i in range(sections)
+    ]
+
+
+def evolve(rng: random.Random, page: list) -> list:
+    """Следующая версия: правка пары разделов и иногда новый раздел"""
+    page = list(page)
+    for _ in range(2):
+        i = rng.randrange(len(page))
+        page[i] = page[i].replace('</table>', f'<tr><td>v{rng.randint(0, 10**6)}</td></tr></table>', 1)
+    if rng.random() < 0.3:
+        page.insert(rng.randrange(len(page)), f'<section><h2>New {rng.randint(0, 10**6)}</h2></section>')
+    return page
+
+
+def run(mode: str, versions: int, sections: int, interval: int, rewrite_every: int = 0) -> dict:
+    rng = random.Random(42)
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    db = DatabaseManager(f"sqlite:///{path}", storage_mode=mode, keyframe_interval=interval)
+    try:
+        page = make_page(rng, sections)
+        expected = []
+        save_times = []
+        for version in range(versions):
+            html = '<html><body>' + ''.join(page) + '</body></html>'
+            expected.append(html)
+            started = time.perf_counter()
+            db.save_snapshot(url=URL, raw_html=html, text_content=None, has_changes=True)
+            save_times.append(time.perf_counter() - started)
+            if rewrite_every and (version + 1) % rewrite_every == 0:
+                page = make_page(rng, sections)
+            else:
+                page = evolve(rng, page)
+        save_seconds = sum(save_times)
+
+        blobs = db.session.query(SnapshotBlob).all()
+        raw = sum(blob.raw_size or 0 for blob in blobs)
+        stored = sum(blob.stored_size or 0 for blob in blobs)
+        db.session.expunge_all()
+
+        # Холодное восстановление каждой версии (без кэша распакованных блобов)
+        latencies = []
+        ids = [row[0] for row in db.session.query(Snapshot.id).order_by(Snapshot.id)]
+        for snapshot_id, html in zip(ids, expected):
+            db.session.expunge_all()
+            started = time.perf_counter()
+            restored = db.session.get(Snapshot, snapshot_id).raw_html
+            latencies.append(time.perf_counter() - started)
+            assert restored == html, f"version {snapshot_id} restored incorrectly"
+
+        history_started = time.perf_counter()
+        db.session.expunge_all()
+        for snapshot in db.get_snapshot_history(URL, limit=versions):
+            snapshot.raw_html
+        history_seconds = time.perf_counter() - history_started
+    finally:
+        db.close()
+        db.engine.dispose()
+        os.remove(path)
+
+    latencies.sort()
+    return {
+        'mode': mode,
+        'raw_kb': raw / 1024,
+        'stored_kb': stored / 1024,
+        'save_ms': save_seconds * 1000 / versions,
+        'save_max_ms': max(save_times) * 1000,
+        'p50_ms': latencies[len(latencies) // 2] * 1000,
+        'max_ms': latencies[-1] * 1000,
+        'history_ms': history_seconds * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--versions', type=int, default=30)
+    parser.add_argument('--sections', type=int, default=400)
+    parser.add_argument('--interval', type=int, default=10, help='keyframe interval for delta mode')
+    parser.add_argument('--rewrite-every', type=int, default=0, help='rewrite the whole page every N versions')
+    args = parser.parse_args()
+
+    print(f"{args.versions} versions, {args.sections} sections, keyframe every {args.interval}")
+    print(
+        f"{'mode':<6} {'raw KB':>9} {'stored KB':>10} {'save ms':>8} {'save max':>9} "
+        f"{'p50 ms':>7} {'max ms':>7} {'history ms':>11}"
+    )
+    for mode in ('full', 'delta'):
+        r = run(mode, args.versions, args.sections, args.interval, args.rewrite_every)
+        print(
+            f"{r['mode']:<6} {r['raw_kb']:>9.0f} {r['stored_kb']:>10.1f} {r['save_ms']:>8.1f} {r['save_max_ms']:>9.1f} "
+            f"{r['p50_ms']:>7.2f} {r['max_ms']:>7.2f} {r['history_ms']:>11.1f}"
+        )
+
+
+if __name__ == '__main__':
+    main()
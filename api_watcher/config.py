@@ -3,7 +3,8 @@
 """
 
 import os
-from typing import Optional
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
 from dotenv import load_dotenv
 
 # Load .env file from project root
@@ -24,15 +25,68 @@ class Config:
     # Safety limits to prevent excessive parsing / memory usage
     # Максимальный размер ответа, который мы готовы читать/парсить (в байтах)
     MAX_RESPONSE_BYTES = int(os.getenv('API_WATCHER_MAX_RESPONSE_BYTES', str(2 * 1024 * 1024)))  # 2MB
+    # Переопределения лимита для хостов или префиксов URL: "api.example.com=20000000,https://a.com/openapi=50000000"
+    MAX_RESPONSE_BYTES_OVERRIDES = os.getenv('API_WATCHER_MAX_RESPONSE_BYTES_OVERRIDES', '')
+    # Тела больше N байт пишутся во временный файл в SNAPSHOTS_DIR и читаются через mmap (0 — выключено)
+    BODY_SPILL_BYTES = int(os.getenv('API_WATCHER_BODY_SPILL_BYTES', '0'))
     # Максимальный объём, который читаем для эвристик/поиска OpenAPI (в байтах)
     MAX_PROBE_BYTES = int(os.getenv('API_WATCHER_MAX_PROBE_BYTES', str(256 * 1024)))  # 256KB
     # Ограничение параллельности внутренних проверок документации (чтобы не пробивать лимиты)
     DOCS_FINDER_MAX_CONCURRENT = int(os.getenv('API_WATCHER_DOCS_FINDER_MAX_CONCURRENT', '4'))
-    # Ограничение на парсинг JSON (в символах) при валидации/детекте типа
+    # Ограничение на парсинг JSON (в символах) при валидации/детекте типа;
+    # для URL с MAX_RESPONSE_BYTES_OVERRIDES поднимается до их лимита (см. get_max_json_parse_chars)
     MAX_JSON_PARSE_CHARS = int(os.getenv('API_WATCHER_MAX_JSON_PARSE_CHARS', str(2 * 1024 * 1024)))  # 2M chars
     # Ограничение на конвертацию HTML->text (в символах) для защиты от тяжёлых страниц
     MAX_HTML_TO_TEXT_CHARS = int(os.getenv('API_WATCHER_MAX_HTML_TO_TEXT_CHARS', str(500_000)))
-    
+
+    # Нормализация шума перед хешированием и сравнением HTML (cache-busting, CSRF, build ID, даты "обновлено")
+    NOISE_NORMALIZATION = os.getenv('API_WATCHER_NOISE_NORMALIZATION', 'true').lower() == 'true'
+    # JSON с правилами для отдельных хостов: {"docs.slack.dev": [{"pattern": "...", "replace": "", "scope": "html"}]}
+    NOISE_RULES_FILE = os.getenv('API_WATCHER_NOISE_RULES_FILE', '')
+
+    # Условные запросы (If-None-Match / If-Modified-Since): 304 пропускает валидацию и сравнение
+    CONDITIONAL_GET = os.getenv('API_WATCHER_CONDITIONAL_GET', 'true').lower() == 'true'
+
+    # Общий пул соединений (один TCPConnector на процесс для всех HTTP-клиентов)
+    HTTP_POOL_LIMIT = int(os.getenv('API_WATCHER_HTTP_POOL_LIMIT', '100'))
+    HTTP_POOL_LIMIT_PER_HOST = int(os.getenv('API_WATCHER_HTTP_POOL_LIMIT_PER_HOST', '8'))  # 0 — без лимита
+    HTTP_DNS_CACHE_TTL = int(os.getenv('API_WATCHER_HTTP_DNS_CACHE_TTL', '300'))  # секунд, 0 — без кэша
+    HTTP_KEEPALIVE_TIMEOUT = float(os.getenv('API_WATCHER_HTTP_KEEPALIVE_TIMEOUT', '30'))  # секунд
+    HTTP_HAPPY_EYEBALLS_DELAY = float(os.getenv('API_WATCHER_HTTP_HAPPY_EYEBALLS_DELAY', '0.25'))  # 0 — выключено
+
+    # Параллельность по хостам: сколько одновременных запросов допускаем к одному хосту
+    PER_HOST_MAX_CONCURRENT = int(os.getenv('API_WATCHER_PER_HOST_MAX_CONCURRENT', '2'))
+    # Переопределения для отдельных хостов: "developers.hubspot.com=3,docs.slack.dev=1"
+    HOST_CONCURRENCY = os.getenv('API_WATCHER_HOST_CONCURRENCY', '')
+
+    # Адаптивный лимит скорости по хостам (AIMD): снижение на 429/503, рост на успехах
+    ADAPTIVE_RATE_LIMIT = os.getenv('API_WATCHER_ADAPTIVE_RATE_LIMIT', 'true').lower() == 'true'
+    HOST_RATE_INITIAL = float(os.getenv('API_WATCHER_HOST_RATE_INITIAL', '2.0'))  # запросов/сек
+    HOST_RATE_MIN = float(os.getenv('API_WATCHER_HOST_RATE_MIN', '0.1'))
+    HOST_RATE_MAX = float(os.getenv('API_WATCHER_HOST_RATE_MAX', '10.0'))
+    HOST_RATE_INCREASE = float(os.getenv('API_WATCHER_HOST_RATE_INCREASE', '0.1'))  # +N запросов/сек за успех
+    HOST_RATE_DECREASE = float(os.getenv('API_WATCHER_HOST_RATE_DECREASE', '0.5'))  # множитель при 429/503
+    HOST_RATE_BURST = float(os.getenv('API_WATCHER_HOST_RATE_BURST', '2'))
+    # Retry-After больше этого значения не ждём внутри цикла — запрос считается неудачным
+    MAX_RETRY_AFTER_SECONDS = int(os.getenv('API_WATCHER_MAX_RETRY_AFTER', '120'))
+
+    # Пул процессов для html2text/DeepDiff (0 = считать в event loop, как раньше)
+    COMPUTE_WORKERS = int(os.getenv('API_WATCHER_COMPUTE_WORKERS', str(max(1, min(4, (os.cpu_count() or 2) - 1)))))
+    # Таймаут одной задачи сравнения (сек): зависшая задача не должна держать цикл
+    COMPUTE_TASK_TIMEOUT = float(os.getenv('API_WATCHER_COMPUTE_TIMEOUT', '60'))
+    # Входы меньше этого размера (в символах) считаются на месте: pickle дороже работы
+    COMPUTE_INLINE_THRESHOLD = int(os.getenv('API_WATCHER_COMPUTE_INLINE_THRESHOLD', '20000'))
+
+    # Конвейер параллельного цикла: fetch -> process -> analyze -> persist -> notify
+    # Ёмкость очереди между стадиями: медленная стадия притормаживает загрузку, а не копит страницы в памяти
+    PIPELINE_QUEUE_SIZE = int(os.getenv('API_WATCHER_PIPELINE_QUEUE_SIZE', '32'))
+    # Воркеры стадий (fetch ограничен max_concurrent, запись в БД всегда в один поток)
+    PIPELINE_PROCESS_WORKERS = int(os.getenv('API_WATCHER_PIPELINE_PROCESS_WORKERS', '4'))
+    PIPELINE_AI_WORKERS = int(os.getenv('API_WATCHER_PIPELINE_AI_WORKERS', '2'))
+    PIPELINE_NOTIFY_WORKERS = int(os.getenv('API_WATCHER_PIPELINE_NOTIFY_WORKERS', '1'))
+    # Как часто логировать глубину очередей (сек, 0 = только итог цикла)
+    PIPELINE_STATS_INTERVAL = float(os.getenv('API_WATCHER_PIPELINE_STATS_INTERVAL', '10'))
+
     # Настройки Telegram (опционально)
     TELEGRAM_BOT_TOKEN: Optional[str] = os.getenv('TELEGRAM_BOT_TOKEN')
     TELEGRAM_CHAT_ID: Optional[str] = os.getenv('TELEGRAM_CHAT_ID')
@@ -52,6 +106,12 @@ class Config:
     ZENROWS_ANTIBOT = os.getenv('API_WATCHER_ZENROWS_ANTIBOT', 'false').lower() == 'true'
     # Никогда не использовать ZenRows для "статических" URL (yaml/json/raw), чтобы не сжигать бюджет
     ZENROWS_SKIP_STATIC = os.getenv('API_WATCHER_ZENROWS_SKIP_STATIC', 'true').lower() == 'true'
+    # Запоминать хосты, которым нужен ZenRows (host_routes.json), и не тратить на них прямые запросы
+    ZENROWS_ROUTING = os.getenv('API_WATCHER_ZENROWS_ROUTING', 'true').lower() == 'true'
+    # Сколько циклов подряд прямой запрос должен проваливаться (при успехе ZenRows), чтобы его пропускать
+    ZENROWS_ROUTE_MIN_FAILURES = int(os.getenv('API_WATCHER_ZENROWS_ROUTE_MIN_FAILURES', '2'))
+    # Как часто снова пробовать прямой запрос для таких хостов (часы)
+    ZENROWS_ROUTE_REPROBE_HOURS = float(os.getenv('API_WATCHER_ZENROWS_ROUTE_REPROBE_HOURS', '24'))
     # Разрешить частый polling в daemon режиме (опасно при ZenRows)
     ALLOW_FAST_POLL = os.getenv('API_WATCHER_ALLOW_FAST_POLL', 'false').lower() == 'true'
     # Минимальный безопасный интервал проверки (сек)
@@ -67,6 +127,32 @@ class Config:
     OPENROUTER_MODEL: str = os.getenv('OPENROUTER_MODEL', 'anthropic/claude-3.5-sonnet')
     OPENROUTER_SITE_URL: Optional[str] = os.getenv('OPENROUTER_SITE_URL')
     OPENROUTER_APP_NAME: str = os.getenv('OPENROUTER_APP_NAME', 'API Watcher')
+    # Одновременных запросов к OpenRouter и таймаут одного запроса (сек)
+    OPENROUTER_MAX_CONCURRENT = int(os.getenv('OPENROUTER_MAX_CONCURRENT', '2'))
+    OPENROUTER_TIMEOUT = float(os.getenv('OPENROUTER_TIMEOUT', '60'))
+    
+    # В промпт уходят только изменённые фрагменты (unified diff) в пределах бюджета (~4 символа на токен)
+    AI_DIFF_TOKEN_BUDGET = int(os.getenv('API_WATCHER_AI_DIFF_TOKEN_BUDGET', '3000'))
+    AI_DIFF_CONTEXT_LINES = int(os.getenv('API_WATCHER_AI_DIFF_CONTEXT_LINES', '3'))
+    
+    # Пакетный AI-анализ: изменения, накопленные за AI_BATCH_WAIT сек (до AI_BATCH_SIZE шт.),
+    # уходят одним запросом; бюджет diff пакета делится между элементами (1 = без пакетов)
+    AI_BATCH_SIZE = int(os.getenv('API_WATCHER_AI_BATCH_SIZE', '8'))
+    AI_BATCH_WAIT = float(os.getenv('API_WATCHER_AI_BATCH_WAIT', '2.0'))
+    AI_BATCH_TOKEN_BUDGET = int(os.getenv('API_WATCHER_AI_BATCH_TOKEN_BUDGET', '12000'))
+    
+    # Кэш AI-анализа по паре хешей (старый текст, новый текст) и модели
+    AI_CACHE_ENABLED = os.getenv('API_WATCHER_AI_CACHE', 'true').lower() == 'true'
+    AI_CACHE_TTL_DAYS = float(os.getenv('API_WATCHER_AI_CACHE_TTL_DAYS', '30'))
+    AI_CACHE_MAX_ENTRIES = int(os.getenv('API_WATCHER_AI_CACHE_MAX_ENTRIES', '5000'))
+    
+    # Локальный классификатор изменений перед AI: on | shadow (только журнал) | off
+    CHANGE_CLASSIFIER = os.getenv('API_WATCHER_CHANGE_CLASSIFIER', 'on').lower()
+    # Правка пунктуации до N токенов — незначительная без AI (правки слов всегда решает AI);
+    # страница считается переписанной, только если изменено больше 10*N токенов
+    CLASSIFIER_MINOR_TOKENS = int(os.getenv('API_WATCHER_CLASSIFIER_MINOR_TOKENS', '3'))
+    # Доля изменённых токенов, начиная с которой страница считается переписанной (major без AI)
+    CLASSIFIER_MAJOR_RATIO = float(os.getenv('API_WATCHER_CLASSIFIER_MAJOR_RATIO', '0.5'))
     
     # Настройки Slack
     SLACK_BOT_TOKEN: Optional[str] = os.getenv('SLACK_BOT_TOKEN')
@@ -80,11 +166,34 @@ class Config:
     
     # Настройки БД
     DATABASE_URL: str = os.getenv('DATABASE_URL', 'sqlite:///api_watcher.db')
+    # Асинхронный доступ к БД (sqlalchemy[asyncio] + aiosqlite/asyncpg): запросы не блокируют event loop
+    DATABASE_ASYNC = os.getenv('API_WATCHER_DATABASE_ASYNC', 'false').lower() == 'true'
+    DATABASE_POOL_SIZE = int(os.getenv('API_WATCHER_DATABASE_POOL_SIZE', '5'))
+    DATABASE_MAX_OVERFLOW = int(os.getenv('API_WATCHER_DATABASE_MAX_OVERFLOW', '10'))
+    # Сжатие содержимого снэпшотов: zlib (по умолчанию), zstd (нужен zstandard), none
+    SNAPSHOT_COMPRESSION = os.getenv('API_WATCHER_SNAPSHOT_COMPRESSION', 'zlib').lower()
+    SNAPSHOT_COMPRESSION_LEVEL = int(os.getenv('API_WATCHER_SNAPSHOT_COMPRESSION_LEVEL', '6'))
+    # Хранение истории: full (каждая версия целиком) или delta (keyframe раз в N версий + дельты)
+    SNAPSHOT_STORAGE_MODE = os.getenv('API_WATCHER_SNAPSHOT_STORAGE_MODE', 'full').lower()
+    SNAPSHOT_KEYFRAME_INTERVAL = int(os.getenv('API_WATCHER_SNAPSHOT_KEYFRAME_INTERVAL', '10'))
+    # Участки diff без уникальных строк длиннее N строк/тегов не сравниваются (записываются целиком)
+    SNAPSHOT_DELTA_MAX_TOKENS = int(os.getenv('API_WATCHER_SNAPSHOT_DELTA_MAX_TOKENS', '400'))
+    # Пакетная запись снэпшотов за цикл: до N снэпшотов в одной транзакции
+    SNAPSHOT_WRITE_BATCH_SIZE = int(os.getenv('API_WATCHER_SNAPSHOT_WRITE_BATCH_SIZE', '100'))
+    # Сколько ждать (сек) следующих снэпшотов перед записью неполного пакета
+    SNAPSHOT_WRITE_BATCH_WAIT = float(os.getenv('API_WATCHER_SNAPSHOT_WRITE_BATCH_WAIT', '1.0'))
     
     # Настройки сравнения
     IGNORE_ORDER = True
     VERBOSE_LEVEL = 2
     CHECK_INTERVAL_DAYS = int(os.getenv('CHECK_INTERVAL_DAYS', '7'))
+    # SimHash текста страниц: шинглы из N слов
+    SIMHASH_SHINGLE_SIZE = int(os.getenv('API_WATCHER_SIMHASH_SHINGLE_SIZE', '3'))
+    # Изменение с расстоянием SimHash до N бит от сохранённого снэпшота считается тривиальным
+    # и не сохраняется (-1 — выключено: правка одного слова на большой странице даёт 0 бит)
+    SIMHASH_SKIP_DISTANCE = int(os.getenv('API_WATCHER_SIMHASH_SKIP_DISTANCE', '-1'))
+    # Страницы разных URL на расстоянии до N бит считаются дубликатами
+    SIMHASH_DUPLICATE_DISTANCE = int(os.getenv('API_WATCHER_SIMHASH_DUPLICATE_DISTANCE', '3'))
     
     # Настройки логирования
     LOG_LEVEL = os.getenv('API_WATCHER_LOG_LEVEL', 'INFO')
@@ -128,6 +237,60 @@ class Config:
         """Проверяет, настроен ли Webhook"""
         return bool(cls.WEBHOOK_URL)
     
+    @classmethod
+    def get_host_concurrency(cls) -> Dict[str, int]:
+        """Возвращает лимиты параллельности для отдельных хостов ({host: limit})"""
+        limits: Dict[str, int] = {}
+        for item in cls.HOST_CONCURRENCY.split(','):
+            host, sep, value = item.strip().partition('=')
+            if not sep or not host.strip():
+                continue
+            try:
+                limits[host.strip().lower()] = max(1, int(value))
+            except ValueError:
+                continue
+        return limits
+
+    @classmethod
+    def get_max_response_bytes(cls, url: str) -> int:
+        """
+        Лимит размера ответа для URL: самый длинный подходящий префикс URL или хост
+        (включая поддомены) из MAX_RESPONSE_BYTES_OVERRIDES, иначе MAX_RESPONSE_BYTES
+        """
+        host = (urlparse(url).hostname or '').lower()
+        best: Optional[Tuple[int, int]] = None
+        for item in cls.MAX_RESPONSE_BYTES_OVERRIDES.split(','):
+            key, sep, value = item.strip().rpartition('=')
+            key = key.strip()
+            if not sep or not key:
+                continue
+            if '/' in key:
+                matched = url.startswith(key)
+            else:
+                matched = host == key.lower() or host.endswith('.' + key.lower())
+            if not matched:
+                continue
+            try:
+                limit = max(1, int(value))
+            except ValueError:
+                continue
+            if best is None or len(key) > best[0]:
+                best = (len(key), limit)
+        return best[1] if best else max(1, int(cls.MAX_RESPONSE_BYTES))
+
+    @classmethod
+    def get_max_json_parse_chars(cls, url: str) -> int:
+        """
+        Лимит парсинга JSON для URL: MAX_JSON_PARSE_CHARS, а для URL с переопределённым лимитом ответа —
+        не меньше этого лимита (символов не больше, чем байт), чтобы большая спецификация, ради которой
+        лимит подняли, разбиралась как JSON, а не сравнивалась как HTML
+        """
+        limit = max(1, int(cls.MAX_JSON_PARSE_CHARS))
+        response_limit = cls.get_max_response_bytes(url)
+        if response_limit != max(1, int(cls.MAX_RESPONSE_BYTES)):
+            limit = max(limit, response_limit)
+        return limit
+
     @classmethod
     def get_exclude_paths(cls) -> list:
         """Возвращает пути для исключения из сравнения"""
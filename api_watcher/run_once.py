@@ -51,6 +51,9 @@ async def main():
         logger.info(f"Всего проверено: {total}")
         logger.info(f"Обнаружено изменений: {changed}")
         logger.info(f"Ошибок: {errors}")
+        duplicates = await watcher.find_duplicate_pages()
+        if duplicates:
+            logger.info(f"Страниц-дубликатов (пар): {len(duplicates)}")
         logger.info(f"{'='*60}\n")
         
         logger.info("✅ Проверка завершена успешно")
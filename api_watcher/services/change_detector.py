@@ -1,32 +1,79 @@
+import asyncio
+import inspect
 import json
-from typing import Dict, Optional, Any, List
+from dataclasses import dataclass
+from typing import Dict, Optional, Any, List, Tuple
 
-from api_watcher.storage.repository import SnapshotRepository
+from api_watcher.config import Config
+from api_watcher.storage.repository import SnapshotRepository, resolve
 from api_watcher.notifier.base import NotifierManager, ChangeNotification
 from api_watcher.utils.smart_comparator import SmartComparator
+from api_watcher.utils.ai_cache import AIAnalysisCache
+from api_watcher.utils.change_classifier import ChangeClassifier, ClassifierDecision, classify_change
+from api_watcher.utils.compute_pool import (
+    ComputePool, ComputeTimeoutError, compare_structured, page_fingerprint, page_text
+)
+from api_watcher.utils.simhash import from_hex, hamming_distance, to_hex
 from api_watcher.logging_config import get_logger
 
 logger = get_logger(__name__)
 
+# Pending AI analyses
+AI_HTML = 'html'
+AI_OPENAPI = 'openapi'
+
+
+@dataclass
+class Detection:
+    """
+    Outcome of processing one entry, split into the steps of the cycle pipeline:
+    compare() fills it, analyze() applies AI, persist() and notify() perform the side effects.
+    """
+    url: str
+    result: Dict[str, Any]
+    # kwargs for SnapshotRepository.save (None: nothing to store)
+    snapshot: Optional[Dict[str, Any]] = None
+    notification: Optional[ChangeNotification] = None
+    # Pending AI analysis (AI_HTML / AI_OPENAPI) and its arguments
+    ai_task: Optional[str] = None
+    ai_args: Tuple = ()
+    # Local classifier decision escalated to AI (ambiguous, or any decision in shadow mode)
+    classification: Optional[ClassifierDecision] = None
+
+    @classmethod
+    def final(cls, result: Dict[str, Any]) -> 'Detection':
+        """Detection without side effects (no changes, errors)"""
+        return cls(url=result['url'], result=result)
+
 
 class ChangeDetector:
     """
     Handles content comparison, AI analysis, and change notifications.
+    CPU-bound comparisons (html2text, DeepDiff) run in the compute pool.
     """
-    
+
     def __init__(
-        self, 
+        self,
         repository: SnapshotRepository,
         notifiers: NotifierManager,
-        ai_analyzer: Any = None
+        ai_analyzer: Any = None,
+        compute_pool: Optional[ComputePool] = None,
+        ai_cache: Optional[AIAnalysisCache] = None,
+        classifier: Optional[ChangeClassifier] = None
     ):
         self.repository = repository
         self.notifiers = notifiers
         self.ai_analyzer = ai_analyzer
         self.comparator = SmartComparator()
+        # Without a shared pool comparisons run inline: a private process pool would never be shut down
+        self.compute_pool = compute_pool if compute_pool is not None else ComputePool(max_workers=0)
+        self.ai_cache = ai_cache
+        self.classifier = classifier
+        # Analyses in progress by cache key: concurrent identical transitions share one call
+        self._ai_inflight: Dict[str, asyncio.Task] = {}
 
-    def _save_snapshot(
-        self,
+    @staticmethod
+    def _snapshot_kwargs(
         url: str,
         raw_html: str,
         text_content: str,
@@ -36,10 +83,12 @@ class ChangeDetector:
         content_hash: str,
         has_changes: bool,
         ai_summary: Optional[str] = None,
-        structured_data: Optional[dict] = None
-    ) -> None:
-        """Сохраняет snapshot в репозиторий (DRY helper)"""
-        self.repository.save(
+        structured_data: Optional[dict] = None,
+        simhash: Optional[str] = None,
+        text_version: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Аргументы SnapshotRepository.save (DRY helper)"""
+        return dict(
             url=url,
             raw_html=raw_html,
             text_content=text_content,
@@ -49,20 +98,70 @@ class ChangeDetector:
             structured_data=structured_data,
             content_hash=content_hash,
             has_changes=has_changes,
-            ai_summary=ai_summary
+            ai_summary=ai_summary,
+            simhash=simhash,
+            text_version=text_version
         )
 
-    def _send_notification(
-        self,
+    async def _run_analyzer(self, method_name: str, *args: Any) -> Any:
+        """
+        Calls an AI analyzer method without blocking the event loop:
+        async analyzers are awaited, sync ones (Gemini, legacy OpenRouter) run in a thread.
+        """
+        method = getattr(self.ai_analyzer, method_name)
+        if inspect.iscoroutinefunction(method):
+            return await method(*args)
+        return await asyncio.to_thread(method, *args)
+
+    def _analyzer_model(self) -> str:
+        """Model name of the analyzer (part of the AI cache key)"""
+        model = getattr(self.ai_analyzer, 'model_name', None) or getattr(self.ai_analyzer, 'model', None)
+        return model if isinstance(model, str) else type(self.ai_analyzer).__name__
+
+    def _cached_html(self, old_text: str, new_text: str) -> Tuple[Optional[str], Optional[Dict]]:
+        """AI cache key of an HTML transition and the cached verdict, if any"""
+        if self.ai_cache is None:
+            return None, None
+        key = self.ai_cache.key(AI_HTML, self._analyzer_model(), old_text, new_text)
+        cached = self.ai_cache.get(key)
+        if cached is not None:
+            logger.info("ai_cache_hit", key=key[:40])
+            return key, dict(cached)
+        return key, None
+
+    def _remember_html(self, key: Optional[str], verdict: Any) -> None:
+        """Caches a verdict; failed analyses are not cached"""
+        if key is not None and isinstance(verdict, dict) and not verdict.get('ai_error'):
+            self.ai_cache.put(key, verdict)
+
+    async def _analyze_html(self, old_text: str, new_text: str, *args: Any) -> Dict:
+        """analyze_changes through the AI cache"""
+        key, cached = self._cached_html(old_text, new_text)
+        if cached is not None:
+            return cached
+        if key is None:
+            return await self._run_analyzer('analyze_changes', old_text, new_text, *args)
+
+        task = self._ai_inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._run_analyzer('analyze_changes', old_text, new_text, *args))
+            self._ai_inflight[key] = task
+            task.add_done_callback(lambda _: self._ai_inflight.pop(key, None))
+        result = await asyncio.shield(task)
+        self._remember_html(key, result)
+        return dict(result)
+
+    @staticmethod
+    def _notification(
         api_name: Optional[str],
         method_name: Optional[str],
         url: str,
         summary: str,
         severity: str,
         key_changes: Optional[List[str]] = None
-    ) -> None:
-        """Отправляет уведомление об изменениях (DRY helper)"""
-        notification = ChangeNotification(
+    ) -> ChangeNotification:
+        """Уведомление об изменениях (DRY helper)"""
+        return ChangeNotification(
             api_name=api_name or 'Unknown API',
             method_name=method_name,
             url=url,
@@ -70,9 +169,8 @@ class ChangeDetector:
             severity=severity,
             key_changes=key_changes
         )
-        self.notifiers.send_change(notification)
 
-    def detect_changes(
+    async def detect_changes(
         self,
         old_snapshot,
         new_html: str,
@@ -83,36 +181,143 @@ class ChangeDetector:
     ) -> Dict:
         """
         Orchestrates the comparison process based on content type.
+        Runs all steps in order; the cycle pipeline runs them as separate stages instead.
         """
+        detection = await self.compare(old_snapshot, new_html, content_type, url, api_name, method_name)
+        await self.analyze(detection)
+        await self.persist(detection)
+        self.notify(detection)
+        return detection.result
+
+    async def compare(
+        self,
+        old_snapshot,
+        new_html: str,
+        content_type: str,
+        url: str,
+        api_name: Optional[str],
+        method_name: Optional[str]
+    ) -> Detection:
+        """Comparison step (CPU): decides whether the entry changed, without AI, DB writes or notifications"""
         if content_type == 'openapi':
-            return self._compare_openapi(old_snapshot, new_html, url, api_name, method_name)
+            return await self._compare_openapi(old_snapshot, new_html, url, api_name, method_name)
         elif content_type == 'json':
-            return self._compare_json(old_snapshot, new_html, url, api_name, method_name)
+            return await self._compare_json(old_snapshot, new_html, url, api_name, method_name)
+        elif content_type == 'html_section':
+            return await self._compare_html(old_snapshot, new_html, url, api_name, method_name, is_section=True)
         else:
-            return self._compare_html(old_snapshot, new_html, url, api_name, method_name)
+            return await self._compare_html(old_snapshot, new_html, url, api_name, method_name)
 
-    def _compare_openapi(
+    async def analyze(self, detection: Detection) -> None:
+        """
+        AI step: runs the pending analysis and updates summary, severity and significance.
+        If the analyzer fails, the change keeps the non-AI verdict of compare() and is flagged with ai_error.
+        """
+        if detection.ai_task is None:
+            return
+        task, args = detection.ai_task, detection.ai_args
+        detection.ai_task, detection.ai_args = None, ()
+
+        try:
+            if task == AI_OPENAPI:
+                logger.info("ai_analysis_openapi", url=detection.url)
+                summary = await self._run_analyzer('analyze_openapi_changes', *args)
+                detection.snapshot['ai_summary'] = summary
+                detection.result['summary'] = summary
+                detection.notification.summary = summary
+            elif task == AI_HTML:
+                logger.info("ai_analysis_html", url=detection.url)
+                ai_result = await self._analyze_html(*args)
+                self._apply_ai_analysis(detection, ai_result)
+        except Exception as e:
+            logger.error("ai_analysis_error", url=detection.url, task=task, error=str(e))
+            detection.result['ai_error'] = True
+
+    async def analyze_many(self, detections: List[Detection]) -> None:
+        """
+        AI step for a batch: HTML changes missing from the cache go to the model in one
+        request (analyze_changes_batch); entries without a verdict in the reply, OpenAPI
+        summaries and analyzers without batch support fall back to single calls.
+        """
+        html = [d for d in detections if d.ai_task == AI_HTML]
+        single = [d for d in detections if d.ai_task is not None and d.ai_task != AI_HTML]
+
+        pending: List[Tuple[Detection, Optional[str]]] = []
+        for detection in html:
+            key, cached = self._cached_html(*detection.ai_args[:2])
+            if cached is not None:
+                detection.ai_task, detection.ai_args = None, ()
+                self._apply_ai_analysis(detection, cached)
+            else:
+                pending.append((detection, key))
+
+        if len(pending) > 1 and hasattr(self.ai_analyzer, 'analyze_changes_batch'):
+            logger.info("ai_analysis_batch", size=len(pending), urls=[d.url for d, _ in pending])
+            try:
+                verdicts = await self._run_analyzer('analyze_changes_batch', [d.ai_args for d, _ in pending])
+            except Exception as e:
+                logger.error("ai_batch_error", size=len(pending), error=str(e))
+                verdicts = []
+            verdicts = list(verdicts or []) + [None] * (len(pending) - len(verdicts or []))
+            for (detection, key), verdict in zip(pending, verdicts):
+                if verdict is None:
+                    single.append(detection)
+                    continue
+                self._remember_html(key, verdict)
+                detection.ai_task, detection.ai_args = None, ()
+                self._apply_ai_analysis(detection, verdict)
+        else:
+            single.extend(d for d, _ in pending)
+
+        # A failed analysis keeps the default verdict of compare() (see analyze) instead of failing the whole batch
+        await asyncio.gather(*(self.analyze(d) for d in single))
+
+    async def persist(self, detection: Detection) -> None:
+        """DB step: stores the new snapshot, if any"""
+        if detection.snapshot is not None:
+            await resolve(self.repository.save(**detection.snapshot))
+
+    async def persist_many(self, detections: List[Detection]) -> None:
+        """DB step for a batch of detections: one write per chunk instead of one per snapshot"""
+        snapshots = [d.snapshot for d in detections if d.snapshot is not None]
+        if snapshots:
+            await resolve(self.repository.save_many(snapshots, chunk_size=len(snapshots)))
+
+    def notify(self, detection: Detection) -> None:
+        """Notification step"""
+        if detection.notification is not None:
+            self.notifiers.send_change(detection.notification)
+
+    async def _compare_openapi(
         self,
         old_snapshot,
         new_html: str,
         url: str,
         api_name: Optional[str],
         method_name: Optional[str]
-    ) -> Dict:
+    ) -> Detection:
         logger.info("comparing_openapi", url=url)
-        
+
+        # Fast hash check: identical bytes need neither the old spec nor DeepDiff
+        if old_snapshot.content_hash == self.comparator.calculate_hash(new_html):
+            logger.info("content_unchanged_hash_match", url=url)
+            return Detection.final({'url': url, 'has_changes': False})
+
         try:
+            await self._load_payload(old_snapshot)
             old_spec = json.loads(old_snapshot.structured_data) if old_snapshot.structured_data else json.loads(old_snapshot.raw_html)
             new_spec = json.loads(new_html)
-            
-            has_changes, changes_dict = self.comparator.compare_openapi(old_spec, new_spec)
-            
+
+            has_changes, changes_dict = await self.compute_pool.run(
+                compare_structured, 'openapi', old_spec, new_spec, size=len(new_html)
+            )
+
             if not has_changes:
                 logger.info("no_openapi_changes", url=url)
-                return {'url': url, 'has_changes': False}
-            
+                return Detection.final({'url': url, 'has_changes': False})
+
             logger.info("openapi_changes_detected", url=url)
-            
+
             # Determine severity
             categories = self.comparator.categorize_openapi_changes(changes_dict)
             if categories['breaking_changes']:
@@ -121,183 +326,264 @@ class ChangeDetector:
                 severity = 'moderate'
             else:
                 severity = 'minor'
-            
-            # AI analysis
+
+            # AI analysis (deferred to analyze())
             ai_summary = "OpenAPI specification changes detected"
-            
+            ai_task = None
+
             if self.ai_analyzer and changes_dict and severity in ['moderate', 'major']:
-                logger.info("ai_analysis_openapi", severity=severity, url=url)
-                ai_summary = self.ai_analyzer.analyze_openapi_changes(changes_dict, api_name)
+                ai_task = AI_OPENAPI
             elif severity == 'minor':
                 change_count = len(changes_dict.get('modified', []))
                 ai_summary = f"Minor changes ({change_count} items)"
-            
-            # Save snapshot
+
             content_hash = self.comparator.calculate_hash(new_html)
-            self._save_snapshot(
+            return Detection(
                 url=url,
-                raw_html=new_html,
-                text_content=json.dumps(new_spec, indent=2),
-                api_name=api_name,
-                method_name=method_name,
-                content_type='openapi',
-                content_hash=content_hash,
-                has_changes=True,
-                ai_summary=ai_summary,
-                structured_data=new_spec
+                result={
+                    'url': url,
+                    'has_changes': True,
+                    'summary': ai_summary,
+                    'severity': severity,
+                    'changes': changes_dict
+                },
+                snapshot=self._snapshot_kwargs(
+                    url=url,
+                    raw_html=new_html,
+                    text_content=json.dumps(new_spec, indent=2),
+                    api_name=api_name,
+                    method_name=method_name,
+                    content_type='openapi',
+                    content_hash=content_hash,
+                    has_changes=True,
+                    ai_summary=ai_summary,
+                    structured_data=new_spec
+                ),
+                notification=self._notification(
+                    api_name=api_name,
+                    method_name=method_name,
+                    url=url,
+                    summary=ai_summary,
+                    severity=severity
+                ),
+                ai_task=ai_task,
+                ai_args=(changes_dict, api_name) if ai_task else ()
             )
-            
-            # Notify
-            self._send_notification(
-                api_name=api_name,
-                method_name=method_name,
-                url=url,
-                summary=ai_summary,
-                severity=severity
-            )
-            
-            return {
-                'url': url,
-                'has_changes': True,
-                'summary': ai_summary,
-                'severity': severity,
-                'changes': changes_dict
-            }
-            
+
         except Exception as e:
             logger.error("openapi_comparison_error", url=url, error=str(e), exc_info=True)
-            return {'url': url, 'has_changes': False, 'error': str(e)}
+            return Detection.final({'url': url, 'has_changes': False, 'error': str(e)})
 
-    def _compare_json(
+    async def _compare_json(
         self,
         old_snapshot,
         new_html: str,
         url: str,
         api_name: Optional[str],
         method_name: Optional[str]
-    ) -> Dict:
+    ) -> Detection:
         logger.info("comparing_json", url=url)
-        
+
+        if old_snapshot.content_hash == self.comparator.calculate_hash(new_html):
+            logger.info("content_unchanged_hash_match", url=url)
+            return Detection.final({'url': url, 'has_changes': False})
+
         try:
+            await self._load_payload(old_snapshot)
             old_data = json.loads(old_snapshot.structured_data) if old_snapshot.structured_data else json.loads(old_snapshot.raw_html)
             new_data = json.loads(new_html)
-            
-            has_changes, changes_dict = self.comparator.compare_json(old_data, new_data)
-            
+
+            has_changes, changes_dict = await self.compute_pool.run(
+                compare_structured, 'json', old_data, new_data, size=len(new_html)
+            )
+
             if not has_changes:
                 logger.info("no_json_changes", url=url)
-                return {'url': url, 'has_changes': False}
-            
+                return Detection.final({'url': url, 'has_changes': False})
+
             logger.info("json_changes_detected", url=url)
-            
+
             content_hash = self.comparator.calculate_hash(new_html)
             summary = f"JSON changes: {len(changes_dict)} items"
-            
-            self._save_snapshot(
+
+            return Detection(
                 url=url,
-                raw_html=new_html,
-                text_content=json.dumps(new_data, indent=2),
-                api_name=api_name,
-                method_name=method_name,
-                content_type='json',
-                content_hash=content_hash,
-                has_changes=True,
-                ai_summary=summary,
-                structured_data=new_data
+                result={
+                    'url': url,
+                    'has_changes': True,
+                    'summary': summary,
+                    'severity': 'moderate'
+                },
+                snapshot=self._snapshot_kwargs(
+                    url=url,
+                    raw_html=new_html,
+                    text_content=json.dumps(new_data, indent=2),
+                    api_name=api_name,
+                    method_name=method_name,
+                    content_type='json',
+                    content_hash=content_hash,
+                    has_changes=True,
+                    ai_summary=summary,
+                    structured_data=new_data
+                )
             )
-            
-            return {
-                'url': url,
-                'has_changes': True,
-                'summary': summary,
-                'severity': 'moderate'
-            }
-            
+
         except Exception as e:
             logger.error("json_comparison_error", url=url, error=str(e), exc_info=True)
-            return {'url': url, 'has_changes': False, 'error': str(e)}
+            return Detection.final({'url': url, 'has_changes': False, 'error': str(e)})
 
-    def _compare_html(
+    async def _compare_html(
         self,
         old_snapshot,
         new_html: str,
         url: str,
         api_name: Optional[str],
-        method_name: Optional[str]
-    ) -> Dict:
-        logger.info("comparing_html", url=url)
-        
-        # Fast hash check
-        new_hash = self.comparator.calculate_hash(new_html)
+        method_name: Optional[str],
+        is_section: bool = False
+    ) -> Detection:
+        """
+        Compares HTML pages via their text.
+        Sections (anchored entries) are already plain text, so html2text is skipped for them.
+        """
+        logger.info("comparing_html", url=url, is_section=is_section)
+        content_type = 'html_section' if is_section else 'html'
+
+        # Fast hash check, after noise normalization: tokens, build IDs and "last updated" dates don't count
+        new_hash = self.comparator.normalized_hash(new_html, url, is_text=is_section)
         if old_snapshot.content_hash == new_hash:
             logger.info("content_unchanged_hash_match", url=url)
-            return {'url': url, 'has_changes': False}
-        
-        has_changes, old_text, new_text = self.comparator.compare_html_text(
-            old_snapshot.raw_html, new_html
+            return Detection.final({'url': url, 'has_changes': False})
+
+        try:
+            new_text, fingerprint = await self.compute_pool.run(
+                page_fingerprint, new_html, url, is_section, size=len(new_html)
+            )
+            # Change magnitude from the stored fingerprint, before converting the old page
+            old_fingerprint = from_hex(getattr(old_snapshot, 'simhash', None))
+            distance = hamming_distance(old_fingerprint, fingerprint) if old_fingerprint is not None else None
+            if distance is not None and distance <= Config.SIMHASH_SKIP_DISTANCE:
+                logger.info("trivial_change_skipped", url=url, simhash_distance=distance)
+                return Detection.final({'url': url, 'has_changes': False, 'reason': 'trivial'})
+
+            await self._load_payload(old_snapshot)
+            if is_section:
+                old_text = self.comparator.normalizer.normalize_text(old_snapshot.raw_html, url)
+            else:
+                old_text = self._stored_text(old_snapshot)
+                if old_text is None:
+                    old_text = await self.compute_pool.run(
+                        page_text, old_snapshot.raw_html, url, size=len(old_snapshot.raw_html or '')
+                    )
+        except ComputeTimeoutError as e:
+            logger.error("html_comparison_timeout", url=url, error=str(e))
+            return Detection.final({'url': url, 'has_changes': False, 'error': str(e)})
+
+        snapshot = self._snapshot_kwargs(
+            url=url,
+            raw_html=new_html,
+            text_content=new_text,
+            api_name=api_name,
+            method_name=method_name,
+            content_type=content_type,
+            content_hash=new_hash,
+            has_changes=True,
+            simhash=to_hex(fingerprint),
+            text_version=None if is_section else self.comparator.text_version
         )
-        
-        if not has_changes:
+
+        if not self.comparator.quick_compare(old_text, new_text):
             logger.info("no_text_changes", url=url)
-            return {'url': url, 'has_changes': False}
-        
-        logger.info("html_changes_detected", url=url)
-        
-        # AI analysis
-        ai_result = {
+            # Equal normalized text of a section means equal normalized hash, so the stored hash predates
+            # noise normalization; for pages a stale text_version means the stored text can't be reused.
+            # Re-stamp such baselines once, otherwise they are re-converted on every cycle.
+            if is_section or getattr(old_snapshot, 'text_version', None) != self.comparator.text_version:
+                logger.info("baseline_restamped", url=url)
+                snapshot['has_changes'] = False
+                return Detection(url=url, result={'url': url, 'has_changes': False}, snapshot=snapshot)
+            return Detection.final({'url': url, 'has_changes': False})
+
+        logger.info("html_changes_detected", url=url, simhash_distance=distance)
+
+        detection = Detection(url=url, result={}, snapshot=snapshot)
+
+        # AI analysis (deferred to analyze()); without analyzer every text change is significant
+        self._apply_html_analysis(detection, {
             'has_significant_changes': True,
             'summary': 'Changes detected',
             'severity': 'moderate'
-        }
-        
+        })
         if self.ai_analyzer:
-            logger.info("ai_analysis_html", url=url)
-            ai_result = self.ai_analyzer.analyze_changes(
-                old_text, new_text, api_name, method_name
+            decision = await self._classify(url, old_text, new_text)
+            if decision is not None and decision.is_local and not self.classifier.shadow:
+                # Obvious minor/major change: verdict without an AI call
+                self.classifier.record(url, decision)
+                self._apply_html_analysis(detection, decision.analysis())
+                return detection
+            detection.ai_task = AI_HTML
+            detection.ai_args = (old_text, new_text, api_name, method_name)
+            detection.classification = decision
+        return detection
+
+    async def _classify(self, url: str, old_text: str, new_text: str) -> Optional[ClassifierDecision]:
+        """Local classifier decision (None: classifier disabled or failed, the change goes to AI)"""
+        if self.classifier is None:
+            return None
+        try:
+            return await self.compute_pool.run(
+                classify_change, old_text, new_text, size=len(old_text or '') + len(new_text or '')
             )
-        
+        except Exception as e:
+            logger.error("change_classifier_error", url=url, error=str(e))
+            return None
+
+    def _apply_ai_analysis(self, detection: Detection, ai_result: Dict) -> None:
+        """Applies an AI verdict and logs it next to the local decision it was escalated from"""
+        self._apply_html_analysis(detection, ai_result)
+        if detection.classification is not None:
+            self.classifier.record(detection.url, detection.classification, ai_result)
+            detection.classification = None
+
+    async def _load_payload(self, snapshot) -> None:
+        """Reads the old snapshot's content: async repositories return metadata only, so hash matches stay cheap"""
+        await resolve(self.repository.load_payload(snapshot))
+
+    def _stored_text(self, snapshot) -> Optional[str]:
+        """
+        Text saved with the snapshot, if it was produced by the current html2text and noise rules;
+        None means the old page has to be converted again (older snapshots, upgraded html2text).
+        """
+        if getattr(snapshot, 'text_version', None) != self.comparator.text_version:
+            return None
+        return snapshot.text_content
+
+    def _apply_html_analysis(self, detection: Detection, ai_result: Dict) -> None:
+        """Fills result, snapshot and notification of an HTML change from the (AI) verdict"""
+        snapshot = detection.snapshot
+        url = detection.url
+
         if not ai_result.get('has_significant_changes'):
             logger.info("insignificant_changes", url=url)
-            self._save_snapshot(
-                url=url,
-                raw_html=new_html,
-                text_content=new_text,
-                api_name=api_name,
-                method_name=method_name,
-                content_type='html',
-                content_hash=new_hash,
-                has_changes=False,
-                ai_summary="Insignificant changes"
-            )
-            return {'url': url, 'has_changes': False, 'reason': 'insignificant'}
-        
+            snapshot['has_changes'] = False
+            snapshot['ai_summary'] = "Insignificant changes"
+            detection.notification = None
+            detection.result = {'url': url, 'has_changes': False, 'reason': 'insignificant'}
+            return
+
         summary = ai_result.get('summary', 'Significant changes')
         severity = ai_result.get('severity', 'moderate')
         key_changes = ai_result.get('key_changes', [])
-        
-        self._save_snapshot(
-            url=url,
-            raw_html=new_html,
-            text_content=new_text,
-            api_name=api_name,
-            method_name=method_name,
-            content_type='html',
-            content_hash=new_hash,
-            has_changes=True,
-            ai_summary=summary
-        )
-        
-        # Notify
-        self._send_notification(
-            api_name=api_name,
-            method_name=method_name,
+
+        snapshot['has_changes'] = True
+        snapshot['ai_summary'] = summary
+        detection.notification = self._notification(
+            api_name=snapshot['api_name'],
+            method_name=snapshot['method_name'],
             url=url,
             summary=summary,
             severity=severity,
             key_changes=key_changes
         )
-        
-        return {
+        detection.result = {
             'url': url,
             'has_changes': True,
             'summary': summary,
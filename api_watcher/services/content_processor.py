@@ -1,4 +1,5 @@
 import json
+import re
 from typing import Optional, Dict, Tuple, Union, overload
 
 from api_watcher.config import Config
@@ -8,6 +9,15 @@ from api_watcher.logging_config import get_logger
 
 logger = get_logger(__name__)
 
+_LEADING_WS = re.compile(r'\s*')
+
+
+def _first_char(content: str) -> str:
+    """Первый непробельный символ без content.lstrip(), который копирует всю страницу"""
+    start = _LEADING_WS.match(content).end()
+    return content[start:start + 1]
+
+
 class ContentProcessor:
     """
     Handles content validation, type detection, and documentation discovery.
@@ -58,9 +68,8 @@ class ContentProcessor:
         
         # Try to parse as JSON and check for error fields FIRST.
         # Важно: не пытаемся json.loads() на любой HTML-странице — это дорого на больших ответах.
-        stripped = content.lstrip()
-        looks_like_json = bool(stripped) and stripped[0] in ['{', '[']
-        max_json_chars = max(1, int(getattr(Config, "MAX_JSON_PARSE_CHARS", 2 * 1024 * 1024)))
+        looks_like_json = _first_char(content) in ('{', '[')
+        max_json_chars = Config.get_max_json_parse_chars(url)
 
         try:
             if not looks_like_json or len(content) > max_json_chars:
@@ -171,9 +180,8 @@ class ContentProcessor:
             return 'openapi'
         
         try:
-            stripped = content.lstrip()
-            looks_like_json = bool(stripped) and stripped[0] in ['{', '[']
-            max_json_chars = max(1, int(getattr(Config, "MAX_JSON_PARSE_CHARS", 2 * 1024 * 1024)))
+            looks_like_json = _first_char(content) in ('{', '[')
+            max_json_chars = Config.get_max_json_parse_chars(url)
             if not looks_like_json or len(content) > max_json_chars:
                 raise json.JSONDecodeError("Skip JSON parse (heuristics)", content, 0)
 
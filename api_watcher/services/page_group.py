@@ -0,0 +1,73 @@
+"""
+Page group of anchored entries
+Общие для всех записей одной страницы результаты: валидация, тип контента и индекс разделов
+"""
+
+import asyncio
+from typing import Optional
+from urllib.parse import urldefrag
+
+from api_watcher.services.content_processor import ContentProcessor
+from api_watcher.utils.compute_pool import ComputePool, section_index
+from api_watcher.utils.section_index import PageSectionIndex
+from api_watcher.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Тип контента для записей с якорем: снэпшот хранит текст раздела, а не всю страницу
+SECTION_CONTENT_TYPE = 'html_section'
+
+
+class PageGroup:
+    """
+    Page-level results shared by all entries of one base URL within a cycle.
+    Validation, type detection and section indexing run once per page,
+    each anchored entry then gets only its own section.
+    The section index (a BeautifulSoup parse) is built in the compute pool.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        content: str,
+        content_processor: ContentProcessor,
+        compute_pool: Optional[ComputePool] = None
+    ):
+        self.base_url = base_url
+        self.content = content
+        self.is_valid = content_processor.is_valid_response(content, base_url)
+        self.content_type = (
+            content_processor.detect_content_type(base_url, content) if self.is_valid else None
+        )
+        self.compute_pool = compute_pool or ComputePool(max_workers=0)
+        self._index: Optional[PageSectionIndex] = None
+        self._index_lock = asyncio.Lock()
+
+    async def index(self) -> PageSectionIndex:
+        """Индекс разделов (строится лениво, один раз на страницу)"""
+        async with self._index_lock:
+            if self._index is not None:
+                return self._index
+            self._index = await self.compute_pool.run(section_index, self.content, size=len(self.content))
+            logger.info(
+                "page_section_index_built",
+                url=self.base_url,
+                headings=len(self._index.headings),
+                anchors=len(self._index.anchors)
+            )
+        return self._index
+
+    async def section_for(self, url: str) -> Optional[str]:
+        """
+        Текст раздела для якорной записи.
+
+        Returns:
+            Текст раздела; None, если у URL нет якоря, страница не HTML или якорь не найден
+
+        Raises:
+            ComputeTimeoutError: разбор страницы не уложился в таймаут пула
+        """
+        fragment = urldefrag(url).fragment
+        if not fragment or self.content_type != 'html':
+            return None
+        return (await self.index()).section(fragment)
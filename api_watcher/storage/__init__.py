@@ -1,13 +1,17 @@
 # Storage package
-from api_watcher.storage.database import DatabaseManager, Snapshot
+from api_watcher.storage.database import DatabaseManager, Snapshot, SnapshotBlob, LatestSnapshot
 from api_watcher.storage.repository import (
     SnapshotRepository,
-    SQLAlchemySnapshotRepository
+    SQLAlchemySnapshotRepository,
+    create_repository
 )
 
 __all__ = [
     'DatabaseManager',
     'Snapshot',
+    'SnapshotBlob',
+    'LatestSnapshot',
     'SnapshotRepository',
-    'SQLAlchemySnapshotRepository'
+    'SQLAlchemySnapshotRepository',
+    'create_repository'
 ]
\ No newline at end of file
@@ -0,0 +1,162 @@
+"""
+Async SQLAlchemy repository
+Репозиторий на sqlalchemy.ext.asyncio: запросы к БД не блокируют event loop
+
+Нужны sqlalchemy[asyncio] и асинхронный драйвер: aiosqlite (SQLite) или asyncpg (PostgreSQL).
+"""
+
+import asyncio
+from typing import Callable, Dict, Iterable, List, Optional, TypeVar
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+
+from api_watcher.config import Config
+from api_watcher.storage.database import Snapshot, SnapshotStore, init_schema
+from api_watcher.storage.repository import SnapshotRepository
+
+T = TypeVar('T')
+
+# Синхронный драйвер -> асинхронный для того же DATABASE_URL
+_ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg',
+    'postgresql+psycopg2': 'postgresql+asyncpg',
+}
+
+_PAYLOAD_FIELDS = ('raw_html', 'text_content', 'structured_data')
+
+
+def async_database_url(database_url: str) -> str:
+    """DATABASE_URL с асинхронным драйвером (URL, где драйвер уже указан явно, не меняется)"""
+    url = make_url(database_url)
+    driver = _ASYNC_DRIVERS.get(url.drivername)
+    return url.set(drivername=driver).render_as_string(hide_password=False) if driver else database_url
+
+
+def _read_payload(snapshot: Snapshot) -> Dict[str, Optional[str]]:
+    """Читает содержимое снэпшота, пока сессия открыта (распакованные блобы и дельты)"""
+    return {field: getattr(snapshot, field) for field in _PAYLOAD_FIELDS}
+
+
+class AsyncSQLAlchemySnapshotRepository(SnapshotRepository):
+    """
+    Асинхронная реализация SnapshotRepository.
+
+    Интерфейс тот же, но методы — корутины. Каждый вызов берёт свою сессию из пула
+    соединений, поэтому запросы разных URL идут параллельно с загрузкой страниц.
+    Логика хранения (блобы, дельты, указатели latest_snapshots) — общая с
+    синхронным репозиторием через SnapshotStore.
+
+    get_latest / get_latest_many / get_history возвращают только метаданные
+    (content_hash, simhash, text_version...): содержимое читается отдельным
+    запросом load_payload(), когда оно действительно нужно для сравнения.
+    """
+
+    def __init__(
+        self,
+        database_url: str,
+        pool_size: Optional[int] = None,
+        max_overflow: Optional[int] = None
+    ):
+        url = async_database_url(database_url)
+        engine_kwargs = {}
+        if make_url(url).database not in (None, '', ':memory:'):
+            # In-memory SQLite живёт в одном соединении (StaticPool) — настройки пула к нему неприменимы
+            engine_kwargs = {
+                'pool_size': pool_size or Config.DATABASE_POOL_SIZE,
+                'max_overflow': max_overflow if max_overflow is not None else Config.DATABASE_MAX_OVERFLOW,
+                'pool_pre_ping': True,
+            }
+        self._engine: AsyncEngine = create_async_engine(url, **engine_kwargs)
+        self._sessions = async_sessionmaker(self._engine, expire_on_commit=False)
+        self._schema_ready = False
+        self._schema_lock = asyncio.Lock()
+
+    async def _ensure_schema(self) -> None:
+        if self._schema_ready:
+            return
+        async with self._schema_lock:
+            if not self._schema_ready:
+                async with self._engine.begin() as conn:
+                    await conn.run_sync(init_schema)
+                self._schema_ready = True
+
+    async def _run(self, operation: Callable[[SnapshotStore], T]) -> T:
+        """Выполняет операцию SnapshotStore в отдельной сессии"""
+        await self._ensure_schema()
+        async with self._sessions() as session:
+            def call(sync_session: Session) -> T:
+                return operation(SnapshotStore(sync_session))
+            return await session.run_sync(call)
+
+    async def save(
+        self,
+        url: str,
+        raw_html: str,
+        text_content: str,
+        api_name: Optional[str] = None,
+        method_name: Optional[str] = None,
+        content_type: str = 'html',
+        structured_data: Optional[dict] = None,
+        content_hash: Optional[str] = None,
+        has_changes: bool = False,
+        ai_summary: Optional[str] = None,
+        simhash: Optional[str] = None,
+        text_version: Optional[str] = None
+    ) -> Snapshot:
+        return await self._run(lambda store: store.save_snapshot(
+            url=url,
+            raw_html=raw_html,
+            text_content=text_content,
+            api_name=api_name,
+            method_name=method_name,
+            content_type=content_type,
+            structured_data=structured_data,
+            content_hash=content_hash,
+            has_changes=has_changes,
+            ai_summary=ai_summary,
+            simhash=simhash,
+            text_version=text_version
+        ))
+
+    async def save_many(self, snapshots: Iterable[dict], chunk_size: Optional[int] = None) -> List[Snapshot]:
+        snapshots = list(snapshots)
+        return await self._run(lambda store: store.save_snapshots(snapshots, chunk_size))
+
+    async def get_latest(self, url: str) -> Optional[Snapshot]:
+        return await self._run(lambda store: store.get_latest_snapshot(url))
+
+    async def get_latest_many(self, urls: Iterable[str]) -> Dict[str, Snapshot]:
+        urls = list(urls)
+        return await self._run(lambda store: store.get_latest_snapshots(urls))
+
+    async def load_payload(self, snapshot: Snapshot) -> None:
+        if not isinstance(snapshot, Snapshot) or snapshot.id is None:
+            return
+        if snapshot.__dict__.get('_preloaded_payload') is not None:
+            return
+
+        def operation(store: SnapshotStore) -> Optional[Dict[str, Optional[str]]]:
+            stored = store.session.get(Snapshot, snapshot.id)
+            return _read_payload(stored) if stored is not None else None
+        payload = await self._run(operation)
+        if payload is not None:
+            snapshot.preload_payload(payload)
+
+    async def get_latest_fingerprints(self) -> Dict[str, str]:
+        return await self._run(lambda store: store.get_latest_fingerprints())
+
+    async def get_history(self, url: str, limit: int = 10) -> List[Snapshot]:
+        return await self._run(lambda store: store.get_snapshot_history(url, limit))
+
+    async def get_all_urls(self) -> List[str]:
+        return await self._run(lambda store: store.get_all_urls())
+
+    async def get_with_changes(self, days: int = 7) -> List[Snapshot]:
+        # Для дайджеста нужны только метаданные; содержимое остаётся незагруженным
+        return await self._run(lambda store: store.get_snapshots_with_changes(days))
+
+    async def close(self) -> None:
+        await self._engine.dispose()
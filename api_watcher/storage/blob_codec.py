@@ -0,0 +1,70 @@
+"""
+Compression codecs for snapshot blobs
+Сжатие содержимого снэпшотов (zlib из stdlib, zstd при наличии zstandard)
+"""
+
+import hashlib
+import zlib
+from typing import Optional
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    zstandard = None
+    ZSTD_AVAILABLE = False
+
+CODEC_NONE = 'none'
+CODEC_ZLIB = 'zlib'
+CODEC_ZSTD = 'zstd'
+
+
+def resolve_codec(codec: str) -> str:
+    """Кодек для новых блобов: zstd без установленного zstandard откатывается на zlib"""
+    codec = (codec or CODEC_ZLIB).lower()
+    if codec == CODEC_ZSTD and not ZSTD_AVAILABLE:
+        return CODEC_ZLIB
+    if codec not in (CODEC_NONE, CODEC_ZLIB, CODEC_ZSTD):
+        return CODEC_ZLIB
+    return codec
+
+
+def compress(value: Optional[str], codec: str, level: int = 6) -> Optional[bytes]:
+    """Сжимает строку; None остаётся None"""
+    if value is None:
+        return None
+    data = value.encode('utf-8')
+    if codec == CODEC_ZLIB:
+        return zlib.compress(data, level)
+    if codec == CODEC_ZSTD:
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    return data
+
+
+def decompress(data: Optional[bytes], codec: str) -> Optional[str]:
+    """Распаковывает строку, сжатую compress()"""
+    if data is None:
+        return None
+    if codec == CODEC_ZLIB:
+        data = zlib.decompress(data)
+    elif codec == CODEC_ZSTD:
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError("zstandard is required to read zstd-compressed snapshots")
+        data = zstandard.ZstdDecompressor().decompress(data)
+    return data.decode('utf-8')
+
+
+def blob_hash(*parts: Optional[str]) -> str:
+    """
+    Адрес блоба: sha256 по всем полям содержимого.
+    None и пустая строка различаются, чтобы блоб восстанавливался без потерь.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        if part is None:
+            digest.update(b'\x00')
+        else:
+            encoded = part.encode('utf-8')
+            digest.update(b'\x01' + len(encoded).to_bytes(8, 'big'))
+            digest.update(encoded)
+    return digest.hexdigest()
@@ -3,18 +3,67 @@ Database models and manager for API Watcher
 Хранит HTML-снэпшоты с историей изменений
 """
 
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Boolean
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy import (
+    create_engine, inspect, text, Column, Integer, String, Text, DateTime, Boolean, LargeBinary, ForeignKey, Index
+)
+from sqlalchemy.orm import Session, sessionmaker, declarative_base, relationship, deferred
 from datetime import datetime
-from typing import Optional, List
+from typing import Dict, Iterable, Optional, List
 import json
 
+from api_watcher.config import Config
+from api_watcher.storage import blob_codec
+from api_watcher.storage.delta import make_delta, apply_delta
+
 Base = declarative_base()
 
 
+class SnapshotBlob(Base):
+    """
+    Сжатое содержимое снэпшота (content-addressed).
+    Одинаковый контент (другой якорь той же страницы, неизменившаяся версия) хранится один раз.
+    
+    Блоб с base_hash хранит не содержимое, а дельты полей относительно базового блоба
+    (предыдущей версии); chain_length — число дельт до ближайшего полного блоба (keyframe).
+    """
+    __tablename__ = 'snapshot_blobs'
+    
+    # sha256 по всем полям содержимого (см. blob_codec.blob_hash)
+    content_hash = Column(String(64), primary_key=True)
+    codec = Column(String(20), nullable=False, default=blob_codec.CODEC_ZLIB)
+    
+    # Поля грузятся по отдельности и только при обращении: HTML-сравнению не нужен text_content
+    raw_html = deferred(Column(LargeBinary))
+    text_content = deferred(Column(LargeBinary))
+    structured_data = deferred(Column(LargeBinary))
+    
+    # Несжатый и сжатый размер (байт) — для статистики
+    raw_size = Column(Integer)
+    stored_size = Column(Integer)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    base_hash = Column(String(64), ForeignKey('snapshot_blobs.content_hash'))
+    chain_length = Column(Integer, default=0)
+    base = relationship('SnapshotBlob', remote_side=[content_hash], lazy='select')
+    
+    def payload(self, field: str) -> Optional[str]:
+        """Распакованное поле; дельты применяются к восстановленной базе (результат кэшируется)"""
+        cache = self.__dict__.setdefault('_payload_cache', {})
+        if field not in cache:
+            value = blob_codec.decompress(getattr(self, field), self.codec)
+            if self.base_hash is not None and value is not None:
+                value = apply_delta(self.base.payload(field) or '', value)
+            cache[field] = value
+        return cache[field]
+
+
 class Snapshot(Base):
     """Модель для хранения HTML-снэпшотов"""
     __tablename__ = 'snapshots'
+    __table_args__ = (
+        # История URL по времени без сортировки всей таблицы
+        Index('ix_snapshots_url_created_at', 'url', 'created_at'),
+    )
     
     id = Column(Integer, primary_key=True)
     url = Column(String(500), nullable=False, index=True)
@@ -22,14 +71,15 @@ class Snapshot(Base):
     method_name = Column(String(200))
     content_type = Column(String(50))  # html, openapi, json, etc.
     
-    # Сырой HTML контент
-    raw_html = Column(Text)
-    
-    # Текстовая версия для AI
-    text_content = Column(Text)
+    # Содержимое старых снэпшотов (до snapshot_blobs); новые хранят его в блобе.
+    # Тяжёлые колонки отложены: при совпадении content_hash они не читаются вовсе
+    _raw_html = deferred(Column('raw_html', Text), group='payload')
+    _text_content = deferred(Column('text_content', Text), group='payload')
+    _structured_data = deferred(Column('structured_data', Text), group='payload')  # JSON string
     
-    # Структурированные данные (для OpenAPI, JSON)
-    structured_data = Column(Text)  # JSON string
+    # Ссылка на сжатое содержимое
+    blob_hash = Column(String(64), ForeignKey('snapshot_blobs.content_hash'), index=True)
+    blob = relationship(SnapshotBlob, lazy='select')
     
     # Метаданные
     created_at = Column(DateTime, default=datetime.utcnow, index=True)
@@ -38,18 +88,193 @@ class Snapshot(Base):
     
     # Хеш для быстрого сравнения
     content_hash = Column(String(64))
+    # SimHash нормализованного текста (hex): похожесть версий и дубликаты страниц без чтения содержимого
+    simhash = Column(String(16))
+    # Формат text_content (SmartComparator.text_version): совпадает — текст переиспользуется без html2text
+    text_version = Column(String(40))
+    
+    def _payload(self, field: str) -> Optional[str]:
+        """Поле содержимого: из блоба или из старых колонок"""
+        preloaded = self.__dict__.get('_preloaded_payload')
+        if preloaded is not None:
+            return preloaded.get(field)
+        if self.blob_hash is None:
+            return getattr(self, f'_{field}')
+        return self.blob.payload(field)
+    
+    def preload_payload(self, payload: Dict[str, Optional[str]]) -> None:
+        """
+        Подставляет содержимое, прочитанное в другой сессии: отсоединённый объект
+        (асинхронный репозиторий) не может лениво загрузить отложенные колонки
+        """
+        self.__dict__['_preloaded_payload'] = payload
 
+    @property
+    def raw_html(self) -> Optional[str]:
+        """Сырой HTML контент"""
+        return self._payload('raw_html')
+    
+    @property
+    def text_content(self) -> Optional[str]:
+        """Текстовая версия для AI"""
+        return self._payload('text_content')
+    
+    @property
+    def structured_data(self) -> Optional[str]:
+        """Структурированные данные (для OpenAPI, JSON), JSON string"""
+        return self._payload('structured_data')
 
-class DatabaseManager:
-    """Менеджер для работы с БД"""
+
+class LatestSnapshot(Base):
+    """Указатель на последний снэпшот URL: обновляется в одной транзакции с сохранением"""
+    __tablename__ = 'latest_snapshots'
     
-    def __init__(self, database_url: str):
-        self.engine = create_engine(database_url)
-        Base.metadata.create_all(self.engine)
-        Session = sessionmaker(bind=self.engine)
-        self.session = Session()
+    url = Column(String(500), primary_key=True)
+    snapshot_id = Column(Integer, ForeignKey('snapshots.id'), nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+# Колонки, добавленные после первого релиза таблиц: (таблица, колонка, DDL)
+_ADDED_COLUMNS = [
+    ('snapshots', 'blob_hash', 'VARCHAR(64)'),
+    ('snapshot_blobs', 'base_hash', 'VARCHAR(64)'),
+    ('snapshot_blobs', 'chain_length', 'INTEGER DEFAULT 0'),
+    ('snapshots', 'simhash', 'VARCHAR(16)'),
+    ('snapshots', 'text_version', 'VARCHAR(40)'),
+]
+
+# Ограничение числа параметров в одном IN (SQLite: 999 по умолчанию в старых сборках)
+_IN_CHUNK_SIZE = 500
+
+STORAGE_MODE_FULL = 'full'
+STORAGE_MODE_DELTA = 'delta'
+
+
+def _stored_size(fields: dict) -> int:
+    return sum(len(value) for value in fields.values() if value)
+
+
+def init_schema(conn) -> None:
+    """
+    Создаёт таблицы и добавляет колонки, появившиеся после их создания (create_all их не добавляет).
+    conn — синхронное соединение (для AsyncEngine вызывается через run_sync).
+    """
+    Base.metadata.create_all(conn)
     
-    def save_snapshot(
+    inspector = inspect(conn)
+    for table, column, ddl in _ADDED_COLUMNS:
+        columns = {c['name'] for c in inspector.get_columns(table)}
+        if column not in columns:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+    
+    for index in Snapshot.__table__.indexes:
+        index.create(conn, checkfirst=True)
+    
+    # Указатели для БД, созданных до latest_snapshots: последний снэпшот каждого URL
+    has_pointers = conn.execute(text("SELECT 1 FROM latest_snapshots LIMIT 1")).first()
+    if not has_pointers:
+        conn.execute(text(
+            "INSERT INTO latest_snapshots (url, snapshot_id) "
+            "SELECT s.url, MAX(s.id) FROM snapshots s "
+            "WHERE s.created_at = (SELECT MAX(created_at) FROM snapshots WHERE url = s.url) "
+            "GROUP BY s.url"
+        ))
+
+
+class SnapshotStore:
+    """
+    Операции со снэпшотами поверх синхронной Session.
+    Не владеет соединением: DatabaseManager передаёт свою сессию, асинхронный
+    репозиторий — сессию из AsyncSession.run_sync.
+    """
+    
+    def __init__(
+        self,
+        session: Session,
+        compression: Optional[str] = None,
+        storage_mode: Optional[str] = None,
+        keyframe_interval: Optional[int] = None
+    ):
+        self.session = session
+        self.codec = blob_codec.resolve_codec(
+            compression or getattr(Config, "SNAPSHOT_COMPRESSION", blob_codec.CODEC_ZLIB)
+        )
+        self.compression_level = int(getattr(Config, "SNAPSHOT_COMPRESSION_LEVEL", 6))
+        # full: каждый блоб целиком; delta: keyframe раз в keyframe_interval версий, между ними дельты
+        self.storage_mode = (storage_mode or getattr(Config, "SNAPSHOT_STORAGE_MODE", STORAGE_MODE_FULL)).lower()
+        self.keyframe_interval = max(1, int(
+            keyframe_interval if keyframe_interval is not None else getattr(Config, "SNAPSHOT_KEYFRAME_INTERVAL", 10)
+        ))
+        self.delta_max_tokens = max(1, int(getattr(Config, "SNAPSHOT_DELTA_MAX_TOKENS", 400)))
+    
+    def _compress_fields(self, fields: dict) -> dict:
+        return {
+            name: blob_codec.compress(value, self.codec, self.compression_level)
+            for name, value in fields.items()
+        }
+    
+    def _delta_fields(self, base: SnapshotBlob, fields: dict) -> Optional[dict]:
+        """Сжатые дельты полей относительно base; None, если цепочка уже длиной в интервал keyframe"""
+        if (base.chain_length or 0) + 1 >= self.keyframe_interval:
+            return None
+        return self._compress_fields({
+            name: make_delta(base.payload(name) or '', value, self.delta_max_tokens) if value is not None else None
+            for name, value in fields.items()
+        })
+    
+    def _get_blob(self, key: str, pending: Dict[str, SnapshotBlob]) -> Optional[SnapshotBlob]:
+        """Блоб по адресу: сначала среди ещё не записанных в этом пакете, затем в БД"""
+        return pending.get(key) or self.session.get(SnapshotBlob, key)
+    
+    def _store_blob(
+        self,
+        raw_html: Optional[str],
+        text_content: Optional[str],
+        structured_data: Optional[str],
+        base_hash: Optional[str] = None,
+        pending: Optional[Dict[str, SnapshotBlob]] = None
+    ) -> str:
+        """
+        Возвращает адрес блоба с этим содержимым, создавая блоб только если его ещё нет.
+        С base_hash (режим delta) блоб хранится дельтой, если она меньше полного блоба.
+        pending — блобы, добавленные в сессию, но ещё не записанные (пакетное сохранение).
+        """
+        pending = {} if pending is None else pending
+        key = blob_codec.blob_hash(raw_html, text_content, structured_data)
+        if self._get_blob(key, pending) is not None:
+            return key
+        
+        fields = {'raw_html': raw_html, 'text_content': text_content, 'structured_data': structured_data}
+        stored = self._compress_fields(fields)
+        extra = {'chain_length': 0}
+        
+        base = self._get_blob(base_hash, pending) if base_hash else None
+        if base is not None:
+            deltas = self._delta_fields(base, fields)
+            if deltas is not None and _stored_size(deltas) < _stored_size(stored):
+                stored = deltas
+                extra = {'base_hash': base.content_hash, 'base': base, 'chain_length': (base.chain_length or 0) + 1}
+        
+        blob = SnapshotBlob(
+            content_hash=key,
+            codec=self.codec,
+            raw_size=sum(len(v.encode('utf-8')) for v in fields.values() if v),
+            stored_size=_stored_size(stored),
+            **stored,
+            **extra
+        )
+        self.session.add(blob)
+        pending[key] = blob
+        return key
+    
+    def _latest_blob_hash(self, url: str) -> Optional[str]:
+        row = self.session.query(Snapshot.blob_hash)\
+            .join(LatestSnapshot, LatestSnapshot.snapshot_id == Snapshot.id)\
+            .filter(LatestSnapshot.url == url)\
+            .first()
+        return row[0] if row else None
+    
+    def _add_snapshot(
         self,
         url: str,
         raw_html: str,
@@ -60,38 +285,161 @@ class DatabaseManager:
         structured_data: Optional[dict] = None,
         content_hash: Optional[str] = None,
         has_changes: bool = False,
-        ai_summary: Optional[str] = None
+        ai_summary: Optional[str] = None,
+        simhash: Optional[str] = None,
+        text_version: Optional[str] = None,
+        base_hash: Optional[str] = None,
+        pending: Optional[Dict[str, SnapshotBlob]] = None
     ) -> Snapshot:
-        """Сохраняет новый снэпшот в БД"""
+        """Добавляет снэпшот и его блоб в сессию без записи в БД"""
+        blob_hash = self._store_blob(
+            raw_html,
+            text_content,
+            json.dumps(structured_data) if structured_data else None,
+            base_hash=base_hash,
+            pending=pending
+        )
         snapshot = Snapshot(
             url=url,
             api_name=api_name,
             method_name=method_name,
             content_type=content_type,
-            raw_html=raw_html,
-            text_content=text_content,
-            structured_data=json.dumps(structured_data) if structured_data else None,
+            blob_hash=blob_hash,
             content_hash=content_hash,
             has_changes=has_changes,
-            ai_summary=ai_summary
+            ai_summary=ai_summary,
+            simhash=simhash,
+            text_version=text_version
         )
-        
         self.session.add(snapshot)
-        self.session.commit()
         return snapshot
     
+    def _commit_snapshots(self, snapshots: List[Snapshot]) -> None:
+        """
+        Записывает добавленные снэпшоты и переводит на них указатели latest_snapshots.
+        Всё в одной транзакции: при сбое указатель не может ссылаться на незаписанный снэпшот.
+        """
+        try:
+            self.session.flush()
+            latest = {snapshot.url: snapshot.id for snapshot in snapshots}
+            for url, snapshot_id in latest.items():
+                self.session.merge(LatestSnapshot(url=url, snapshot_id=snapshot_id))
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+    
+    def save_snapshot(
+        self,
+        url: str,
+        raw_html: str,
+        text_content: str,
+        api_name: Optional[str] = None,
+        method_name: Optional[str] = None,
+        content_type: str = 'html',
+        structured_data: Optional[dict] = None,
+        content_hash: Optional[str] = None,
+        has_changes: bool = False,
+        ai_summary: Optional[str] = None,
+        simhash: Optional[str] = None,
+        text_version: Optional[str] = None
+    ) -> Snapshot:
+        """Сохраняет новый снэпшот в БД (содержимое — в сжатый блоб)"""
+        base_hash = self._latest_blob_hash(url) if self.storage_mode == STORAGE_MODE_DELTA else None
+        try:
+            snapshot = self._add_snapshot(
+                url=url,
+                raw_html=raw_html,
+                text_content=text_content,
+                api_name=api_name,
+                method_name=method_name,
+                content_type=content_type,
+                structured_data=structured_data,
+                content_hash=content_hash,
+                has_changes=has_changes,
+                ai_summary=ai_summary,
+                simhash=simhash,
+                text_version=text_version,
+                base_hash=base_hash
+            )
+        except Exception:
+            self.session.rollback()
+            raise
+        self._commit_snapshots([snapshot])
+        return snapshot
+    
+    def save_snapshots(self, snapshots: Iterable[dict], chunk_size: Optional[int] = None) -> List[Snapshot]:
+        """
+        Пакетное сохранение: snapshots — аргументы save_snapshot() в виде словарей.
+        
+        Каждые chunk_size снэпшотов пишутся одной транзакцией (INSERT пачкой вместо
+        отдельного commit на каждый URL). Транзакции чанков независимы: при сбое
+        записанными остаются целые чанки, остальное откатывается без следа.
+        """
+        snapshots = list(snapshots)
+        chunk_size = max(1, int(
+            chunk_size if chunk_size is not None else getattr(Config, "SNAPSHOT_WRITE_BATCH_SIZE", 100)
+        ))
+        saved: List[Snapshot] = []
+        for start in range(0, len(snapshots), chunk_size):
+            chunk = snapshots[start:start + chunk_size]
+            bases: Dict[str, Optional[str]] = {}
+            if self.storage_mode == STORAGE_MODE_DELTA:
+                bases = {url: latest.blob_hash for url, latest in self.get_latest_snapshots(
+                    item['url'] for item in chunk
+                ).items()}
+            pending: Dict[str, SnapshotBlob] = {}
+            added = []
+            try:
+                # Без autoflush: проверки существующих блобов не должны записывать пакет по одному
+                with self.session.no_autoflush:
+                    for item in chunk:
+                        snapshot = self._add_snapshot(
+                            **item, base_hash=bases.get(item['url']), pending=pending
+                        )
+                        # Следующая версия того же URL в пакете — дельта от этой
+                        bases[item['url']] = snapshot.blob_hash
+                        added.append(snapshot)
+            except Exception:
+                self.session.rollback()
+                raise
+            self._commit_snapshots(added)
+            saved.extend(added)
+        return saved
+    
     def get_latest_snapshot(self, url: str) -> Optional[Snapshot]:
-        """Получает последний снэпшот для URL"""
+        """Получает последний снэпшот для URL (по указателю latest_snapshots)"""
         return self.session.query(Snapshot)\
-            .filter(Snapshot.url == url)\
-            .order_by(Snapshot.created_at.desc())\
+            .join(LatestSnapshot, LatestSnapshot.snapshot_id == Snapshot.id)\
+            .filter(LatestSnapshot.url == url)\
             .first()
     
+    def get_latest_snapshots(self, urls: Iterable[str]) -> Dict[str, Snapshot]:
+        """Последние снэпшоты для набора URL одним запросом (на каждые 500 URL): {url: snapshot}"""
+        urls = list(dict.fromkeys(urls))
+        latest: Dict[str, Snapshot] = {}
+        for start in range(0, len(urls), _IN_CHUNK_SIZE):
+            chunk = urls[start:start + _IN_CHUNK_SIZE]
+            rows = self.session.query(Snapshot)\
+                .join(LatestSnapshot, LatestSnapshot.snapshot_id == Snapshot.id)\
+                .filter(LatestSnapshot.url.in_(chunk))\
+                .all()
+            latest.update((snapshot.url, snapshot) for snapshot in rows)
+        return latest
+    
+    def get_latest_fingerprints(self) -> Dict[str, str]:
+        """SimHash последних снэпшотов всех URL (только метаданные): {url: simhash}"""
+        rows = self.session.query(Snapshot.url, Snapshot.simhash)\
+            .join(LatestSnapshot, LatestSnapshot.snapshot_id == Snapshot.id)\
+            .filter(Snapshot.simhash.isnot(None))\
+            .all()
+        return {url: fingerprint for url, fingerprint in rows}
+    
     def get_snapshot_history(self, url: str, limit: int = 10) -> List[Snapshot]:
         """Получает историю снэпшотов для URL"""
         return self.session.query(Snapshot)\
             .filter(Snapshot.url == url)\
-            .order_by(Snapshot.created_at.desc())\
+            .order_by(Snapshot.created_at.desc(), Snapshot.id.desc())\
             .limit(limit)\
             .all()
     
@@ -111,6 +459,26 @@ class DatabaseManager:
             .order_by(Snapshot.created_at.desc())\
             .all()
     
+
+
+class DatabaseManager(SnapshotStore):
+    """Менеджер для работы с БД"""
+    
+    def __init__(
+        self,
+        database_url: str,
+        compression: Optional[str] = None,
+        storage_mode: Optional[str] = None,
+        keyframe_interval: Optional[int] = None
+    ):
+        self.engine = create_engine(database_url)
+        with self.engine.begin() as conn:
+            init_schema(conn)
+        # Снэпшоты после вставки не меняются: не сбрасываем загруженные объекты на каждом commit,
+        # иначе предзагруженные baseline цикла перечитывались бы по одному после каждого сохранения
+        session_factory = sessionmaker(bind=self.engine, expire_on_commit=False)
+        super().__init__(session_factory(), compression, storage_mode, keyframe_interval)
+    
     def close(self):
         """Закрывает соединение с БД"""
         self.session.close()
@@ -0,0 +1,139 @@
+"""
+Text deltas for snapshot history
+Дельта между версиями: ссылки на диапазоны токенов базы + вставленный текст
+"""
+
+import json
+import re
+from bisect import bisect_left
+from difflib import SequenceMatcher
+from collections import Counter
+from typing import List, Tuple, Union
+
+# Токен заканчивается переводом строки или '>': минифицированный HTML тоже режется на теги
+_TOKEN_RE = re.compile(r'(?<=[\n>])')
+
+# Наибольший участок без уникальных якорей, который сравнивается SequenceMatcher (квадратичным в худшем случае)
+DEFAULT_MAX_TOKENS = 400
+
+
+def _tokens(value: str) -> List[str]:
+    if '\x00' in value:
+        return [token for token in _TOKEN_RE.split(value) if token]
+    # Те же границы, что у _TOKEN_RE, но через str.replace/split (в разы быстрее на больших страницах)
+    return [token for token in value.replace('\n', '\n\x00').replace('>', '>\x00').split('\x00') if token]
+
+
+def _anchors(a: List[str], b: List[str], alo: int, ahi: int, blo: int, bhi: int) -> List[Tuple[int, int]]:
+    """
+    Якоря patience diff: токены, встречающиеся ровно один раз в обоих участках,
+    в наибольшей возрастающей подпоследовательности (порядок сохраняется в обеих версиях)
+    """
+    a_part, b_part = a[alo:ahi], b[blo:bhi]
+    # Counter и dict(zip(...)) считаются в C; позиция уникального токена — его единственное вхождение
+    a_counts, b_counts = Counter(a_part), Counter(b_part)
+    a_pos, b_pos = dict(zip(a_part, range(alo, ahi))), dict(zip(b_part, range(blo, bhi)))
+    pairs = sorted(
+        (a_pos[token], b_pos[token])
+        for token, count in a_counts.items()
+        if count == 1 and b_counts.get(token) == 1
+    )
+
+    # LIS по j за O(k log k)
+    tails: List[int] = []
+    tail_index: List[int] = []
+    previous = [-1] * len(pairs)
+    for k, (_, j) in enumerate(pairs):
+        pos = bisect_left(tails, j)
+        if pos == len(tails):
+            tails.append(j)
+            tail_index.append(k)
+        else:
+            tails[pos] = j
+            tail_index[pos] = k
+        previous[k] = tail_index[pos - 1] if pos else -1
+    result = []
+    k = tail_index[-1] if tail_index else -1
+    while k != -1:
+        result.append(pairs[k])
+        k = previous[k]
+    return result[::-1]
+
+
+def _matching_blocks(a: List[str], b: List[str], max_tokens: int) -> List[Tuple[int, int, int]]:
+    """
+    Совпадающие участки (i, j, n) a и b: общие начало и конец, затем patience diff по
+    уникальным строкам/тегам; только короткие участки без якорей идут в SequenceMatcher.
+    Участок длиннее max_tokens без якорей считается заменённым целиком.
+    """
+    blocks: List[Tuple[int, int, int]] = []
+    stack = [(0, len(a), 0, len(b))]
+    while stack:
+        alo, ahi, blo, bhi = stack.pop()
+        prefix = 0
+        while alo + prefix < ahi and blo + prefix < bhi and a[alo + prefix] == b[blo + prefix]:
+            prefix += 1
+        if prefix:
+            blocks.append((alo, blo, prefix))
+            alo, blo = alo + prefix, blo + prefix
+        suffix = 0
+        while alo < ahi - suffix and blo < bhi - suffix and a[ahi - 1 - suffix] == b[bhi - 1 - suffix]:
+            suffix += 1
+        if suffix:
+            blocks.append((ahi - suffix, bhi - suffix, suffix))
+            ahi, bhi = ahi - suffix, bhi - suffix
+        if alo >= ahi or blo >= bhi:
+            continue
+
+        anchors = _anchors(a, b, alo, ahi, blo, bhi)
+        if anchors:
+            for i, j in anchors:
+                blocks.append((i, j, 1))
+            bounds = [(alo - 1, blo - 1)] + anchors + [(ahi, bhi)]
+            for (i1, j1), (i2, j2) in zip(bounds, bounds[1:]):
+                stack.append((i1 + 1, i2, j1 + 1, j2))
+        elif (ahi - alo) + (bhi - blo) <= max_tokens:
+            matcher = SequenceMatcher(None, a[alo:ahi], b[blo:bhi], autojunk=False)
+            blocks.extend((alo + i, blo + j, n) for i, j, n in matcher.get_matching_blocks() if n)
+    return sorted(blocks)
+
+
+def make_delta(base: str, target: str, max_tokens: int = DEFAULT_MAX_TOKENS) -> str:
+    """
+    Строит дельту target относительно base.
+
+    Формат — JSON-список операций: [i1, i2] копирует токены base[i1:i2], строка вставляется как есть.
+    Время почти линейное по числу токенов (см. _matching_blocks): diff больших спецификаций
+    не держит event loop. Если версия переписана целиком, дельта получается не меньше полного
+    блоба, и SnapshotStore сохраняет keyframe.
+    """
+    base_tokens = _tokens(base)
+    target_tokens = _tokens(target)
+    ops: List[Union[List[int], str]] = []
+    j = 0
+    for bi, bj, n in _matching_blocks(base_tokens, target_tokens, max_tokens) + [(len(base_tokens), len(target_tokens), 0)]:
+        if bj > j:
+            inserted = ''.join(target_tokens[j:bj])
+            if ops and isinstance(ops[-1], str):
+                ops[-1] += inserted
+            else:
+                ops.append(inserted)
+        if n:
+            if ops and isinstance(ops[-1], list) and ops[-1][1] == bi:
+                ops[-1][1] = bi + n
+            else:
+                ops.append([bi, bi + n])
+        j = bj + n
+    return json.dumps(ops, ensure_ascii=False, separators=(',', ':'))
+
+
+def apply_delta(base: str, delta: str) -> str:
+    """Восстанавливает target из base и дельты make_delta()"""
+    base_tokens = _tokens(base)
+    parts = []
+    for op in json.loads(delta):
+        if isinstance(op, str):
+            parts.append(op)
+        else:
+            parts.append(''.join(base_tokens[op[0]:op[1]]))
+    return ''.join(parts)
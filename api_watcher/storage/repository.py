@@ -3,15 +3,31 @@ Repository pattern for API Watcher
 Абстракция над хранилищем данных
 """
 
+import inspect
 from abc import ABC, abstractmethod
-from typing import Optional, List, Protocol
+from typing import Any, Dict, Iterable, Optional, List, Protocol
 from datetime import datetime, timedelta
 
+from api_watcher.config import Config
 from api_watcher.storage.database import Snapshot, DatabaseManager
 
 
+async def resolve(result: Any) -> Any:
+    """
+    Результат вызова репозитория из async-кода.
+    У асинхронных реализаций методы — корутины, у синхронных — готовые значения.
+    """
+    if inspect.isawaitable(result):
+        return await result
+    return result
+
+
 class SnapshotRepository(ABC):
-    """Абстрактный репозиторий для работы со снэпшотами"""
+    """
+    Абстрактный репозиторий для работы со снэпшотами.
+    Асинхронные реализации (AsyncSQLAlchemySnapshotRepository) определяют те же методы
+    как корутины; async-код вызывает их через resolve().
+    """
     
     @abstractmethod
     def save(
@@ -25,21 +41,58 @@ class SnapshotRepository(ABC):
         structured_data: Optional[dict] = None,
         content_hash: Optional[str] = None,
         has_changes: bool = False,
-        ai_summary: Optional[str] = None
+        ai_summary: Optional[str] = None,
+        simhash: Optional[str] = None,
+        text_version: Optional[str] = None
     ) -> Snapshot:
         """Сохраняет снэпшот"""
         pass
     
+    def save_many(self, snapshots: Iterable[dict], chunk_size: Optional[int] = None) -> List[Snapshot]:
+        """
+        Сохраняет пакет снэпшотов (аргументы save() в виде словарей).
+        Реализации с БД переопределяют это записью чанками по chunk_size в одной транзакции.
+        """
+        return [self.save(**snapshot) for snapshot in snapshots]
+    
     @abstractmethod
     def get_latest(self, url: str) -> Optional[Snapshot]:
         """Получает последний снэпшот для URL"""
         pass
     
+    def get_latest_many(self, urls: Iterable[str]) -> Dict[str, Snapshot]:
+        """
+        Последние снэпшоты для набора URL: {url: snapshot}, URL без снэпшотов отсутствуют.
+        Реализации с БД переопределяют это одним запросом.
+        """
+        latest = {}
+        for url in urls:
+            snapshot = self.get_latest(url)
+            if snapshot is not None:
+                latest[url] = snapshot
+        return latest
+    
+    def get_latest_fingerprints(self) -> Dict[str, str]:
+        """
+        SimHash последних снэпшотов всех URL: {url: simhash}, URL без отпечатка отсутствуют.
+        Реализации с БД переопределяют это одним запросом без чтения содержимого.
+        """
+        latest = self.get_latest_many(self.get_all_urls())
+        return {url: snapshot.simhash for url, snapshot in latest.items() if getattr(snapshot, 'simhash', None)}
+    
     @abstractmethod
     def get_history(self, url: str, limit: int = 10) -> List[Snapshot]:
         """Получает историю снэпшотов"""
         pass
     
+    def load_payload(self, snapshot: Snapshot) -> None:
+        """
+        Загружает содержимое снэпшота (raw_html, text_content, structured_data) перед чтением.
+        Синхронным репозиториям это не нужно — отложенные колонки читаются лениво;
+        асинхронный читает их отдельным запросом, только когда хеш не совпал.
+        """
+        return None
+    
     @abstractmethod
     def get_all_urls(self) -> List[str]:
         """Получает все отслеживаемые URL"""
@@ -73,7 +126,9 @@ class SQLAlchemySnapshotRepository(SnapshotRepository):
         structured_data: Optional[dict] = None,
         content_hash: Optional[str] = None,
         has_changes: bool = False,
-        ai_summary: Optional[str] = None
+        ai_summary: Optional[str] = None,
+        simhash: Optional[str] = None,
+        text_version: Optional[str] = None
     ) -> Snapshot:
         return self._db.save_snapshot(
             url=url,
@@ -85,12 +140,23 @@ class SQLAlchemySnapshotRepository(SnapshotRepository):
             structured_data=structured_data,
             content_hash=content_hash,
             has_changes=has_changes,
-            ai_summary=ai_summary
+            ai_summary=ai_summary,
+            simhash=simhash,
+            text_version=text_version
         )
     
+    def save_many(self, snapshots: Iterable[dict], chunk_size: Optional[int] = None) -> List[Snapshot]:
+        return self._db.save_snapshots(snapshots, chunk_size)
+    
     def get_latest(self, url: str) -> Optional[Snapshot]:
         return self._db.get_latest_snapshot(url)
     
+    def get_latest_many(self, urls: Iterable[str]) -> Dict[str, Snapshot]:
+        return self._db.get_latest_snapshots(urls)
+    
+    def get_latest_fingerprints(self) -> Dict[str, str]:
+        return self._db.get_latest_fingerprints()
+    
     def get_history(self, url: str, limit: int = 10) -> List[Snapshot]:
         return self._db.get_snapshot_history(url, limit)
     
@@ -102,3 +168,12 @@ class SQLAlchemySnapshotRepository(SnapshotRepository):
     
     def close(self) -> None:
         self._db.close()
+
+
+def create_repository(database_url: str) -> SnapshotRepository:
+    """Репозиторий по умолчанию: асинхронный при API_WATCHER_DATABASE_ASYNC=true"""
+    if Config.DATABASE_ASYNC:
+        # Опциональная зависимость (sqlalchemy[asyncio] + aiosqlite/asyncpg): импорт только когда включено
+        from api_watcher.storage.async_repository import AsyncSQLAlchemySnapshotRepository
+        return AsyncSQLAlchemySnapshotRepository(database_url)
+    return SQLAlchemySnapshotRepository(database_url)
@@ -0,0 +1,113 @@
+"""
+Тесты пакетного AI-анализа
+"""
+
+import json
+
+import pytest
+from unittest.mock import Mock
+
+from api_watcher.config import Config
+from api_watcher.services.change_detector import ChangeDetector
+from api_watcher.storage.repository import SnapshotRepository
+from api_watcher.utils.ai_cache import AIAnalysisCache
+from api_watcher.utils.compute_pool import ComputePool
+from api_watcher.utils.openrouter_analyzer import OpenRouterAnalyzer
+
+
+def _verdict(summary, significant=True):
+    return {'has_significant_changes': significant, 'summary': summary, 'severity': 'moderate', 'key_changes': []}
+
+
+class TestBatchResponse:
+
+    def test_batch_prompt_lists_every_change(self):
+        analyzer = OpenRouterAnalyzer(api_key="test-key")
+        prompt = analyzer._batch_messages([
+            ("limit: 100", "limit: 10", "Slack", "chat.postMessage"),
+            ("scope: read", "scope: write", "HubSpot", None),
+        ])[0]['content']
+
+        assert "### ИЗМЕНЕНИЕ 1\nAPI: Slack, Method: chat.postMessage" in prompt
+        assert "+limit: 10" in prompt and "+scope: write" in prompt
+
+    def test_verdicts_are_matched_by_id(self):
+        analyzer = OpenRouterAnalyzer(api_key="test-key")
+        response = "```json\n" + json.dumps({"results": [
+            {"id": 3, "has_significant_changes": False, "summary": "typo"},
+            {"id": 1, "summary": "new param"},
+            {"id": 7, "summary": "unknown id"},
+        ]}) + "\n```"
+
+        verdicts = analyzer._parse_batch_response(response, 3)
+
+        assert verdicts[0]['summary'] == "new param" and verdicts[0]['has_significant_changes'] is True
+        assert verdicts[1] is None
+        assert verdicts[2]['has_significant_changes'] is False
+
+    def test_unparseable_response(self):
+        analyzer = OpenRouterAnalyzer(api_key="test-key")
+        assert analyzer._parse_batch_response("not json", 2) == [None, None]
+        assert analyzer._parse_batch_response(None, 2) == [None, None]
+
+
+class TestAnalyzeMany:
+
+    @pytest.fixture
+    def detector(self, temp_dir, monkeypatch):
+        monkeypatch.setattr(Config, 'SNAPSHOTS_DIR', temp_dir)
+        analyzer = Mock(spec=['analyze_changes', 'analyze_changes_batch', 'model'])
+        analyzer.model = 'test-model'
+        return ChangeDetector(
+            Mock(spec=SnapshotRepository), Mock(), ai_analyzer=analyzer,
+            compute_pool=ComputePool(max_workers=0),
+            ai_cache=AIAnalysisCache(ttl_seconds=3600, max_entries=10)
+        )
+
+    async def _detections(self, detector, count):
+        old = Mock(content_hash='old', raw_html="Rate limit: 100 rps")
+        return [
+            await detector.compare(old, f"Rate limit: {n} rps", 'html_section', f"https://a.com/{n}", "API", None)
+            for n in range(count)
+        ]
+
+    @pytest.mark.asyncio
+    async def test_one_request_and_single_fallback(self, detector):
+        detections = await self._detections(detector, 3)
+        detector.ai_analyzer.analyze_changes_batch.return_value = [
+            _verdict("first"), None, _verdict("cosmetic", significant=False)
+        ]
+        detector.ai_analyzer.analyze_changes.return_value = _verdict("second")
+
+        await detector.analyze_many(detections)
+
+        detector.ai_analyzer.analyze_changes_batch.assert_called_once()
+        assert len(detector.ai_analyzer.analyze_changes_batch.call_args.args[0]) == 3
+        detector.ai_analyzer.analyze_changes.assert_called_once()
+        assert [d.result.get('summary') for d in detections] == ["first", "second", None]
+        assert detections[2].result['reason'] == 'insignificant'
+        assert all(d.ai_task is None for d in detections)
+
+    @pytest.mark.asyncio
+    async def test_cached_verdicts_skip_the_batch(self, detector):
+        detections = await self._detections(detector, 2)
+        detector.ai_analyzer.analyze_changes_batch.return_value = [_verdict("a"), _verdict("b")]
+        await detector.analyze_many(detections)
+
+        again = await self._detections(detector, 2)
+        await detector.analyze_many(again)
+
+        detector.ai_analyzer.analyze_changes_batch.assert_called_once()
+        assert [d.result['summary'] for d in again] == ["a", "b"]
+
+    @pytest.mark.asyncio
+    async def test_analyzer_error_keeps_local_verdict(self, detector):
+        detector.ai_analyzer.analyze_changes.side_effect = RuntimeError("model unavailable")
+        old = Mock(content_hash='old', raw_html="Rate limit: 100 rps")
+
+        result = await detector.detect_changes(old, "Rate limit: 5 rps", 'html_section', "https://a.com/x", "API", None)
+
+        # Изменение не теряется: сохраняется снэпшот и уходит уведомление с локальным вердиктом
+        assert result['has_changes'] is True and result['ai_error'] is True
+        detector.repository.save.assert_called_once()
+        detector.notifiers.send_change.assert_called_once()
@@ -0,0 +1,101 @@
+"""
+Тесты кэша AI-анализа
+"""
+
+import asyncio
+import time
+
+import pytest
+from unittest.mock import Mock, patch
+
+from api_watcher.config import Config
+from api_watcher.services.change_detector import ChangeDetector
+from api_watcher.storage.repository import SnapshotRepository
+from api_watcher.utils.ai_cache import AIAnalysisCache
+from api_watcher.utils.compute_pool import ComputePool
+
+VERDICT = {'has_significant_changes': True, 'summary': 'Новый параметр', 'severity': 'moderate', 'key_changes': []}
+
+
+@pytest.fixture
+def cache_dir(temp_dir, monkeypatch):
+    monkeypatch.setattr(Config, 'SNAPSHOTS_DIR', temp_dir)
+    return temp_dir
+
+
+class TestAIAnalysisCache:
+
+    def test_key_ignores_whitespace_and_depends_on_model(self):
+        key = AIAnalysisCache.key('html', 'model-a', "old  text\n", "new text")
+        assert key == AIAnalysisCache.key('html', 'model-a', "old text", " new\ttext")
+        assert key != AIAnalysisCache.key('html', 'model-b', "old text", "new text")
+        assert key != AIAnalysisCache.key('html', 'model-a', "new text", "old text")
+
+    def test_persists_between_runs(self, cache_dir):
+        cache = AIAnalysisCache(ttl_seconds=3600, max_entries=10)
+        cache.put('k', VERDICT)
+        cache.save()
+
+        assert AIAnalysisCache(ttl_seconds=3600, max_entries=10).get('k') == VERDICT
+
+    def test_ttl(self, cache_dir):
+        cache = AIAnalysisCache(ttl_seconds=60, max_entries=10)
+        with patch('api_watcher.utils.ai_cache.time.time', return_value=1000):
+            cache.put('k', VERDICT)
+        with patch('api_watcher.utils.ai_cache.time.time', return_value=1061):
+            assert cache.get('k') is None
+        assert len(cache) == 0
+
+    def test_evicts_least_recently_used(self, cache_dir):
+        cache = AIAnalysisCache(ttl_seconds=3600, max_entries=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+        cache.put('c', 3)
+
+        assert cache.get('b') is None
+        assert cache.get('a') == 1 and cache.get('c') == 3
+
+
+class TestChangeDetectorCache:
+
+    @pytest.fixture
+    def detector(self, cache_dir):
+        analyzer = Mock(spec=['analyze_changes', 'model'])
+        analyzer.model = 'test-model'
+        analyzer.analyze_changes.return_value = VERDICT
+        return ChangeDetector(
+            Mock(spec=SnapshotRepository), Mock(), ai_analyzer=analyzer,
+            compute_pool=ComputePool(max_workers=0),
+            ai_cache=AIAnalysisCache(ttl_seconds=3600, max_entries=10)
+        )
+
+    @pytest.mark.asyncio
+    async def test_same_transition_is_analyzed_once(self, detector):
+        first = await detector._analyze_html("old", "new", "API", None)
+        second = await detector._analyze_html("old", "new", "API", "other method")
+
+        assert first == second == VERDICT
+        detector.ai_analyzer.analyze_changes.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_one_request(self, detector):
+        def slow_analysis(*args):
+            time.sleep(0.05)
+            return VERDICT
+
+        detector.ai_analyzer.analyze_changes.side_effect = slow_analysis
+        results = await asyncio.gather(*[detector._analyze_html("old", "new", None, None) for _ in range(3)])
+
+        assert results == [VERDICT] * 3
+        detector.ai_analyzer.analyze_changes.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_failed_analysis_is_not_cached(self, detector):
+        detector.ai_analyzer.analyze_changes.return_value = dict(VERDICT, ai_error=True)
+
+        await detector._analyze_html("old", "new", None, None)
+        await detector._analyze_html("old", "new", None, None)
+
+        assert detector.ai_analyzer.analyze_changes.call_count == 2
+        assert len(detector.ai_cache) == 0
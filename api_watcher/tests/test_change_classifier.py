@@ -0,0 +1,144 @@
+"""
+Тесты локального классификатора изменений
+"""
+
+import pytest
+from unittest.mock import Mock
+
+from api_watcher.config import Config
+from api_watcher.services.change_detector import ChangeDetector
+from api_watcher.storage.repository import SnapshotRepository
+from api_watcher.utils.change_classifier import (
+    AMBIGUOUS, MAJOR, MINOR, MODE_SHADOW, ChangeClassifier, classify_change
+)
+from api_watcher.utils.compute_pool import ComputePool
+
+PAGE = """## Create lead
+
+Creates a new lead in the CRM. Requests are limited to 100 per minute.
+
+Name| Type
+---|---
+lead_id| int
+email| string
+
+    curl -X POST https://api.example.com/v1/leads \\
+      -d email=user@example.com
+
+POST /v1/leads returns the created lead.
+"""
+
+
+class TestClassifyChange:
+
+    def test_whitespace_and_date_are_minor(self):
+        assert classify_change(PAGE, PAGE.replace("\n\n", "\n\n\n")).verdict == MINOR
+        decision = classify_change(PAGE + "\nUpdated 2024-01-05", PAGE + "\nUpdated March 3, 2025")
+        assert (decision.verdict, decision.reason) == (MINOR, 'date')
+
+    def test_punctuation_edit_is_minor(self):
+        decision = classify_change(PAGE, PAGE.replace("in the CRM.", "in the CRM;"))
+        assert (decision.verdict, decision.reason) == (MINOR, 'punctuation')
+
+    def test_small_wording_edit_goes_to_ai(self):
+        decision = classify_change(PAGE, PAGE.replace("Creates a new lead", "Creates new lead"))
+        assert (decision.verdict, decision.reason) == (AMBIGUOUS, 'needs_ai')
+
+    @pytest.mark.parametrize("old, new", [
+        ("Requests are limited", "Requests are not limited"),
+        ("Creates a new lead", "Creates a deprecated lead"),
+        ("returns the created lead", "must return the created lead"),
+    ])
+    def test_requirement_keywords_go_to_ai(self, old, new):
+        decision = classify_change(PAGE, PAGE.replace(old, new))
+        assert (decision.verdict, decision.reason) == (AMBIGUOUS, 'requirement_keywords')
+        assert decision.signals.keywords
+
+    def test_required_to_optional_goes_to_ai(self):
+        old = PAGE + "\nThe email field is required.\n"
+        decision = classify_change(old, old.replace("is required", "is optional"))
+        assert decision.verdict == AMBIGUOUS
+        assert decision.signals.keywords == ['optional', 'required']
+
+    def test_changed_number_is_ambiguous(self):
+        decision = classify_change(PAGE, PAGE.replace("100 per minute", "10 per minute"))
+        assert decision.verdict == AMBIGUOUS
+        assert decision.signals.numbers_changed
+
+    def test_added_parameter_is_ambiguous(self):
+        decision = classify_change(PAGE, PAGE.replace("email| string\n", "email| string\nphone_number| string\n"))
+        assert decision.verdict == AMBIGUOUS
+        assert decision.signals.added_params == ['phone_number'] and decision.signals.table_changed
+
+    def test_removed_parameter_and_endpoint_are_major(self):
+        decision = classify_change(PAGE, PAGE.replace("lead_id| int\n", "").replace("POST /v1/leads", "See below"))
+        assert decision.verdict == MAJOR
+        assert decision.signals.removed_params == ['lead_id']
+        analysis = decision.analysis()
+        assert analysis['has_significant_changes'] and analysis['severity'] == 'major'
+        assert "Удалён эндпоинт POST /v1/leads" in analysis['key_changes']
+
+    def test_rewrite_is_major(self):
+        new_page = "## Leads\n\n" + " ".join(f"word{i}" for i in range(200))
+        decision = classify_change(PAGE, new_page, major_ratio=0.5)
+        assert decision.verdict == MAJOR
+
+
+class TestChangeDetectorClassifier:
+
+    @pytest.fixture
+    def classifier(self, temp_dir, monkeypatch):
+        monkeypatch.setattr(Config, 'SNAPSHOTS_DIR', temp_dir)
+        return ChangeClassifier()
+
+    def _detector(self, classifier):
+        analyzer = Mock(spec=['analyze_changes'])
+        analyzer.analyze_changes.return_value = {
+            'has_significant_changes': True, 'summary': 'AI', 'severity': 'moderate', 'key_changes': []
+        }
+        return ChangeDetector(
+            Mock(spec=SnapshotRepository), Mock(), ai_analyzer=analyzer,
+            compute_pool=ComputePool(max_workers=0), classifier=classifier
+        )
+
+    @staticmethod
+    def _section(text):
+        return Mock(raw_html=text, content_hash='old')
+
+    @pytest.mark.asyncio
+    async def test_obvious_cases_skip_ai(self, classifier):
+        detector = self._detector(classifier)
+
+        minor = await detector.compare(self._section(PAGE), PAGE.replace("CRM.", "CRM;"), 'html_section', 'u1', 'API', None)
+        major = await detector.compare(self._section(PAGE), PAGE.replace("lead_id| int\n", ""), 'html_section', 'u2', 'API', None)
+
+        assert minor.ai_task is None and minor.result['has_changes'] is False
+        assert major.ai_task is None and major.result['severity'] == 'major'
+        assert classifier.totals == {'minor': 1, 'major': 1, 'ai_calls_saved': 2}
+
+    @pytest.mark.asyncio
+    async def test_ambiguous_goes_to_ai_and_is_logged(self, classifier):
+        detector = self._detector(classifier)
+
+        detection = await detector.compare(
+            self._section(PAGE), PAGE.replace("100 per", "10 per"), 'html_section', 'u1', 'API', None
+        )
+        await detector.analyze(detection)
+
+        detector.ai_analyzer.analyze_changes.assert_called_once()
+        assert detection.result['summary'] == 'AI'
+        classifier.save()
+        decisions = ChangeClassifier()._state['decisions']
+        assert decisions[-1]['verdict'] == AMBIGUOUS and decisions[-1]['ai_significant'] is True
+
+    @pytest.mark.asyncio
+    async def test_shadow_mode_compares_with_ai(self, classifier):
+        classifier.mode = MODE_SHADOW
+        detector = self._detector(classifier)
+
+        detection = await detector.compare(self._section(PAGE), PAGE.replace("CRM.", "CRM;"), 'html_section', 'u1', 'API', None)
+        await detector.analyze(detection)
+
+        detector.ai_analyzer.analyze_changes.assert_called_once()
+        assert detection.result['has_changes'] is True
+        assert classifier.totals == {'minor': 1, 'shadow_disagreed': 1}
@@ -0,0 +1,80 @@
+"""
+Тесты пула процессов для сравнений
+"""
+
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+
+from api_watcher.config import Config
+from api_watcher.services.change_detector import ChangeDetector
+
+from api_watcher.utils.compute_pool import (
+    ComputePool, ComputeTimeoutError, compare_html_text, compare_structured, section_index
+)
+
+
+def _sleep(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+@pytest.mark.asyncio
+class TestComputePool:
+
+    async def test_small_inputs_run_inline(self):
+        pool = ComputePool(max_workers=2, inline_threshold=1000)
+        has_changes, old_text, new_text = await pool.run(
+            compare_html_text, "<p>a</p>", "<p>b</p>", size=16
+        )
+        assert has_changes is True
+        assert pool._executor is None
+
+    async def test_structured_diff_in_worker(self):
+        pool = ComputePool(max_workers=1, inline_threshold=0)
+        try:
+            old_spec = {'paths': {'/users': {'get': {}}}}
+            new_spec = {'paths': {'/users': {'get': {}}, '/orders': {'post': {}}}}
+            has_changes, changes = await pool.run(compare_structured, 'openapi', old_spec, new_spec)
+        finally:
+            pool.shutdown()
+
+        assert has_changes is True
+        assert 'dictionary_item_added' in changes
+
+    async def test_section_index_in_worker(self):
+        pool = ComputePool(max_workers=1, inline_threshold=0)
+        try:
+            index = await pool.run(section_index, '<h2 id="a">A</h2><p>one</p><h2 id="b">B</h2><p>two</p>')
+        finally:
+            pool.shutdown()
+
+        assert index.section("a") == "A\none"
+        assert index.section("b") == "B\ntwo"
+
+    async def test_timeout_resets_pool(self):
+        pool = ComputePool(max_workers=1, task_timeout=0.5, inline_threshold=0)
+        try:
+            assert await pool.run(_sleep, 0) == 0
+            workers = list(pool._executor._processes.values())
+            with pytest.raises(ComputeTimeoutError):
+                await pool.run(_sleep, 3)
+            assert pool._executor is None
+            # Зависший воркер завершён, а не оставлен досчитывать задачу
+            assert workers and not any(worker.is_alive() for worker in workers)
+            assert await pool.run(_sleep, 0) == 0
+        finally:
+            pool.shutdown()
+
+    async def test_disabled_pool(self):
+        pool = ComputePool(max_workers=0)
+        has_changes, changes = await pool.run(compare_structured, 'json', {'a': 1}, {'a': 1}, size=10**9)
+        assert has_changes is False
+        assert changes is None
+
+    async def test_detector_without_pool_runs_inline(self):
+        with patch.object(Config, 'COMPUTE_WORKERS', 4, create=True):
+            detector = ChangeDetector(Mock(), Mock())
+        # Собственный пул детектор не создаёт: его никто бы не остановил
+        assert not detector.compute_pool.enabled
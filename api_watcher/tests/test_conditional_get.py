@@ -0,0 +1,165 @@
+"""
+Тесты условных запросов (ETag / Last-Modified)
+"""
+
+import hashlib
+
+import pytest
+from unittest.mock import Mock, MagicMock, AsyncMock, patch
+
+from api_watcher.utils.async_fetcher import AsyncFetcher, ContentFetcher, FetchResult
+from api_watcher.utils.validator_store import HTTPValidatorStore
+from api_watcher.storage.repository import SnapshotRepository
+from api_watcher.notifier.base import NotifierManager
+from api_watcher.watcher import APIWatcher
+
+
+def _mock_response(status: int, body: bytes = b"", headers: dict = None):
+    response = MagicMock()
+    response.status = status
+    response.headers = headers or {}
+    response.charset = "utf-8"
+
+    async def iter_chunked(size):
+        if body:
+            yield body
+
+    response.content.iter_chunked = iter_chunked
+    return response
+
+
+def _mock_session(response):
+    ctx = MagicMock()
+    ctx.__aenter__ = AsyncMock(return_value=response)
+    ctx.__aexit__ = AsyncMock(return_value=False)
+    session = MagicMock()
+    session.get.return_value = ctx
+    return session
+
+
+class TestHTTPValidatorStore:
+
+    def test_roundtrip(self, temp_dir):
+        with patch('api_watcher.utils.validator_store.Config') as mock_config:
+            mock_config.SNAPSHOTS_DIR = temp_dir
+            store = HTTPValidatorStore()
+            store.update("http://example.com", '"abc"', "Wed, 01 Jan 2025 00:00:00 GMT")
+            store.save()
+
+            reloaded = HTTPValidatorStore()
+
+        assert reloaded.get("http://example.com") == {
+            'etag': '"abc"',
+            'last_modified': "Wed, 01 Jan 2025 00:00:00 GMT"
+        }
+
+    def test_update_without_validators_discards(self, temp_dir):
+        with patch('api_watcher.utils.validator_store.Config') as mock_config:
+            mock_config.SNAPSHOTS_DIR = temp_dir
+            store = HTTPValidatorStore()
+        store.update("http://example.com", '"abc"', None)
+        store.update("http://example.com", None, None)
+
+        assert store.get("http://example.com") is None
+
+
+@pytest.mark.asyncio
+class TestAsyncFetcherConditional:
+
+    async def test_sends_conditional_headers_and_handles_304(self):
+        fetcher = AsyncFetcher()
+        session = _mock_session(_mock_response(304))
+
+        with patch.object(fetcher, '_get_session', new_callable=AsyncMock, return_value=session):
+            result = await fetcher.fetch("http://example.com", validators={'etag': '"abc"'})
+
+        assert result.not_modified is True
+        assert result.success is True
+        assert result.content is None
+        _, kwargs = session.get.call_args
+        assert kwargs['headers'] == {'If-None-Match': '"abc"'}
+
+    async def test_returns_validators_from_200(self):
+        fetcher = AsyncFetcher()
+        response = _mock_response(200, b"body", {'ETag': '"v2"', 'Last-Modified': 'Thu, 02 Jan 2025 00:00:00 GMT'})
+        session = _mock_session(response)
+
+        with patch.object(fetcher, '_get_session', new_callable=AsyncMock, return_value=session):
+            result = await fetcher.fetch("http://example.com")
+
+        assert result.content == "body"
+        assert result.not_modified is False
+        assert result.etag == '"v2"'
+        assert result.last_modified == 'Thu, 02 Jan 2025 00:00:00 GMT'
+        assert result.body_hash == hashlib.sha256(b"body").hexdigest()
+
+    async def test_same_body_hash_is_not_modified(self):
+        fetcher = AsyncFetcher()
+        session = _mock_session(_mock_response(200, b"body"))
+        validators = {'body_hash': hashlib.sha256(b"body").hexdigest()}
+
+        with patch.object(fetcher, '_get_session', new_callable=AsyncMock, return_value=session):
+            result = await fetcher.fetch("http://example.com", validators=validators)
+
+        assert result.not_modified is True and result.content is None
+        _, kwargs = session.get.call_args
+        assert kwargs['headers'] is None
+
+
+class TestContentFetcherValidators:
+
+    def test_commit_skips_failed_and_not_modified(self):
+        store = Mock(spec=HTTPValidatorStore)
+        fetcher = ContentFetcher(validator_store=store)
+
+        fetcher.commit_validators([
+            FetchResult(content="ok", status_code=200, success=True, url="http://a", etag='"a"'),
+            FetchResult(content=None, status_code=500, success=False, url="http://b", etag='"b"'),
+            FetchResult(content=None, status_code=304, success=True, url="http://c", not_modified=True),
+        ])
+
+        store.update.assert_called_once_with("http://a", '"a"', None, None)
+        store.save.assert_called_once()
+
+
+@pytest.mark.asyncio
+class TestWatcherNotModified:
+
+    @pytest.fixture
+    def watcher(self):
+        fetcher = Mock(spec=ContentFetcher)
+        fetcher.fetch = AsyncMock()
+        with patch('api_watcher.watcher.Config') as mock_config:
+            mock_config.is_openrouter_configured.return_value = False
+            mock_config.is_gemini_configured.return_value = False
+            return APIWatcher(
+                repository=Mock(spec=SnapshotRepository),
+                fetcher=fetcher,
+                notifier_manager=Mock(spec=NotifierManager)
+            )
+
+    async def test_304_skips_processing(self, watcher):
+        url = "http://example.com/docs"
+        watcher.fetcher.fetch.return_value = FetchResult(
+            content=None, status_code=304, success=True, url=url, not_modified=True
+        )
+        watcher.repository.get_latest.return_value = Mock()
+
+        with patch.object(watcher.change_detector, 'detect_changes') as mock_detect:
+            result = await watcher.process_url(url)
+
+        assert result == {'url': url, 'has_changes': False, 'not_modified': True}
+        mock_detect.assert_not_called()
+        watcher.repository.save.assert_not_called()
+
+    async def test_304_without_baseline_forgets_validators(self, watcher):
+        url = "http://example.com/docs#section"
+        watcher.fetcher.fetch.return_value = FetchResult(
+            content=None, status_code=304, success=True, url="http://example.com/docs", not_modified=True
+        )
+        watcher.repository.get_latest.return_value = None
+
+        result = await watcher.process_url(url)
+
+        assert 'error' in result
+        watcher.fetcher.forget_validators.assert_called_once_with("http://example.com/docs")
@@ -2,7 +2,10 @@
 Tests for ContentProcessor validation logic
 """
 
+import json
+
 import pytest
+from api_watcher.config import Config
 from api_watcher.services.content_processor import ContentProcessor
 from api_watcher.notifier.base import NotifierManager
 
@@ -148,3 +151,20 @@ class TestContentProcessorValidation:
         content = "<html><body>Test</body></html>"
         content_type = processor.detect_content_type("http://example.com/page.html", content)
         assert content_type == "html"
+    
+    def test_content_type_detection_json_with_leading_whitespace(self, processor):
+        """JSON after leading whitespace is still detected"""
+        content = '\n  \t{"data": "test"}'
+        assert processor.detect_content_type("http://api.example.com/data", content) == "json"
+        assert processor.detect_content_type("http://api.example.com/data", "   ") == "html"
+    
+    def test_large_spec_on_overridden_host_is_parsed(self, processor, monkeypatch):
+        """The JSON parse cap follows MAX_RESPONSE_BYTES_OVERRIDES"""
+        monkeypatch.setattr(Config, 'MAX_RESPONSE_BYTES', 100)
+        monkeypatch.setattr(Config, 'MAX_JSON_PARSE_CHARS', 100)
+        monkeypatch.setattr(Config, 'MAX_RESPONSE_BYTES_OVERRIDES', 'specs.example.com=10000')
+        spec = json.dumps({'openapi': '3.0.0', 'paths': {f'/items/{i}': {'get': {}} for i in range(50)}})
+        assert 100 < len(spec) < 10000
+        
+        assert processor.detect_content_type("https://specs.example.com/v1/spec", spec) == "openapi"
+        assert processor.detect_content_type("https://other.example.org/v1/spec", spec) == "html"
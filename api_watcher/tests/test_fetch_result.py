@@ -0,0 +1,132 @@
+"""
+Тесты FetchResult: тело байтами, ленивое декодирование
+"""
+
+import hashlib
+import mmap
+import os
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from api_watcher.config import Config
+from api_watcher.utils.async_fetcher import AsyncFetcher, FetchResult
+from api_watcher.utils.smart_comparator import SmartComparator
+
+PAGE = "<html><head><meta charset=\"windows-1251\"></head><body>Создание сделки</body></html>"
+
+
+def _response(body: bytes, charset=None, chunk=None):
+    response = MagicMock()
+    response.status = 200
+    response.headers = {}
+    response.charset = charset
+
+    async def iter_chunked(size):
+        step = chunk or len(body) or 1
+        for i in range(0, len(body), step):
+            yield body[i:i + step]
+
+    response.content.iter_chunked = iter_chunked
+    ctx = MagicMock()
+    ctx.__aenter__ = AsyncMock(return_value=response)
+    ctx.__aexit__ = AsyncMock(return_value=False)
+    session = MagicMock()
+    session.get.return_value = ctx
+    return session
+
+
+class TestFetchResult:
+
+    def test_decodes_once_and_drops_bytes(self):
+        result = FetchResult(content=None, status_code=200, success=True, body=bytearray("тест".encode()))
+
+        assert result.has_content and result.size == 8
+        assert result.content == "тест"
+        assert result.body is None and result.content == "тест"
+
+    def test_release_keeps_metadata(self):
+        result = FetchResult(content="page", status_code=200, success=True, etag='"a"')
+        result.release_body()
+
+        assert result.content is None and not result.has_content
+        assert result.etag == '"a"' and result.success
+
+
+@pytest.mark.asyncio
+class TestCharsetDetection:
+
+    async def test_meta_charset(self):
+        fetcher = AsyncFetcher()
+        session = _response(PAGE.encode('cp1251'))
+
+        with patch.object(fetcher, '_get_session', new_callable=AsyncMock, return_value=session):
+            result = await fetcher.fetch("http://example.com")
+
+        assert result.charset == 'cp1251'
+        assert result.body is not None
+        assert "Создание сделки" in result.content
+
+    async def test_header_charset_wins(self):
+        fetcher = AsyncFetcher()
+        session = _response("Создание".encode('utf-8'), charset='utf-8')
+
+        with patch.object(fetcher, '_get_session', new_callable=AsyncMock, return_value=session):
+            result = await fetcher.fetch("http://example.com")
+
+        assert result.content == "Создание"
+
+
+@pytest.mark.asyncio
+class TestBodySpill:
+
+    async def test_large_body_is_memory_mapped(self, temp_dir, monkeypatch):
+        monkeypatch.setattr(Config, 'SNAPSHOTS_DIR', temp_dir)
+        monkeypatch.setattr(Config, 'BODY_SPILL_BYTES', 1000)
+        page = "<html><body>" + "Создание сделки. " * 500 + "</body></html>"
+        fetcher = AsyncFetcher()
+        session = _response(page.encode('utf-8'), charset='utf-8', chunk=700)
+
+        with patch.object(fetcher, '_get_session', new_callable=AsyncMock, return_value=session):
+            result = await fetcher.fetch("http://example.com")
+
+        body = result.body
+        assert isinstance(body, mmap.mmap) and result.size == len(page.encode('utf-8'))
+        # Анонимный временный файл не остаётся в каталоге
+        assert os.listdir(os.path.join(temp_dir, '.spill')) == []
+        # Хеш посчитан по чанкам при чтении, до выгрузки на диск
+        assert result.body_hash == hashlib.sha256(page.encode('utf-8')).hexdigest()
+        assert result.content == page
+        assert result.body is None and body.closed
+
+    def test_large_text_is_hashed_in_windows(self):
+        page = "Создание сделки. " * 500
+        with patch('api_watcher.utils.smart_comparator._HASH_WINDOW_CHARS', 700):
+            windowed = SmartComparator().calculate_hash(page)
+        assert windowed == hashlib.sha256(page.encode('utf-8')).hexdigest()
+
+    async def test_small_body_stays_in_memory(self, temp_dir, monkeypatch):
+        monkeypatch.setattr(Config, 'SNAPSHOTS_DIR', temp_dir)
+        monkeypatch.setattr(Config, 'BODY_SPILL_BYTES', 1000)
+        fetcher = AsyncFetcher()
+        session = _response(b"<html>small</html>")
+
+        with patch.object(fetcher, '_get_session', new_callable=AsyncMock, return_value=session):
+            result = await fetcher.fetch("http://example.com")
+
+        assert isinstance(result.body, bytearray)
+
+
+class TestMaxResponseBytes:
+
+    def test_overrides_by_host_and_prefix(self, monkeypatch):
+        monkeypatch.setattr(Config, 'MAX_RESPONSE_BYTES', 100)
+        monkeypatch.setattr(
+            Config, 'MAX_RESPONSE_BYTES_OVERRIDES',
+            "example.com=500, https://docs.example.com/openapi=900, bad=x"
+        )
+
+        assert Config.get_max_response_bytes("https://api.example.com/v1") == 500
+        assert Config.get_max_response_bytes("https://docs.example.com/openapi.json") == 900
+        assert Config.get_max_response_bytes("https://other.com/") == 100
+        assert Config.get_max_response_bytes("https://notexample.com/") == 100
@@ -0,0 +1,107 @@
+"""
+Тесты выученных маршрутов хостов (прямой запрос / ZenRows)
+"""
+
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from api_watcher.config import Config
+from api_watcher.utils.async_fetcher import ContentFetcher, FetchResult
+from api_watcher.utils.host_router import ROUTE_ZENROWS, HostRouter
+
+URL = "https://docs.blocked.com/api/leads"
+
+
+@pytest.fixture
+def router(temp_dir, monkeypatch):
+    monkeypatch.setattr(Config, 'SNAPSHOTS_DIR', temp_dir)
+    return HostRouter(min_failures=2, reprobe_interval=timedelta(hours=24))
+
+
+class TestHostRouter:
+
+    def test_learns_after_consecutive_failures(self, router):
+        router.record_direct(URL, False)
+        router.record_zenrows(URL, js_render=False)
+        router.finish_cycle()
+        assert router.route(URL) == ROUTE_ZENROWS and not router.should_skip_direct(URL)
+
+        router.record_direct(URL, False)
+        router.record_zenrows(URL, js_render=False)
+        router.finish_cycle()
+        assert router.should_skip_direct("https://docs.blocked.com/other")
+        assert router.js_render(URL) is False
+
+        router.save()
+        assert HostRouter().should_skip_direct(URL)
+
+    def test_one_failure_per_host_per_cycle(self, router):
+        for url in (URL, "https://docs.blocked.com/api/deals"):
+            router.record_direct(url, False)
+            router.record_zenrows(url, js_render=False)
+        router.finish_cycle()
+
+        # Две упавшие страницы одного хоста — это одна неудачная попытка, а не две
+        assert not router.should_skip_direct(URL)
+
+    def test_mixed_cycle_keeps_counter(self, router):
+        router.record_direct(URL, False)
+        router.record_zenrows(URL, js_render=False)
+        router.finish_cycle()
+
+        router.record_direct(URL, False)
+        router.record_zenrows(URL, js_render=False)
+        router.record_direct("https://docs.blocked.com/api/healthy", True)
+        router.finish_cycle()
+        # Здоровая страница не сбрасывает счётчик, но и хост целиком не уходит в ZenRows
+        assert not router.should_skip_direct(URL)
+        assert router.route(URL) == ROUTE_ZENROWS
+
+        router.record_direct(URL, False)
+        router.record_zenrows(URL, js_render=False)
+        router.finish_cycle()
+        assert router.should_skip_direct(URL)
+
+    def test_reprobe_and_recovery(self, router):
+        for _ in range(2):
+            router.record_direct(URL, False)
+            router.record_zenrows(URL, js_render=True)
+            router.finish_cycle()
+
+        assert not router.should_skip_direct(URL, now=datetime.now() + timedelta(hours=25))
+        router.record_direct(URL, True)
+        router.finish_cycle()
+        assert len(router) == 0 and not router.should_skip_direct(URL)
+
+    def test_zenrows_failure_clears_skip(self, router):
+        for _ in range(2):
+            router.record_direct(URL, False)
+            router.record_zenrows(URL, js_render=True)
+            router.finish_cycle()
+
+        router.record_zenrows(URL, None)
+        assert not router.should_skip_direct(URL)
+
+
+@pytest.mark.asyncio
+class TestContentFetcherRouting:
+
+    async def test_learned_host_skips_direct(self, router):
+        fetcher = ContentFetcher(zenrows_api_key="key", validator_store=None, host_router=router)
+        blocked = FetchResult(content=None, status_code=403, success=False, url=URL)
+
+        with patch.object(fetcher._direct, 'fetch', new_callable=AsyncMock, return_value=blocked) as direct, \
+                patch.object(fetcher._zenrows, 'fetch_routed', new_callable=AsyncMock,
+                             return_value=("<html>ok</html>", False)) as zenrows, \
+                patch.object(fetcher._usage_tracker, 'can_use', new_callable=AsyncMock, return_value=True):
+            for _ in range(3):
+                result = await fetcher.fetch(URL)
+                fetcher.save_host_routes()
+
+        assert result.success and result.content == "<html>ok</html>"
+        assert direct.await_count == 2
+        # Третий цикл начинает с режима без JS, который сработал раньше
+        assert zenrows.await_args.kwargs['js_render'] is False
+        await fetcher.close()
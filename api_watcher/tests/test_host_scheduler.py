@@ -0,0 +1,89 @@
+"""
+Тесты планировщика параллельности по хостам
+"""
+
+import asyncio
+import pytest
+from unittest.mock import patch
+
+from api_watcher.config import Config
+from api_watcher.utils.host_scheduler import HostScheduler, host_of, interleave_by_host
+
+
+class TestInterleaveByHost:
+
+    def test_round_robin_across_hosts(self):
+        urls = [
+            "https://a.com/1", "https://a.com/2", "https://a.com/3",
+            "https://b.com/1",
+            "https://c.com/1", "https://c.com/2",
+        ]
+
+        ordered = interleave_by_host(urls, lambda u: u)
+
+        assert ordered == [
+            "https://a.com/1", "https://b.com/1", "https://c.com/1",
+            "https://a.com/2", "https://c.com/2",
+            "https://a.com/3",
+        ]
+
+    def test_host_of_is_case_insensitive(self):
+        assert host_of("https://Docs.Slack.DEV/page#anchor") == "docs.slack.dev"
+        assert host_of("not a url") == ""
+
+
+@pytest.mark.asyncio
+class TestHostScheduler:
+
+    async def test_per_host_limit_is_respected(self):
+        scheduler = HostScheduler(max_concurrent=10, per_host_limit=2)
+        active = {'a.com': 0, 'b.com': 0}
+        peak = {'a.com': 0, 'b.com': 0}
+
+        async def work(url):
+            host = host_of(url)
+            async with scheduler.slot(url):
+                active[host] += 1
+                peak[host] = max(peak[host], active[host])
+                await asyncio.sleep(0.01)
+                active[host] -= 1
+
+        urls = [f"https://a.com/{i}" for i in range(6)] + [f"https://b.com/{i}" for i in range(3)]
+        await asyncio.gather(*(work(u) for u in urls))
+
+        assert peak == {'a.com': 2, 'b.com': 2}
+
+    async def test_host_override_and_global_cap(self):
+        scheduler = HostScheduler(max_concurrent=3, per_host_limit=1, host_limits={'A.com': 5})
+
+        assert scheduler.limit_for('a.com') == 3
+        assert scheduler.limit_for('b.com') == 1
+
+    async def test_dispatch_skips_busy_host(self):
+        scheduler = HostScheduler(max_concurrent=4, per_host_limit=1)
+        urls = ["https://a.com/1", "https://a.com/2", "https://a.com/3", "https://b.com/1", "https://b.com/2"]
+        started = []
+
+        async def work(url):
+            await asyncio.sleep(0.05 if host_of(url) == 'a.com' else 0.01)
+            scheduler.release(url)
+
+        tasks = []
+        async for url in scheduler.dispatch(urls, lambda u: u):
+            started.append(url)
+            tasks.append(asyncio.create_task(work(url)))
+        await asyncio.gather(*tasks)
+
+        # b.com не ждёт, пока освободится слот a.com
+        assert started[:3] == ["https://a.com/1", "https://b.com/1", "https://b.com/2"]
+        assert scheduler.stats()['active'] == {}
+
+
+class TestHostConcurrencyConfig:
+
+    def test_parse_overrides(self):
+        with patch.object(Config, 'HOST_CONCURRENCY', 'developers.hubspot.com=3, Docs.Slack.dev=1,bad,x=y'):
+            assert Config.get_host_concurrency() == {
+                'developers.hubspot.com': 3,
+                'docs.slack.dev': 1,
+            }
@@ -0,0 +1,54 @@
+"""
+Тесты общего пула HTTP-соединений
+"""
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from api_watcher.utils.async_fetcher import AsyncFetcher
+from api_watcher.utils.docs_finder import APIDocsFinder
+from api_watcher.utils.http_pool import HTTPConnectionPool, close_http_pool, get_http_pool
+
+
+@pytest.mark.asyncio
+class TestHTTPConnectionPool:
+
+    async def test_sessions_share_connector(self):
+        pool = HTTPConnectionPool(limit=10, limit_per_host=3, dns_ttl=60)
+        first = pool.session()
+        second = pool.session()
+
+        assert first.connector is second.connector
+        assert first.connector.limit_per_host == 3
+        await first.close()
+        assert not second.connector.closed
+
+        await second.close()
+        await pool.close()
+        assert pool.stats()['in_flight'] == 0 and pool.stats()['sessions'] == 2
+
+    async def test_clients_reuse_connections(self):
+        async def handler(request):
+            return web.Response(text="ok")
+
+        app = web.Application()
+        app.router.add_get('/', handler)
+        server = TestServer(app)
+        await server.start_server()
+        try:
+            fetcher = AsyncFetcher(max_retries=0)
+            first = await fetcher.fetch(str(server.make_url('/')), retry=False)
+            await fetcher.close()
+            # Отдельный клиент со своей сессией попадает в то же keep-alive соединение
+            async with APIDocsFinder() as finder:
+                async with finder.session.get(server.make_url('/')) as response:
+                    await response.read()
+
+            stats = get_http_pool().stats()
+            assert first.content == "ok"
+            assert stats['connections_created'] == 1 and stats['connections_reused'] == 1
+            assert stats['requests'] == 2 and stats['in_flight'] == 0
+        finally:
+            await close_http_pool()
+            await server.close()
@@ -0,0 +1,58 @@
+"""
+Тесты нормализации шума перед сравнением страниц
+"""
+
+import json
+
+from api_watcher.utils.noise_normalizer import NoiseNormalizer, load_host_rules
+from api_watcher.utils.smart_comparator import SmartComparator
+
+PAGE = """<html><head>
+<meta name="csrf-token" content="{token}">
+<link rel="stylesheet" href="/static/main.{build}.css">
+<script src="/static/app.js?v={build}" nonce="{token}"></script>
+<script id="__NEXT_DATA__">{{"buildId":"{build}"}}</script>
+</head><body>
+<h1>Leads API</h1>
+<p>Last updated: {date}</p>
+<p>POST /leads creates a lead.</p>
+<footer>© {year} Example</footer>
+</body></html>"""
+
+
+def _page(token="a1b2c3", build="3f9a2b1c9d", date="2024-01-05", year="2024", body="creates a lead"):
+    return PAGE.format(token=token, build=build, date=date, year=year).replace("creates a lead", body)
+
+
+class TestNoiseNormalizer:
+
+    def test_noise_does_not_change_hash(self):
+        comparator = SmartComparator()
+        old = _page()
+        new = _page(token="zz99", build="77aa88bb99", date="March 3, 2025", year="2025")
+
+        assert comparator.calculate_hash(old) != comparator.calculate_hash(new)
+        assert comparator.normalized_hash(old, "https://a.com") == comparator.normalized_hash(new, "https://a.com")
+        assert comparator.compare_html_text(old, new, "https://a.com")[0] is False
+
+    def test_real_change_is_kept(self):
+        comparator = SmartComparator()
+        old, new = _page(), _page(token="zz99", body="creates or updates a lead")
+
+        assert comparator.normalized_hash(old) != comparator.normalized_hash(new)
+        has_changes, _, new_text = comparator.compare_html_text(old, new)
+        assert has_changes and "creates or updates a lead" in new_text
+
+    def test_disabled(self):
+        normalizer = NoiseNormalizer(enabled=False)
+        assert normalizer.normalize_html(_page()) == _page()
+
+    def test_host_rules(self, temp_dir):
+        path = f"{temp_dir}/noise_rules.json"
+        with open(path, "w") as f:
+            json.dump({"hubspot.com": [{"name": "visitors", "pattern": r"\d+ developers online"}]}, f)
+        normalizer = NoiseNormalizer(host_rules=load_host_rules(path))
+        text = "Contacts API\n42 developers online"
+
+        assert normalizer.normalize_text(text, "https://developers.hubspot.com/docs") == "Contacts API\n"
+        assert normalizer.normalize_text(text, "https://docs.slack.dev/") == text
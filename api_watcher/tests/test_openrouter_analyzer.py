@@ -2,9 +2,10 @@
 Тесты для OpenRouter AI Analyzer
 """
 
+import asyncio
 import pytest
-from unittest.mock import Mock, patch
-from api_watcher.utils.openrouter_analyzer import OpenRouterAnalyzer
+from unittest.mock import Mock, MagicMock, AsyncMock, patch
+from api_watcher.utils.openrouter_analyzer import OpenRouterAnalyzer, AsyncOpenRouterAnalyzer
 
 
 class TestOpenRouterAnalyzer:
@@ -141,7 +142,93 @@ class TestOpenRouterAnalyzer:
         assert info['model'] == "anthropic/claude-3.5-sonnet"
         assert info['provider'] == "OpenRouter"
         assert 'api_url' in info
+    
+    def test_prompt_contains_change_deep_in_page(self):
+        """Изменение далеко за началом страницы попадает в промпт, неизменный текст — нет"""
+        analyzer = OpenRouterAnalyzer(api_key="test-key")
+        old_text = "\n".join(f"Unchanged line {i}" for i in range(2000)) + "\n## Limits\nRate limit: 100 rps"
+        new_text = old_text.replace("100 rps", "10 rps")
+        
+        prompt = analyzer._changes_messages(old_text, new_text, "Test API", None)[0]['content']
+        
+        assert "-Rate limit: 100 rps" in prompt
+        assert "+Rate limit: 10 rps" in prompt
+        assert "## Limits" in prompt
+        assert "Unchanged line 10\n" not in prompt
+        assert len(prompt) < 3000
+
+
+
+def _post_response(status=200, payload=None):
+    response = MagicMock()
+    response.status = status
+    response.json = AsyncMock(return_value=payload)
+    response.text = AsyncMock(return_value="error")
+    ctx = MagicMock()
+    ctx.__aenter__ = AsyncMock(return_value=response)
+    ctx.__aexit__ = AsyncMock(return_value=False)
+    return ctx
 
 
+@pytest.mark.asyncio
+class TestAsyncOpenRouterAnalyzer:
+    """Тесты для асинхронного анализатора"""
+    
+    async def test_analyze_changes(self):
+        analyzer = AsyncOpenRouterAnalyzer(api_key="test-key")
+        session = MagicMock()
+        session.post.return_value = _post_response(payload={
+            'choices': [{'message': {'content': '{"has_significant_changes": false, "summary": "Опечатка"}'}}]
+        })
+        
+        with patch.object(analyzer, '_get_session', new_callable=AsyncMock, return_value=session):
+            result = await analyzer.analyze_changes("old text", "new text", "Test API")
+        
+        assert result['has_significant_changes'] is False
+        assert result['summary'] == "Опечатка"
+        assert session.post.call_args.args[0] == analyzer.api_url
+    
+    async def test_http_error_falls_back(self):
+        analyzer = AsyncOpenRouterAnalyzer(api_key="test-key")
+        session = MagicMock()
+        session.post.return_value = _post_response(status=502)
+        
+        with patch.object(analyzer, '_get_session', new_callable=AsyncMock, return_value=session):
+            result = await analyzer.analyze_changes("old text", "new text")
+        
+        assert 'AI анализ недоступен' in result['summary']
+    
+    async def test_concurrency_cap(self):
+        analyzer = AsyncOpenRouterAnalyzer(api_key="test-key", max_concurrent=2)
+        in_flight = 0
+        peak = 0
+        
+        async def fake_post(*args, **kwargs):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return {'choices': [{'message': {'content': 'ok'}}]}
+        
+        def post(*args, **kwargs):
+            ctx = MagicMock()
+            response = MagicMock(status=200)
+            response.json = AsyncMock(side_effect=fake_post)
+            ctx.__aenter__ = AsyncMock(return_value=response)
+            ctx.__aexit__ = AsyncMock(return_value=False)
+            return ctx
+        
+        session = MagicMock()
+        session.post.side_effect = post
+        
+        with patch.object(analyzer, '_get_session', new_callable=AsyncMock, return_value=session):
+            results = await asyncio.gather(*[
+                analyzer.analyze_openapi_changes({'added': []}) for _ in range(6)
+            ])
+        
+        assert results == ['ok'] * 6
+        assert peak == 2
+
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
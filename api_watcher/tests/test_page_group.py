@@ -0,0 +1,134 @@
+"""
+Тесты обработки страниц группами и отслеживания разделов по якорю
+"""
+
+import pytest
+from unittest.mock import Mock, patch, AsyncMock
+
+from api_watcher.watcher import APIWatcher
+from api_watcher.storage.repository import SnapshotRepository
+from api_watcher.utils.async_fetcher import ContentFetcher, FetchResult
+from api_watcher.utils.section_index import PageSectionIndex, parse_text_fragment
+from api_watcher.notifier.base import NotifierManager
+from api_watcher.services.page_group import SECTION_CONTENT_TYPE
+
+PAGE = """
+<html><body>
+<h1>Leads API</h1>
+<p>Intro text about the API.</p>
+<h2 id="create-lead">Create lead</h2>
+<p>POST /leads creates a lead.</p>
+<h3>Parameters</h3>
+<p>name, email</p>
+<h2 id="delete-lead">Delete lead</h2>
+<p>DELETE /leads/{id} removes a lead.</p>
+</body></html>
+"""
+
+
+class TestSectionIndex:
+
+    def test_parse_text_fragment(self):
+        directive = parse_text_fragment(":~:text=Set%20the-,Create,lead,-POST")
+        assert directive.prefix == "Set the"
+        assert directive.start == "Create"
+        assert directive.end == "lead"
+        assert directive.suffix == "POST"
+        assert parse_text_fragment("create-lead") is None
+
+    def test_section_by_id_stops_at_same_level_heading(self):
+        section = PageSectionIndex(PAGE).section("create-lead")
+        assert section.startswith("Create lead")
+        assert "Parameters" in section
+        assert "Delete lead" not in section
+
+    def test_section_by_text_fragment(self):
+        section = PageSectionIndex(PAGE).section(":~:text=DELETE%20%2Fleads")
+        assert section.startswith("Delete lead")
+        assert "Create lead" not in section
+
+    def test_missing_anchor(self):
+        index = PageSectionIndex(PAGE)
+        assert index.section("unknown") is None
+        assert index.section(":~:text=nothing%20here") is None
+
+
+class TestWatcherPageGroups:
+
+    @pytest.fixture
+    def repository(self):
+        return Mock(spec=SnapshotRepository)
+
+    @pytest.fixture
+    def watcher(self, repository):
+        fetcher = Mock(spec=ContentFetcher)
+        fetcher.fetch = AsyncMock(
+            return_value=FetchResult(content=PAGE, status_code=200, success=True, url="https://a.com/leads")
+        )
+        with patch('api_watcher.watcher.Config') as mock_config:
+            mock_config.is_openrouter_configured.return_value = False
+            mock_config.is_gemini_configured.return_value = False
+            return APIWatcher(
+                repository=repository,
+                fetcher=fetcher,
+                notifier_manager=Mock(spec=NotifierManager)
+            )
+
+    @pytest.mark.asyncio
+    async def test_entries_share_one_parsed_page(self, watcher, repository):
+        repository.get_latest.return_value = None
+
+        with patch('api_watcher.utils.compute_pool.PageSectionIndex', wraps=PageSectionIndex) as index_cls:
+            await watcher.process_url("https://a.com/leads#create-lead")
+            await watcher.process_url("https://a.com/leads#delete-lead")
+
+        assert index_cls.call_count == 1
+        saved = [call.kwargs for call in repository.save.call_args_list]
+        assert [s['content_type'] for s in saved] == [SECTION_CONTENT_TYPE, SECTION_CONTENT_TYPE]
+        assert saved[0]['raw_html'].startswith("Create lead")
+        assert saved[1]['raw_html'].startswith("Delete lead")
+
+    @pytest.mark.asyncio
+    async def test_baselines_are_preloaded_per_cycle(self, watcher, repository, tmp_path):
+        urls_file = tmp_path / "urls.json"
+        urls_file.write_text(
+            '[{"url": "https://a.com/leads#create-lead"}, {"url": "https://a.com/leads#delete-lead"}]'
+        )
+        repository.get_latest_many.return_value = {}
+
+        await watcher.process_urls_file(str(urls_file))
+
+        repository.get_latest_many.assert_called_once_with(
+            ["https://a.com/leads#create-lead", "https://a.com/leads#delete-lead"]
+        )
+        repository.get_latest.assert_not_called()
+        assert repository.save.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_whole_page_snapshot_is_rebaselined_as_section(self, watcher, repository):
+        old_snapshot = Mock(content_type='html', content_hash='old', raw_html=PAGE)
+        repository.get_latest.return_value = old_snapshot
+
+        result = await watcher.process_url("https://a.com/leads#create-lead")
+
+        assert result.get('rebaselined') is True
+        assert repository.save.call_args.kwargs['content_type'] == SECTION_CONTENT_TYPE
+
+    @pytest.mark.asyncio
+    async def test_change_in_other_section_is_ignored(self, watcher, repository):
+        section = PageSectionIndex(PAGE).section("create-lead")
+        old_snapshot = Mock(
+            content_type=SECTION_CONTENT_TYPE,
+            content_hash=watcher.comparator.calculate_hash(section),
+            raw_html=section
+        )
+        repository.get_latest.return_value = old_snapshot
+        watcher.fetcher.fetch.return_value = FetchResult(
+            content=PAGE.replace("removes a lead", "archives a lead"),
+            status_code=200, success=True, url="https://a.com/leads"
+        )
+
+        result = await watcher.process_url("https://a.com/leads#create-lead")
+
+        assert result == {'url': "https://a.com/leads#create-lead", 'has_changes': False}
+        repository.save.assert_not_called()
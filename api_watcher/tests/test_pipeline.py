@@ -0,0 +1,152 @@
+"""
+Тесты конвейера цикла: стадии, ограниченные очереди, обработка ошибок
+"""
+
+import asyncio
+import json
+
+import pytest
+from unittest.mock import Mock, AsyncMock, patch
+
+from api_watcher.config import Config
+from api_watcher.watcher import APIWatcher
+from api_watcher.storage.repository import SnapshotRepository
+from api_watcher.utils.async_fetcher import ContentFetcher, FetchResult
+from api_watcher.utils.pipeline import Stage, StagedPipeline
+from api_watcher.notifier.base import NotifierManager
+
+
+class TestStagedPipeline:
+
+    @pytest.mark.asyncio
+    async def test_items_pass_all_stages(self):
+        async def double(x):
+            return x * 2
+
+        async def inc(x):
+            return x + 1
+
+        pipeline = StagedPipeline([Stage('double', double, workers=3), Stage('inc', inc)])
+        done = await pipeline.run(range(10))
+
+        assert sorted(done) == [x * 2 + 1 for x in range(10)]
+        assert pipeline.stats()['inc']['processed'] == 10
+
+    @pytest.mark.asyncio
+    async def test_slow_stage_bounds_queue(self):
+        release = asyncio.Event()
+        fetched = []
+
+        async def fetch(x):
+            fetched.append(x)
+            return x
+
+        async def slow(x):
+            await release.wait()
+            return x
+
+        pipeline = StagedPipeline([Stage('fetch', fetch), Stage('slow', slow)], queue_size=2)
+        run = asyncio.create_task(pipeline.run(range(20)))
+        await asyncio.sleep(0.05)
+
+        # slow держит 1 элемент, 2 ждут в очереди, fetch застрял на put третьего
+        assert len(fetched) <= 4
+        release.set()
+        assert len(await run) == 20
+        assert pipeline.stats()['slow']['max_depth'] <= 2
+
+    @pytest.mark.asyncio
+    async def test_errors_drop_item_and_call_on_error(self):
+        errors = []
+
+        async def check(x):
+            if x == 3:
+                raise ValueError("bad item")
+            return x
+
+        async def skip_even(x):
+            return None if x % 2 == 0 else x
+
+        pipeline = StagedPipeline(
+            [Stage('check', check), Stage('skip', skip_even)],
+            on_error=lambda stage, item, e: errors.append((stage, item, str(e)))
+        )
+        done = await pipeline.run(range(6))
+
+        assert sorted(done) == [1, 5]
+        assert errors == [('check', 3, "bad item")]
+
+    @pytest.mark.asyncio
+    async def test_batch_stage_receives_lists(self):
+        batches = []
+
+        async def collect(items):
+            batches.append(list(items))
+            return items
+
+        pipeline = StagedPipeline([Stage('collect', collect, batch_size=4, batch_wait=0.05)])
+        done = await pipeline.run(range(10))
+
+        assert sorted(done) == list(range(10))
+        assert all(len(batch) <= 4 for batch in batches)
+        assert len(batches) < 10
+
+
+class TestParallelCycle:
+
+    @pytest.fixture
+    def watcher(self, monkeypatch):
+        monkeypatch.setattr(Config, 'SNAPSHOT_WRITE_BATCH_WAIT', 0.05)
+        fetcher = Mock(spec=ContentFetcher)
+
+        async def fetch(url, **kwargs):
+            if "broken" in url:
+                return None
+            return FetchResult(content=f"<html><body><p>{url}</p>{'<p>Endpoint reference</p>' * 10}</body></html>",
+                               status_code=200, success=True, url=url)
+
+        fetcher.fetch = AsyncMock(side_effect=fetch)
+        repository = Mock(spec=SnapshotRepository)
+        repository.get_latest_many.return_value = {}
+        with patch('api_watcher.watcher.Config') as mock_config:
+            mock_config.is_openrouter_configured.return_value = False
+            mock_config.is_gemini_configured.return_value = False
+            watcher = APIWatcher(
+                repository=repository,
+                fetcher=fetcher,
+                notifier_manager=Mock(spec=NotifierManager)
+            )
+        watcher.config = Config
+        return watcher
+
+    @pytest.mark.asyncio
+    async def test_results_keep_input_order(self, watcher, tmp_path):
+        urls = ["https://a.com/1", "https://b.com/1", "https://a.com/broken", "https://b.com/2"]
+        urls_file = tmp_path / "urls.json"
+        urls_file.write_text(json.dumps([{"url": url} for url in urls] + [{"api_name": "no url"}]))
+
+        results = await watcher.process_urls_parallel(str(urls_file), max_concurrent=2, delay_between_requests=0)
+
+        # interleave_by_host: a, b, a, b
+        assert [r['url'] for r in results] == urls
+        assert [r.get('is_first_snapshot', False) for r in results] == [True, True, False, True]
+        assert results[2]['error'] == 'Failed to fetch'
+        saved = [s['url'] for call in watcher.repository.save_many.call_args_list for s in call.args[0]]
+        assert sorted(saved) == ["https://a.com/1", "https://b.com/1", "https://b.com/2"]
+        watcher.repository.save.assert_not_called()
+        assert watcher._baselines == {}
+
+    @pytest.mark.asyncio
+    async def test_stage_error_is_reported_per_entry(self, watcher, tmp_path):
+        urls_file = tmp_path / "urls.json"
+        urls_file.write_text(json.dumps([{"url": "https://a.com/1"}, {"url": "https://b.com/1"}]))
+        watcher.repository.save_many.side_effect = RuntimeError("db is locked")
+
+        results = await watcher.process_urls_parallel(str(urls_file), delay_between_requests=0)
+
+        # Пакет пишется одной транзакцией: при её сбое ошибка у каждой записи пакета
+        assert results == [
+            {'url': "https://a.com/1", 'has_changes': False, 'error': "db is locked"},
+            {'url': "https://b.com/1", 'has_changes': False, 'error': "db is locked"},
+        ]
+        assert watcher._failed_base_urls == {"https://a.com/1", "https://b.com/1"}
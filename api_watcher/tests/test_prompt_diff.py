@@ -0,0 +1,45 @@
+"""
+Тесты diff-фрагментов для AI промптов
+"""
+
+from api_watcher.utils.prompt_diff import build_change_diff, estimate_tokens
+
+OLD = "\n".join(
+    ["# Leads API", "Intro"]
+    + [f"## Section {s}\n" + "\n".join(f"Field {s}.{i}: string" for i in range(50)) for s in range(20)]
+)
+
+
+class TestBuildChangeDiff:
+
+    def test_only_changed_hunks_with_section(self):
+        new = OLD.replace("Field 7.20: string", "Field 7.20: integer")
+
+        diff = build_change_diff(OLD, new, token_budget=1000, context_lines=2)
+
+        assert "-Field 7.20: string" in diff and "+Field 7.20: integer" in diff
+        assert "## Section 7" in diff.splitlines()[0]
+        assert " Field 7.18: string" in diff
+        assert "Field 7.17" not in diff and "Field 3.0" not in diff
+
+    def test_respects_token_budget(self):
+        new = OLD
+        for s in range(20):
+            new = new.replace(f"Field {s}.25: string", f"Field {s}.25: removed")
+
+        diff = build_change_diff(OLD, new, token_budget=100, context_lines=3)
+
+        assert estimate_tokens(diff) <= 130
+        assert "+Field 0.25: removed" in diff
+        assert "изменённых фрагментов не поместились" in diff.splitlines()[-1]
+
+    def test_single_oversized_hunk_is_truncated(self):
+        new = "\n".join(f"New line {i}" for i in range(1000))
+
+        diff = build_change_diff(OLD, new, token_budget=50)
+
+        assert diff.endswith("[...фрагмент обрезан]")
+        assert len(diff) < 300
+
+    def test_identical_texts(self):
+        assert build_change_diff(OLD, OLD) == ''
@@ -0,0 +1,118 @@
+"""
+Тесты адаптивного лимитера запросов по хостам
+"""
+
+import pytest
+from unittest.mock import MagicMock, AsyncMock, patch
+
+from api_watcher.utils.async_fetcher import AsyncFetcher
+from api_watcher.utils.rate_limiter import HostRateLimiter, parse_retry_after
+
+
+def _limiter(temp_dir, **kwargs):
+    with patch('api_watcher.utils.rate_limiter.Config') as mock_config:
+        mock_config.SNAPSHOTS_DIR = temp_dir
+        params = dict(initial_rate=2.0, min_rate=0.1, max_rate=10.0, increase=0.5, decrease=0.5, burst=1)
+        params.update(kwargs)
+        return HostRateLimiter(**params)
+
+
+class TestParseRetryAfter:
+
+    def test_seconds(self):
+        assert parse_retry_after("7") == 7.0
+
+    def test_http_date_in_past(self):
+        assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+
+    def test_invalid(self):
+        assert parse_retry_after(None) is None
+        assert parse_retry_after("soon") is None
+
+
+@pytest.mark.asyncio
+class TestHostRateLimiter:
+
+    async def test_aimd(self, temp_dir):
+        limiter = _limiter(temp_dir)
+        url = "https://developers.hubspot.com/docs"
+
+        limiter.on_throttle(url)
+        assert limiter.rate_for(url) == 1.0
+
+        limiter.on_success(url)
+        assert limiter.rate_for(url) == 1.5
+        # Другие хосты не затронуты
+        assert limiter.rate_for("https://docs.slack.dev/") == 2.0
+
+    async def test_rates_persist(self, temp_dir):
+        limiter = _limiter(temp_dir)
+        limiter.on_throttle("https://a.com/x")
+        limiter.save()
+
+        reloaded = _limiter(temp_dir)
+        assert reloaded.rate_for("https://a.com/y") == 1.0
+
+    async def test_acquire_waits_for_retry_after(self, temp_dir):
+        limiter = _limiter(temp_dir)
+        url = "https://a.com/x"
+        await limiter.acquire(url)
+        limiter.on_throttle(url, retry_after=5)
+
+        sleeps = []
+
+        async def fake_sleep(seconds):
+            sleeps.append(seconds)
+            state = limiter._hosts['a.com']
+            state.blocked_until = 0.0
+            state.tokens = 1.0
+
+        with patch('api_watcher.utils.rate_limiter.asyncio.sleep', new=fake_sleep):
+            await limiter.acquire(url)
+
+        assert sleeps and sleeps[0] == pytest.approx(5, abs=0.5)
+
+
+def _response(status, headers=None, body=b"ok"):
+    response = MagicMock()
+    response.status = status
+    response.headers = headers or {}
+    response.charset = "utf-8"
+
+    async def iter_chunked(size):
+        yield body
+
+    response.content.iter_chunked = iter_chunked
+    ctx = MagicMock()
+    ctx.__aenter__ = AsyncMock(return_value=response)
+    ctx.__aexit__ = AsyncMock(return_value=False)
+    return ctx
+
+
+@pytest.mark.asyncio
+class TestAsyncFetcherRetryAfter:
+
+    async def test_retry_after_replaces_backoff(self):
+        fetcher = AsyncFetcher(retry_delay=1.0)
+        session = MagicMock()
+        session.get.side_effect = [_response(429, {'Retry-After': '3'}), _response(200)]
+
+        with patch.object(fetcher, '_get_session', new_callable=AsyncMock, return_value=session), \
+                patch('api_watcher.utils.async_fetcher.asyncio.sleep', new_callable=AsyncMock) as mock_sleep:
+            result = await fetcher.fetch("https://a.com/x")
+
+        assert result.success is True
+        mock_sleep.assert_awaited_once_with(3.0)
+
+    async def test_excessive_retry_after_is_not_waited(self):
+        fetcher = AsyncFetcher()
+        session = MagicMock()
+        session.get.side_effect = [_response(429, {'Retry-After': '3600'})]
+
+        with patch.object(fetcher, '_get_session', new_callable=AsyncMock, return_value=session), \
+                patch('api_watcher.utils.async_fetcher.asyncio.sleep', new_callable=AsyncMock) as mock_sleep:
+            result = await fetcher.fetch("https://a.com/x")
+
+        assert result.success is False
+        assert result.status_code == 429
+        mock_sleep.assert_not_awaited()
@@ -0,0 +1,79 @@
+"""
+Тесты SimHash-отпечатков снэпшотов
+"""
+
+import pytest
+from unittest.mock import Mock, patch
+
+from api_watcher.services.change_detector import ChangeDetector
+from api_watcher.storage.repository import SQLAlchemySnapshotRepository
+from api_watcher.utils.compute_pool import ComputePool
+from api_watcher.utils.simhash import (
+    find_near_duplicates, from_hex, hamming_distance, simhash, similarity, to_hex
+)
+
+TEXT = " ".join(f"Leads API parameter number {i} is optional and defaults to zero." for i in range(60))
+PAGE = "<html><body>" + "".join(f"<p>Lead field {i}: string, optional.</p>" for i in range(80)) + "</body></html>"
+
+
+class TestSimHash:
+
+    def test_similar_texts_are_close(self):
+        edited = TEXT.replace("number 30 is optional", "number 30 is required")
+        rewritten = " ".join(f"Webhooks deliver event {i} within seconds." for i in range(60))
+
+        assert hamming_distance(simhash(TEXT), simhash(edited)) <= 3
+        assert hamming_distance(simhash(TEXT), simhash(rewritten)) > 10
+        assert similarity(simhash(TEXT), simhash(TEXT)) == 1.0
+
+    def test_hex_roundtrip(self):
+        fingerprint = simhash(TEXT)
+        assert from_hex(to_hex(fingerprint)) == fingerprint
+        assert from_hex(None) is None and from_hex("zz") is None
+
+    def test_find_near_duplicates(self):
+        base = simhash(TEXT)
+        fingerprints = {'a': base, 'b': base ^ 0b101, 'c': base ^ (2 ** 64 - 1), 'empty': 0}
+
+        assert find_near_duplicates(fingerprints, max_distance=3) == [('a', 'b', 2)]
+
+
+class TestSnapshotFingerprints:
+
+    @pytest.fixture
+    def repository(self):
+        repo = SQLAlchemySnapshotRepository('sqlite:///:memory:')
+        yield repo
+        repo.close()
+
+    def test_latest_fingerprints(self, repository):
+        repository.save(url="https://a.com/x", raw_html="x", text_content="x", simhash=to_hex(1))
+        repository.save(url="https://a.com/x", raw_html="y", text_content="y", simhash=to_hex(2))
+        repository.save(url="https://a.com/legacy", raw_html="z", text_content="z")
+
+        assert repository.get_latest_fingerprints() == {"https://a.com/x": to_hex(2)}
+
+    @pytest.mark.asyncio
+    async def test_changed_page_stores_fingerprint(self, repository):
+        detector = ChangeDetector(repository, Mock(), compute_pool=ComputePool(max_workers=0))
+        old = Mock(raw_html=PAGE, content_hash='old', simhash=None)
+        new_page = PAGE.replace("Lead field 40: string", "Lead field 40: integer")
+
+        result = await detector.detect_changes(old, new_page, 'html', "https://a.com/leads", None, None)
+
+        assert result['has_changes'] is True
+        stored = repository.get_latest("https://a.com/leads")
+        expected = simhash(detector.comparator.page_text(new_page, "https://a.com/leads"))
+        assert from_hex(stored.simhash) == expected
+
+    @pytest.mark.asyncio
+    async def test_trivial_edit_is_skipped_by_threshold(self, repository):
+        detector = ChangeDetector(repository, Mock(), compute_pool=ComputePool(max_workers=0))
+        new_page = PAGE.replace("Lead field 40: string", "Lead field 40: integer")
+        old = Mock(raw_html=PAGE, content_hash='old', simhash=to_hex(simhash(detector.comparator.page_text(PAGE))))
+
+        with patch('api_watcher.services.change_detector.Config.SIMHASH_SKIP_DISTANCE', 64):
+            result = await detector.detect_changes(old, new_page, 'html', "https://a.com/leads", None, None)
+
+        assert result == {'url': "https://a.com/leads", 'has_changes': False, 'reason': 'trivial'}
+        assert repository.get_latest("https://a.com/leads") is None
@@ -0,0 +1,336 @@
+"""
+Тесты хранилища снэпшотов
+"""
+
+import asyncio
+import json
+
+import pytest
+from unittest.mock import Mock, patch
+from sqlalchemy import create_engine, inspect, text
+
+from api_watcher.storage.database import DatabaseManager, Snapshot, SnapshotBlob
+from api_watcher.storage.delta import make_delta, apply_delta
+from api_watcher.storage.repository import SQLAlchemySnapshotRepository
+from api_watcher.services.change_detector import ChangeDetector
+from api_watcher.utils.compute_pool import ComputePool
+
+PAGE = "<html><body>" + "<p>Create lead: POST /leads</p>" * 200 + "</body></html>"
+
+
+@pytest.fixture
+def repository():
+    repo = SQLAlchemySnapshotRepository('sqlite:///:memory:')
+    yield repo
+    repo.close()
+
+
+class TestBlobStore:
+
+    def test_roundtrip(self, repository):
+        repository.save(
+            url="https://a.com/spec.json",
+            raw_html='{"openapi": "3.0"}',
+            text_content='{\n  "openapi": "3.0"\n}',
+            content_type='openapi',
+            structured_data={'openapi': '3.0'},
+            content_hash='h1'
+        )
+        snapshot = repository.get_latest("https://a.com/spec.json")
+
+        assert snapshot.raw_html == '{"openapi": "3.0"}'
+        assert snapshot.text_content == '{\n  "openapi": "3.0"\n}'
+        assert json.loads(snapshot.structured_data) == {'openapi': '3.0'}
+
+    def test_identical_content_is_stored_once(self, repository):
+        for anchor in ("#create", "#update", "#delete"):
+            repository.save(url=f"https://a.com/leads{anchor}", raw_html=PAGE, text_content="text")
+
+        session = repository._db.session
+        blobs = session.query(SnapshotBlob).all()
+        assert session.query(Snapshot).count() == 3
+        assert len(blobs) == 1
+        assert blobs[0].stored_size < blobs[0].raw_size / 10
+
+    def test_legacy_rows_are_readable(self, tmp_path):
+        url = f"sqlite:///{tmp_path / 'legacy.db'}"
+        engine = create_engine(url)
+        with engine.begin() as conn:
+            conn.execute(text(
+                "CREATE TABLE snapshots (id INTEGER PRIMARY KEY, url VARCHAR(500) NOT NULL, "
+                "api_name VARCHAR(200), method_name VARCHAR(200), content_type VARCHAR(50), "
+                "raw_html TEXT, text_content TEXT, structured_data TEXT, created_at DATETIME, "
+                "has_changes BOOLEAN, ai_summary TEXT, content_hash VARCHAR(64))"
+            ))
+            conn.execute(text(
+                "INSERT INTO snapshots (url, raw_html, text_content, created_at) VALUES "
+                "('https://a.com', '<p>older</p>', 'older', '2023-01-01 00:00:00'), "
+                "('https://a.com', '<p>old</p>', 'old', '2024-01-01 00:00:00')"
+            ))
+        engine.dispose()
+
+        db = DatabaseManager(url)
+        try:
+            snapshot = db.get_latest_snapshot('https://a.com')
+            assert snapshot.blob_hash is None
+            assert snapshot.raw_html == '<p>old</p>'
+            assert snapshot.text_content == 'old'
+        finally:
+            db.close()
+
+
+class TestLatestPointer:
+
+    def test_get_latest_follows_last_save(self, repository):
+        repository.save(url="https://a.com/x", raw_html="v1", text_content="v1")
+        repository.save(url="https://a.com/x", raw_html="v2", text_content="v2")
+
+        assert repository.get_latest("https://a.com/x").raw_html == "v2"
+        assert repository.get_latest("https://a.com/missing") is None
+
+    def test_get_latest_many(self, repository):
+        repository.save(url="https://a.com/x", raw_html="x1", text_content="x1")
+        repository.save(url="https://a.com/x", raw_html="x2", text_content="x2")
+        repository.save(url="https://b.com/y", raw_html="y1", text_content="y1")
+
+        latest = repository.get_latest_many(["https://a.com/x", "https://b.com/y", "https://c.com/z"])
+
+        assert {url: s.raw_html for url, s in latest.items()} == {
+            "https://a.com/x": "x2",
+            "https://b.com/y": "y1",
+        }
+
+
+class TestBatchedWrites:
+
+    def test_save_many_commits_per_chunk(self, repository):
+        db = repository._db
+        items = [
+            dict(url=f"https://a.com/{i % 3}", raw_html=f"<p>{i}</p>", text_content=str(i))
+            for i in range(7)
+        ]
+        commits = []
+        original_commit = db.session.commit
+        db.session.commit = lambda: (commits.append(1), original_commit())
+
+        saved = repository.save_many(items, chunk_size=3)
+
+        assert len(saved) == 7 and all(s.id for s in saved)
+        assert len(commits) == 3
+        latest = repository.get_latest_many(["https://a.com/0", "https://a.com/1", "https://a.com/2"])
+        assert {url: s.raw_html for url, s in latest.items()} == {
+            "https://a.com/0": "<p>6</p>",
+            "https://a.com/1": "<p>4</p>",
+            "https://a.com/2": "<p>5</p>",
+        }
+
+    def test_failed_chunk_leaves_no_trace(self, repository):
+        repository.save(url="https://a.com/x", raw_html="v1", text_content="v1")
+        items = [
+            dict(url="https://a.com/x", raw_html="v2", text_content="v2"),
+            dict(url=None, raw_html="broken", text_content="broken"),
+        ]
+
+        with pytest.raises(Exception):
+            repository.save_many(items)
+
+        session = repository._db.session
+        assert session.query(Snapshot).count() == 1
+        assert session.query(SnapshotBlob).count() == 1
+        assert repository.get_latest("https://a.com/x").raw_html == "v1"
+        # Сессия пригодна для дальнейшей работы
+        repository.save(url="https://a.com/x", raw_html="v3", text_content="v3")
+        assert repository.get_latest("https://a.com/x").raw_html == "v3"
+
+    def test_delta_chain_within_batch(self):
+        db = DatabaseManager('sqlite:///:memory:', storage_mode='delta', keyframe_interval=10)
+        try:
+            versions = [PAGE.replace("POST /leads", f"POST /leads/v{i}", 1) for i in range(4)]
+            db.save_snapshots([dict(url="https://a.com/leads", raw_html=v, text_content=None) for v in versions])
+            db.session.expunge_all()
+
+            snapshots = db.session.query(Snapshot).order_by(Snapshot.id).all()
+
+            assert [s.blob.chain_length for s in snapshots] == [0, 1, 2, 3]
+            assert [s.raw_html for s in snapshots] == versions
+        finally:
+            db.close()
+
+
+class TestAsyncRepository:
+
+    def test_async_database_url(self):
+        pytest.importorskip("greenlet")
+        from api_watcher.storage.async_repository import async_database_url
+        assert async_database_url("sqlite:///api_watcher.db") == "sqlite+aiosqlite:///api_watcher.db"
+        assert async_database_url("postgresql://u:p@db/watcher") == "postgresql+asyncpg://u:p@db/watcher"
+        assert async_database_url("postgresql+asyncpg://db/w") == "postgresql+asyncpg://db/w"
+
+    @pytest.mark.asyncio
+    async def test_roundtrip_and_concurrent_reads(self, tmp_path):
+        pytest.importorskip("greenlet")
+        pytest.importorskip("aiosqlite")
+        from api_watcher.storage.async_repository import AsyncSQLAlchemySnapshotRepository
+        async_repository = AsyncSQLAlchemySnapshotRepository(f"sqlite:///{tmp_path / 'async.db'}")
+        await async_repository.save_many([
+            dict(url="https://a.com/x", raw_html=PAGE, text_content="x"),
+            dict(url="https://b.com/y", raw_html="<p>y</p>", text_content="y"),
+        ])
+
+        x, y = await asyncio.gather(
+            async_repository.get_latest("https://a.com/x"),
+            async_repository.get_latest("https://b.com/y"),
+        )
+        latest = await async_repository.get_latest_many(["https://a.com/x", "https://c.com/z"])
+
+        # Объекты отсоединены от сессии: метаданные есть, содержимое читается отдельным запросом
+        assert x.content_hash and '_raw_html' in inspect(x).unloaded
+        await asyncio.gather(async_repository.load_payload(x), async_repository.load_payload(y))
+        assert x.raw_html == PAGE and y.text_content == "y"
+        assert list(latest) == ["https://a.com/x"]
+        await async_repository.close()
+
+
+class TestDeferredPayload:
+
+    @pytest.mark.asyncio
+    async def test_hash_match_does_not_load_payload(self, repository):
+        detector = ChangeDetector(repository, Mock(), compute_pool=ComputePool(max_workers=0))
+        repository.save(
+            url="https://a.com/leads", raw_html=PAGE, text_content="text",
+            content_hash=detector.comparator.calculate_hash(PAGE)
+        )
+        repository._db.session.expunge_all()
+
+        snapshot = repository.get_latest("https://a.com/leads")
+        result = await detector.detect_changes(snapshot, PAGE, 'html', "https://a.com/leads", None, None)
+
+        assert result['has_changes'] is False
+        unloaded = inspect(snapshot).unloaded
+        assert 'blob' in unloaded and '_raw_html' in unloaded
+
+    def test_payload_loads_on_access(self, repository):
+        repository.save(url="https://a.com/leads", raw_html=PAGE, text_content="text")
+        repository._db.session.expunge_all()
+
+        snapshot = repository.get_latest("https://a.com/leads")
+
+        assert snapshot.raw_html == PAGE
+        assert 'text_content' in inspect(snapshot.blob).unloaded
+
+
+    @pytest.mark.asyncio
+    async def test_payload_requested_only_on_hash_mismatch(self, repository):
+        url = "https://a.com/leads"
+        detector = ChangeDetector(repository, Mock(), compute_pool=ComputePool(max_workers=0))
+        repository.save(
+            url=url, raw_html=PAGE, text_content="text",
+            content_hash=detector.comparator.normalized_hash(PAGE, url)
+        )
+        snapshot = repository.get_latest(url)
+
+        with patch.object(repository, 'load_payload', wraps=repository.load_payload) as load:
+            await detector.detect_changes(snapshot, PAGE, 'html', url, None, None)
+            load.assert_not_called()
+            await detector.detect_changes(snapshot, PAGE.replace("POST", "PUT", 1), 'html', url, None, None)
+            load.assert_called_once_with(snapshot)
+
+    def test_preloaded_payload_on_detached_snapshot(self, repository):
+        repository.save(url="https://a.com/leads", raw_html=PAGE, text_content="text")
+        snapshot = repository.get_latest("https://a.com/leads")
+        repository._db.session.expunge_all()
+
+        snapshot.preload_payload({'raw_html': PAGE, 'text_content': "text", 'structured_data': None})
+
+        assert snapshot.raw_html == PAGE and snapshot.text_content == "text"
+
+
+class TestDeltaHistory:
+
+    def test_delta_roundtrip(self):
+        base = "<html><body><p>a</p>\n<p>b</p></body></html>"
+        target = "<html><body><p>a</p>\n<p>c</p><p>d</p></body></html>"
+        assert apply_delta(base, make_delta(base, target)) == target
+
+    def test_edge_edits_roundtrip(self):
+        base = "a\nb\nc\n" * 50
+        for target in ("x\n" + base, base + "x\n", base[:-2], "a\n", "", base.replace("b\n", "B\n", 1)):
+            assert apply_delta(base, make_delta(base, target)) == target
+
+    def test_scattered_edits_on_large_page(self):
+        base = "".join(f"<tr><td>field_{i}</td><td>string</td></tr>\n" for i in range(20000))
+        target = base.replace("field_100<", "field_100a<").replace("field_15000<", "field_15000b<")
+        target = target.replace("<tr><td>field_9000</td><td>string</td></tr>\n", "")
+
+        delta = make_delta(base, target)
+
+        assert apply_delta(base, delta) == target
+        assert len(delta) < 1000
+
+    def test_history_is_reconstructed(self):
+        db = DatabaseManager('sqlite:///:memory:', storage_mode='delta', keyframe_interval=3)
+        try:
+            versions = [PAGE.replace("POST /leads", f"POST /leads/v{i}", 1) for i in range(5)]
+            for version in versions:
+                db.save_snapshot(url="https://a.com/leads", raw_html=version, text_content=None)
+            db.session.expunge_all()
+
+            snapshots = db.session.query(Snapshot).order_by(Snapshot.id).all()
+
+            assert [s.blob.chain_length for s in snapshots] == [0, 1, 2, 0, 1]
+            assert [s.raw_html for s in snapshots] == versions
+            assert db.get_latest_snapshot("https://a.com/leads").raw_html == versions[-1]
+        finally:
+            db.close()
+
+
+class TestStoredText:
+
+    @pytest.mark.asyncio
+    async def test_old_page_is_not_converted_again(self, repository):
+        detector = ChangeDetector(repository, Mock(), compute_pool=ComputePool(max_workers=0))
+        url = "https://a.com/leads"
+        repository.save(
+            url=url, raw_html=PAGE, text_content=detector.comparator.page_text(PAGE, url),
+            content_hash='old', text_version=detector.comparator.text_version
+        )
+        new_page = PAGE.replace("POST /leads", "POST /v2/leads", 1)
+
+        with patch('api_watcher.services.change_detector.page_text') as page_text:
+            result = await detector.detect_changes(repository.get_latest(url), new_page, 'html', url, None, None)
+
+        assert result['has_changes'] is True
+        page_text.assert_not_called()
+        assert repository.get_latest(url).text_version == detector.comparator.text_version
+
+    @pytest.mark.asyncio
+    async def test_other_text_version_is_converted(self, repository):
+        detector = ChangeDetector(repository, Mock(), compute_pool=ComputePool(max_workers=0))
+        url = "https://a.com/leads"
+        repository.save(url=url, raw_html=PAGE, text_content="stale", content_hash='old', text_version='html2text-0:old')
+
+        result = await detector.detect_changes(repository.get_latest(url), PAGE, 'html', url, None, None)
+
+        assert result['has_changes'] is False
+
+    @pytest.mark.asyncio
+    async def test_legacy_baseline_is_restamped(self, repository):
+        detector = ChangeDetector(repository, Mock(), compute_pool=ComputePool(max_workers=0))
+        url = "https://a.com/leads"
+        # Снэпшот до нормализации шума: сырой sha256, без text_version и отпечатка
+        repository.save(url=url, raw_html=PAGE, text_content="legacy", content_hash=detector.comparator.calculate_hash(PAGE))
+        noisy = PAGE.replace("</body>", "<script>window.__BUILD_ID__ = 'a1b2c3';</script></body>")
+
+        detection = await detector.compare(repository.get_latest(url), noisy, 'html', url, None, None)
+        await detector.persist(detection)
+
+        assert detection.result == {'url': url, 'has_changes': False}
+        restamped = repository.get_latest(url)
+        assert restamped.content_hash == detector.comparator.normalized_hash(noisy, url)
+        assert restamped.text_version == detector.comparator.text_version and restamped.simhash
+        assert restamped.has_changes is False
+
+        with patch('api_watcher.services.change_detector.page_fingerprint') as page_fingerprint:
+            result = await detector.detect_changes(restamped, noisy, 'html', url, None, None)
+        assert result['has_changes'] is False
+        page_fingerprint.assert_not_called()
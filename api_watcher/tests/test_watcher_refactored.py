@@ -7,7 +7,7 @@ import asyncio
 from unittest.mock import Mock, patch, MagicMock, AsyncMock
 from api_watcher.watcher import APIWatcher
 from api_watcher.storage.repository import SnapshotRepository
-from api_watcher.utils.async_fetcher import ContentFetcher
+from api_watcher.utils.async_fetcher import ContentFetcher, FetchResult
 from api_watcher.notifier.base import NotifierManager
 
 class TestAPIWatcherRefactored:
@@ -77,7 +77,7 @@ class TestAPIWatcherRefactored:
         url = "http://example.com"
         # Content must be > 100 chars to be valid
         content = "<html><body>New Content</body></html>" + "<!-- padding -->" * 10
-        mock_fetcher.fetch.return_value = content
+        mock_fetcher.fetch.return_value = FetchResult(content=content, status_code=200, success=True, url=url)
         mock_repository.get_latest.return_value = None
         
         result = await watcher.process_url(url)
@@ -93,7 +93,7 @@ class TestAPIWatcherRefactored:
         url = "http://example.com"
         # Content must be > 100 chars to be valid
         content = "<html><body>Content</body></html>" + "<!-- padding -->" * 10
-        mock_fetcher.fetch.return_value = content
+        mock_fetcher.fetch.return_value = FetchResult(content=content, status_code=200, success=True, url=url)
         
         # Mock old snapshot
         old_snapshot = Mock()
@@ -1,5 +1,8 @@
+import mmap
+import tempfile
+
 import pytest
-from unittest.mock import Mock, AsyncMock, patch
+from unittest.mock import Mock, AsyncMock, MagicMock, patch
 import aiohttp
 from api_watcher.utils.async_fetcher import AsyncZenRowsFetcher
 
@@ -106,3 +109,30 @@ class TestZenRowsOptimization:
             for call in calls:
                 assert call.kwargs.get('premium_proxy') is False
 
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("status", [402, 429, 500])
+async def test_spilled_error_body_is_closed(status):
+    """Spilled (mmap) bodies of error responses are closed right away, not left to GC"""
+    fetcher = AsyncZenRowsFetcher("test_key")
+    spill = tempfile.TemporaryFile()
+    spill.write(b"<html>error page</html>")
+    spill.flush()
+    body = mmap.mmap(spill.fileno(), 0, access=mmap.ACCESS_READ)
+    spill.close()
+
+    mock_response = MagicMock(status=status, headers={}, charset=None)
+    ctx = MagicMock()
+    ctx.__aenter__ = AsyncMock(return_value=mock_response)
+    ctx.__aexit__ = AsyncMock(return_value=False)
+    mock_session = MagicMock()
+    mock_session.get.return_value = ctx
+
+    with patch.object(fetcher, '_get_session', new_callable=AsyncMock, return_value=mock_session), \
+            patch('api_watcher.utils.async_fetcher._read_body_limited',
+                  new_callable=AsyncMock, return_value=(body, "hash")):
+        result = await fetcher.fetch("http://example.com")
+
+    assert result.success is False and result.body is None
+    assert body.closed
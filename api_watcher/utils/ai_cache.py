@@ -0,0 +1,102 @@
+"""
+AI analysis cache
+Кэш результатов AI-анализа по паре хешей содержимого (старое -> новое) и модели
+"""
+
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, Optional
+
+from api_watcher.config import Config
+from api_watcher.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+def text_fingerprint(text: Optional[str]) -> str:
+    """Хеш текста без учёта пробельного форматирования"""
+    normalized = ' '.join((text or '').split())
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+class AIAnalysisCache:
+    """
+    Кэш вердиктов AI для переходов old -> new.
+
+    Один и тот же переход анализируется повторно, когда снэпшот не сохранился
+    (сбой цикла) или содержимое возвращается к прежней версии и обратно.
+    Записи живут ttl_seconds, при переполнении вытесняются давно не использованные.
+    Состояние хранится в JSON файле рядом со снэпшотами, запись на диск — save().
+    """
+
+    def __init__(
+        self,
+        state_file: str = "ai_cache.json",
+        ttl_seconds: Optional[float] = None,
+        max_entries: Optional[int] = None
+    ):
+        self.state_file = os.path.join(Config.SNAPSHOTS_DIR, state_file)
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else Config.AI_CACHE_TTL_DAYS * 86400
+        self.max_entries = max(1, max_entries if max_entries is not None else Config.AI_CACHE_MAX_ENTRIES)
+        # Порядок ключей = порядок использования (последний — самый свежий)
+        self._entries: Dict[str, Dict[str, Any]] = self._load()
+        self._dirty = False
+
+    @staticmethod
+    def key(kind: str, model: str, old_text: Optional[str], new_text: Optional[str]) -> str:
+        """Ключ кэша: тип анализа, модель и хеши нормализованных текстов"""
+        return f"{kind}:{model}:{text_fingerprint(old_text)}:{text_fingerprint(new_text)}"
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        """Загружает кэш из файла"""
+        if not os.path.exists(self.state_file):
+            return {}
+        try:
+            with open(self.state_file, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"failed_load_ai_cache: {e}")
+            return {}
+
+    def _expired(self, entry: Dict[str, Any], now: float) -> bool:
+        return now - entry.get('created_at', 0) > self.ttl_seconds
+
+    def get(self, key: str) -> Optional[Any]:
+        """Сохранённый результат или None (нет записи или она устарела)"""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return None
+        self._dirty = True
+        if self._expired(entry, time.time()):
+            return None
+        self._entries[key] = entry
+        return entry['value']
+
+    def put(self, key: str, value: Any) -> None:
+        """Запоминает результат (без записи на диск, см. save())"""
+        self._entries.pop(key, None)
+        self._entries[key] = {'value': value, 'created_at': time.time()}
+        while len(self._entries) > self.max_entries:
+            self._entries.pop(next(iter(self._entries)))
+        self._dirty = True
+
+    def save(self) -> None:
+        """Сохраняет кэш в файл (без устаревших записей), если были изменения"""
+        if not self._dirty:
+            return
+        now = time.time()
+        self._entries = {k: e for k, e in self._entries.items() if not self._expired(e, now)}
+        try:
+            os.makedirs(os.path.dirname(self.state_file) or '.', exist_ok=True)
+            tmp_path = f"{self.state_file}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(self._entries, f, ensure_ascii=False)
+            os.replace(tmp_path, self.state_file)
+            self._dirty = False
+        except Exception as e:
+            logger.error(f"failed_save_ai_cache: {e}")
+
+    def __len__(self) -> int:
+        return len(self._entries)
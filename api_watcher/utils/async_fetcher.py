@@ -4,21 +4,55 @@ Async content fetcher using aiohttp
 """
 
 import asyncio
-from typing import Optional, List
-from dataclasses import dataclass
+import codecs
+import hashlib
+import mmap
+import os
+import re
+import tempfile
+from typing import Optional, List, Dict, Iterable, Tuple, Union
 
 import aiohttp
 
 from api_watcher.config import Config
 from api_watcher.logging_config import get_logger
+from api_watcher.utils.host_router import HostRouter
+from api_watcher.utils.http_pool import get_http_pool
 from api_watcher.utils.usage_tracker import UsageTracker
+from api_watcher.utils.validator_store import HTTPValidatorStore
+from api_watcher.utils.rate_limiter import HostRateLimiter, THROTTLE_STATUS_CODES, parse_retry_after
 
 logger = get_logger(__name__)
 
-async def _read_text_limited(response: aiohttp.ClientResponse, max_bytes: int) -> str:
+Body = Union[bytes, bytearray, mmap.mmap]
+
+
+def _spill_file():
+    """Анонимный временный файл для тела ответа (удаляется ОС при закрытии)"""
+    spill_dir = os.path.join(Config.SNAPSHOTS_DIR, '.spill')
+    os.makedirs(spill_dir, exist_ok=True)
+    return tempfile.TemporaryFile(dir=spill_dir)
+
+
+def _close_body(body: Optional[Body]) -> None:
+    """Освобождает mmap выгруженного на диск тела (для байтов ничего не нужно)"""
+    if isinstance(body, mmap.mmap):
+        body.close()
+
+
+async def _read_body_limited(
+    response: aiohttp.ClientResponse,
+    max_bytes: int,
+    spill_bytes: int = 0
+) -> Tuple[Body, str]:
     """
     Читает тело ответа с ограничением по размеру, чтобы не тащить огромные страницы в память.
-    Декодирует с учётом charset, заменяя ошибки.
+    Возвращает байты и SHA-256 тела; хеш считается по чанкам по мере их прихода из сети
+    (до выгрузки на диск), а не по отображённым страницам — повторного прохода нет.
+
+    Если spill_bytes > 0 и тело его превышает, оно дописывается во временный файл
+    и возвращается как mmap только для чтения: пока тело не декодировано (очередь перед
+    стадией process, 304 по хешу тела), оно лежит в страничном кэше, а не в куче процесса.
     """
     # Быстрый отказ по Content-Length, если сервер его честно прислал
     content_length = response.headers.get("Content-Length")
@@ -34,26 +68,143 @@ async def _read_text_limited(response: aiohttp.ClientResponse, max_bytes: int) -
             raise ValueError(f"Response too large: {content_length_int} bytes > {max_bytes}")
 
     collected = bytearray()
-    async for chunk in response.content.iter_chunked(64 * 1024):
-        if not chunk:
-            continue
-        collected.extend(chunk)
-        if len(collected) > max_bytes:
-            raise ValueError(f"Response too large: read>{max_bytes} bytes")
+    digest = hashlib.sha256()
+    spill = None
+    size = 0
+    try:
+        async for chunk in response.content.iter_chunked(64 * 1024):
+            if not chunk:
+                continue
+            size += len(chunk)
+            digest.update(chunk)
+            if size > max_bytes:
+                raise ValueError(f"Response too large: read>{max_bytes} bytes")
+            if spill is not None:
+                spill.write(chunk)
+                continue
+            collected.extend(chunk)
+            if spill_bytes > 0 and size > spill_bytes:
+                spill = _spill_file()
+                spill.write(collected)
+                collected = bytearray()
+
+        if spill is None:
+            return collected, digest.hexdigest()
+        spill.flush()
+        # mmap держит свой дескриптор, файл можно закрыть сразу
+        return mmap.mmap(spill.fileno(), 0, access=mmap.ACCESS_READ), digest.hexdigest()
+    finally:
+        if spill is not None:
+            spill.close()
+
 
-    charset = response.charset or "utf-8"
-    return collected.decode(charset, errors="replace")
+_META_CHARSET = re.compile(rb'<meta[^>]+charset=["\']?([\w.:-]+)', re.I)
+_BOM_CHARSETS = ((codecs.BOM_UTF8, 'utf-8-sig'), (codecs.BOM_UTF16_LE, 'utf-16'), (codecs.BOM_UTF16_BE, 'utf-16'))
+
+
+def _detect_charset(response: aiohttp.ClientResponse, body: bytes) -> str:
+    """Кодировка тела: BOM, charset из Content-Type, <meta charset> в начале HTML, иначе utf-8"""
+    for bom, charset in _BOM_CHARSETS:
+        if body[:len(bom)] == bom:
+            return charset
+    charset = response.charset
+    if not charset:
+        match = _META_CHARSET.search(bytes(body[:2048]))
+        charset = match.group(1).decode('ascii') if match else None
+    try:
+        return codecs.lookup(charset).name if charset else 'utf-8'
+    except LookupError:
+        return 'utf-8'
 
 
-@dataclass
 class FetchResult:
-    """Результат получения контента"""
-    content: Optional[str]
-    status_code: int
-    success: bool
-    error: Optional[str] = None
-    url: str = ""
-    attempts: int = 1
+    """
+    Результат получения контента.
+
+    Тело хранится байтами (body) с кодировкой ответа и декодируется в content
+    лениво и один раз — когда тексту обращается стадия, которой он нужен.
+    После декодирования байты освобождаются: в памяти остаётся одна копия.
+    """
+
+    def __init__(
+        self,
+        content: Optional[str],
+        status_code: int,
+        success: bool,
+        error: Optional[str] = None,
+        url: str = "",
+        attempts: int = 1,
+        not_modified: bool = False,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+        body_hash: Optional[str] = None,
+        body: Optional[Body] = None,
+        charset: str = 'utf-8'
+    ):
+        self._content = content
+        self.status_code = status_code
+        self.success = success
+        self.error = error
+        self.url = url
+        self.attempts = attempts
+        # 304 Not Modified: контент не изменился с прошлого цикла, тела нет
+        self.not_modified = not_modified
+        # Валидаторы ответа для следующего условного запроса
+        self.etag = etag
+        self.last_modified = last_modified
+        # SHA-256 сырого тела ответа (считается при чтении; для 304 — сохранённый)
+        self.body_hash = body_hash
+        # Тело до декодирования (None, если content передан строкой или уже декодирован);
+        # большие тела могут быть mmap временного файла (см. BODY_SPILL_BYTES)
+        self.body = body
+        self.charset = charset
+
+    @property
+    def content(self) -> Optional[str]:
+        """
+        Текст ответа (декодируется при первом обращении).
+
+        Выгруженное тело декодируется одним вызовом прямо из mmap (без промежуточной копии байтов),
+        и отображение закрывается сразу после этого. Декодирование окнами не снижает пик:
+        при склейке кусков текст на мгновение существует дважды.
+        """
+        if self._content is None and self.body is not None:
+            self._content = str(self.body, self.charset, 'replace')
+            self._drop_body()
+        return self._content
+
+    @content.setter
+    def content(self, value: Optional[str]) -> None:
+        self._content = value
+        self._drop_body()
+
+    def _drop_body(self) -> None:
+        _close_body(self.body)
+        self.body = None
+
+    @property
+    def has_content(self) -> bool:
+        """Есть непустое тело (без декодирования)"""
+        if self._content is not None:
+            return bool(self._content)
+        return bool(self.body)
+
+    @property
+    def size(self) -> int:
+        """Размер тела: байты до декодирования, символы после"""
+        value = self.body if self.body is not None else self._content
+        return len(value) if value else 0
+
+    def release_body(self) -> None:
+        """Освобождает тело и текст, оставляя статус и валидаторы (нужны до конца цикла)"""
+        self._content = None
+        self._drop_body()
+
+    def __repr__(self) -> str:
+        return (
+            f"FetchResult(url={self.url!r}, status_code={self.status_code}, success={self.success}, "
+            f"not_modified={self.not_modified}, size={self.size}, error={self.error!r})"
+        )
 
 
 # Retryable HTTP status codes
@@ -83,19 +234,21 @@ class AsyncFetcher:
         user_agent: str = Config.USER_AGENT,
         max_retries: int = DEFAULT_MAX_RETRIES,
         retry_delay: float = DEFAULT_RETRY_DELAY,
-        retry_multiplier: float = DEFAULT_RETRY_MULTIPLIER
+        retry_multiplier: float = DEFAULT_RETRY_MULTIPLIER,
+        rate_limiter: Optional[HostRateLimiter] = None
     ):
         self.timeout = aiohttp.ClientTimeout(total=timeout)
         self.headers = {'User-Agent': user_agent}
         self.max_retries = max_retries
         self.retry_delay = retry_delay
         self.retry_multiplier = retry_multiplier
+        self.rate_limiter = rate_limiter
         self._session: Optional[aiohttp.ClientSession] = None
     
     async def _get_session(self) -> aiohttp.ClientSession:
-        """Получает или создает сессию"""
+        """Получает или создает сессию (поверх общего пула соединений)"""
         if self._session is None or self._session.closed:
-            self._session = aiohttp.ClientSession(
+            self._session = get_http_pool().session(
                 timeout=self.timeout,
                 headers=self.headers
             )
@@ -105,32 +258,84 @@ class AsyncFetcher:
         """Проверяет, можно ли повторить запрос для данного статуса"""
         return status_code in RETRYABLE_STATUS_CODES
     
-    async def fetch(self, url: str, retry: bool = True) -> FetchResult:
+    def _retry_wait(self, delay: float, retry_after: Optional[float]) -> float:
+        """
+        Пауза перед повтором: Retry-After сервера важнее фиксированного backoff.
+        Если подключён лимитер, он сам блокирует хост до Retry-After в acquire().
+        """
+        if retry_after is None:
+            return delay
+        return 0.0 if self.rate_limiter else retry_after
+    
+    @staticmethod
+    def _conditional_headers(validators: Optional[Dict[str, str]]) -> Dict[str, str]:
+        """Формирует If-None-Match / If-Modified-Since из сохранённых валидаторов"""
+        headers: Dict[str, str] = {}
+        if not validators:
+            return headers
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+        return headers
+
+    async def fetch(
+        self,
+        url: str,
+        retry: bool = True,
+        validators: Optional[Dict[str, str]] = None
+    ) -> FetchResult:
         """
         Асинхронно получает контент URL с retry логикой
-        
+
         Args:
             url: URL для получения
             retry: Включить retry при ошибках (default: True)
-            
+            validators: ETag / Last-Modified прошлого ответа для условного запроса
+                и body_hash — SHA-256 его тела
+
         Returns:
-            FetchResult с контентом или ошибкой
+            FetchResult с контентом или ошибкой (not_modified=True при 304
+            и при 200 с тем же телом, что и в прошлый раз)
         """
         last_error: Optional[str] = None
         last_status: int = 0
         attempts = 0
         delay = self.retry_delay
-        
+
         max_attempts = self.max_retries if retry else 1
-        
+        request_headers = self._conditional_headers(validators)
+
         for attempt in range(max_attempts):
             attempts = attempt + 1
             try:
                 session = await self._get_session()
-                async with session.get(url) as response:
+                if self.rate_limiter:
+                    await self.rate_limiter.acquire(url)
+                async with session.get(url, headers=request_headers or None) as response:
+                    if self.rate_limiter and response.status in (200, 304):
+                        self.rate_limiter.on_success(url)
+                    
+                    if response.status == 304 and request_headers:
+                        logger.info("not_modified", url=url)
+                        return FetchResult(
+                            content=None,
+                            status_code=304,
+                            success=True,
+                            url=url,
+                            attempts=attempts,
+                            not_modified=True,
+                            etag=validators.get('etag'),
+                            last_modified=validators.get('last_modified'),
+                            body_hash=validators.get('body_hash')
+                        )
+
                     try:
-                        max_bytes = max(1, int(getattr(Config, "MAX_RESPONSE_BYTES", 2 * 1024 * 1024)))
-                        content = await _read_text_limited(response, max_bytes=max_bytes)
+                        body, body_hash = await _read_body_limited(
+                            response,
+                            max_bytes=Config.get_max_response_bytes(url),
+                            spill_bytes=int(getattr(Config, "BODY_SPILL_BYTES", 0))
+                        )
                     except ValueError as e:
                         # Не ретраим: это "логическая" ошибка/защита от чрезмерных ответов
                         logger.warning("response_too_large", url=url, error=str(e))
@@ -143,27 +348,63 @@ class AsyncFetcher:
                             attempts=attempts
                         )
                     
+                    retry_after: Optional[float] = None
+                    if response.status in THROTTLE_STATUS_CODES:
+                        retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                        if self.rate_limiter:
+                            self.rate_limiter.on_throttle(url, retry_after)
+                    
                     # Check if we should retry based on status code
-                    if self._is_retryable_status(response.status) and attempt < max_attempts - 1:
+                    max_retry_after = int(getattr(Config, "MAX_RETRY_AFTER_SECONDS", 120))
+                    if (
+                        self._is_retryable_status(response.status)
+                        and attempt < max_attempts - 1
+                        and (retry_after is None or retry_after <= max_retry_after)
+                    ):
                         logger.warning(
                             "retryable_status",
                             url=url,
                             status_code=response.status,
                             attempt=attempt + 1,
-                            max_attempts=max_attempts
+                            max_attempts=max_attempts,
+                            retry_after=retry_after
                         )
                         last_status = response.status
                         last_error = f"HTTP {response.status}"
-                        await asyncio.sleep(delay)
+                        _close_body(body)
+                        await asyncio.sleep(self._retry_wait(delay, retry_after))
                         delay *= self.retry_multiplier
                         continue
                     
+                    etag = response.headers.get('ETag')
+                    last_modified = response.headers.get('Last-Modified')
+                    if response.status == 200 and validators and validators.get('body_hash') == body_hash:
+                        # Сервер не поддерживает 304, но тело то же: не декодируем и не обрабатываем
+                        logger.info("body_unchanged", url=url)
+                        _close_body(body)
+                        return FetchResult(
+                            content=None,
+                            status_code=200,
+                            success=True,
+                            url=url,
+                            attempts=attempts,
+                            not_modified=True,
+                            etag=etag,
+                            last_modified=last_modified,
+                            body_hash=body_hash
+                        )
+                    
                     return FetchResult(
-                        content=content,
+                        content=None,
                         status_code=response.status,
                         success=response.status == 200,
                         url=url,
-                        attempts=attempts
+                        attempts=attempts,
+                        etag=etag,
+                        last_modified=last_modified,
+                        body_hash=body_hash,
+                        body=body,
+                        charset=_detect_charset(response, body)
                     )
                     
             except RETRYABLE_EXCEPTIONS as e:
@@ -254,11 +495,14 @@ class AsyncZenRowsFetcher:
         timeout: int = 60,
         max_retries: int = DEFAULT_MAX_RETRIES,
         usage_tracker: Optional[UsageTracker] = None,
-        daily_request_limit: Optional[int] = None
+        daily_request_limit: Optional[int] = None,
+        rate_limiter: Optional[HostRateLimiter] = None
     ):
         self.api_key = api_key
         self.timeout = aiohttp.ClientTimeout(total=timeout)
         self.max_retries = max_retries
+        # Лимитер ключуется по хосту ZenRows API: 429 означает лимит аккаунта, а не целевого сайта
+        self.rate_limiter = rate_limiter
         self._session: Optional[aiohttp.ClientSession] = None
         self.usage_tracker = usage_tracker or UsageTracker()
         self.daily_request_limit = (
@@ -270,7 +514,7 @@ class AsyncZenRowsFetcher:
     
     async def _get_session(self) -> aiohttp.ClientSession:
         if self._session is None or self._session.closed:
-            self._session = aiohttp.ClientSession(timeout=self.timeout)
+            self._session = get_http_pool().session(timeout=self.timeout)
         return self._session
     
     async def fetch(
@@ -360,10 +604,15 @@ class AsyncZenRowsFetcher:
                 # Выполняем запрос (счетчик уже увеличен в try_increment() если skip_counter=False и attempt == 0)
                 # Примечание: Если запрос падает с сетевой ошибкой ДО выполнения HTTP запроса,
                 # счетчик уже увеличен, но это правильное поведение - мы резервируем слот для попытки.
+                if self.rate_limiter:
+                    await self.rate_limiter.acquire(self.BASE_URL)
                 async with session.get(self.BASE_URL, params=params) as response:
                     try:
-                        max_bytes = max(1, int(getattr(Config, "MAX_RESPONSE_BYTES", 2 * 1024 * 1024)))
-                        content = await _read_text_limited(response, max_bytes=max_bytes)
+                        body, _ = await _read_body_limited(
+                            response,
+                            max_bytes=Config.get_max_response_bytes(url),
+                            spill_bytes=int(getattr(Config, "BODY_SPILL_BYTES", 0))
+                        )
                     except ValueError as e:
                         logger.warning("zenrows_response_too_large", url=url, error=str(e))
                         return FetchResult(
@@ -381,6 +630,7 @@ class AsyncZenRowsFetcher:
                         # На практике 402 может означать "кончился баланс" — не спамим дальше платными запросами
                         logger.critical("zenrows_payment_required_disabling", url=url)
                         self._disabled = True
+                        _close_body(body)
                         return FetchResult(
                             content=None,
                             status_code=402,
@@ -391,7 +641,24 @@ class AsyncZenRowsFetcher:
                         )
                     
                     if response.status == 429:
+                        retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                        if self.rate_limiter:
+                            self.rate_limiter.on_throttle(self.BASE_URL, retry_after)
+                        max_retry_after = int(getattr(Config, "MAX_RETRY_AFTER_SECONDS", 120))
+                        # Повторяем только если сервер сказал, когда можно (и это в пределах цикла).
+                        # Слот дневного лимита уже зарезервирован — повтор его не инкрементирует.
+                        if (
+                            retry_after is not None
+                            and retry_after <= max_retry_after
+                            and attempt < self.max_retries - 1
+                        ):
+                            logger.warning("zenrows_rate_limit_retry_after", url=url, retry_after=retry_after)
+                            _close_body(body)
+                            if not self.rate_limiter:
+                                await asyncio.sleep(retry_after)
+                            continue
                         logger.error("zenrows_rate_limit_aborting", url=url)
+                        _close_body(body)
                         # Don't retry aggressively on 429, just fail this request
                         return FetchResult(
                             content=None,
@@ -414,21 +681,31 @@ class AsyncZenRowsFetcher:
                             status_code=response.status,
                             attempt=attempt + 1
                         )
+                        _close_body(body)
                         await asyncio.sleep(delay)
                         delay *= 2
                         continue
                     
                     if success:
+                        if self.rate_limiter:
+                            self.rate_limiter.on_success(self.BASE_URL)
                         logger.info("zenrows_success", url=url, attempts=attempt + 1)
                     else:
                         logger.warning("zenrows_bad_status", url=url, status_code=response.status)
                     
+                    charset = _detect_charset(response, body)
+                    if not success:
+                        # Тело ошибки не нужно: выгруженное на диск закрываем сразу, а не ждём GC
+                        _close_body(body)
+                        body = None
                     return FetchResult(
-                        content=content if success else None,
+                        content=None,
                         status_code=response.status,
                         success=success,
                         url=url,
-                        attempts=attempt + 1
+                        attempts=attempt + 1,
+                        body=body,
+                        charset=charset
                     )
                     
             except RETRYABLE_EXCEPTIONS as e:
@@ -470,28 +747,37 @@ class AsyncZenRowsFetcher:
         Получает контент с fallback стратегией.
         Вторая попытка НЕ инкрементирует счетчик, чтобы избежать двойного подсчета.
         """
-        # Попытка 1: базовые настройки (инкрементирует счетчик)
-        result = await self.fetch(
-            url,
-            js_render=bool(getattr(Config, "ZENROWS_JS_RENDER", True)),
-            premium_proxy=False,
-            antibot=bool(getattr(Config, "ZENROWS_ANTIBOT", False)),
-            skip_counter=False
-        )
-        if result.success:
-            return result.content
-        
-        logger.warning("zenrows_retry_no_js", url=url)
-        
-        # Попытка 2: без JS (НЕ инкрементирует счетчик - это fallback в рамках одного запроса)
-        result = await self.fetch(
-            url,
-            js_render=False,
-            premium_proxy=False,
-            antibot=bool(getattr(Config, "ZENROWS_ANTIBOT", False)),
-            skip_counter=True  # Пропускаем инкремент для fallback попытки
-        )
-        return result.content if result.success else None
+        content, _ = await self.fetch_routed(url)
+        return content
+
+    async def fetch_routed(
+        self,
+        url: str,
+        js_render: Optional[bool] = None
+    ) -> Tuple[Optional[str], Optional[bool]]:
+        """
+        fetch_with_fallback, начинающий с выученного для хоста режима (js_render).
+        Возвращает (контент, js_render сработавшей попытки) или (None, None).
+        """
+        # С JS только если он разрешён в конфиге; без JS — всегда запасной вариант
+        modes = [True, False] if bool(getattr(Config, "ZENROWS_JS_RENDER", True)) else [False]
+        if js_render is False:
+            modes.reverse()
+
+        for attempt, mode in enumerate(modes):
+            if attempt:
+                logger.warning("zenrows_retry_js" if mode else "zenrows_retry_no_js", url=url)
+            # Повтор НЕ инкрементирует счетчик - это fallback в рамках одного запроса
+            result = await self.fetch(
+                url,
+                js_render=mode,
+                premium_proxy=False,
+                antibot=bool(getattr(Config, "ZENROWS_ANTIBOT", False)),
+                skip_counter=attempt > 0
+            )
+            if result.success:
+                return result.content, mode
+        return None, None
     
     async def close(self) -> None:
         if self._session and not self._session.closed:
@@ -515,27 +801,47 @@ class ContentFetcher:
         zenrows_api_key: Optional[str] = None,
         timeout: int = 30,
         user_agent: str = Config.USER_AGENT,
-        max_retries: int = 3
+        max_retries: int = 3,
+        validator_store: Optional[HTTPValidatorStore] = None,
+        rate_limiter: Optional[HostRateLimiter] = None,
+        host_router: Optional[HostRouter] = None
     ):
+        # Общий адаптивный лимитер для прямых запросов и ZenRows
+        self._rate_limiter: Optional[HostRateLimiter] = rate_limiter
+        if self._rate_limiter is None and bool(getattr(Config, "ADAPTIVE_RATE_LIMIT", True)):
+            self._rate_limiter = HostRateLimiter()
+        
         self._direct = AsyncFetcher(
             timeout=timeout, 
             user_agent=user_agent,
-            max_retries=max_retries
+            max_retries=max_retries,
+            rate_limiter=self._rate_limiter
         )
         self._zenrows: Optional[AsyncZenRowsFetcher] = None
         self._usage_tracker = UsageTracker()
         
+        # Валидаторы для условных запросов (только прямой путь: ZenRows их не проксирует)
+        self._validators: Optional[HTTPValidatorStore] = validator_store
+        if self._validators is None and bool(getattr(Config, "CONDITIONAL_GET", True)):
+            self._validators = HTTPValidatorStore()
+        
         if zenrows_api_key:
             self._zenrows = AsyncZenRowsFetcher(
                 zenrows_api_key, 
                 timeout=60,
                 max_retries=max_retries,
                 usage_tracker=self._usage_tracker,
-                daily_request_limit=getattr(Config, "ZENROWS_DAILY_REQUEST_LIMIT", 2000)
+                daily_request_limit=getattr(Config, "ZENROWS_DAILY_REQUEST_LIMIT", 2000),
+                rate_limiter=self._rate_limiter
             )
             logger.info("zenrows_client_initialized")
+        
+        # Выученные маршруты хостов нужны только при наличии ZenRows как запасного пути
+        self._router: Optional[HostRouter] = host_router
+        if self._router is None and self._zenrows and bool(getattr(Config, "ZENROWS_ROUTING", True)):
+            self._router = HostRouter()
     
-    async def fetch(self, url: str) -> Optional[str]:
+    async def fetch(self, url: str) -> FetchResult:
         """
         Получает контент URL
         
@@ -543,7 +849,7 @@ class ContentFetcher:
             url: URL для получения
             
         Returns:
-            Контент или None
+            FetchResult (not_modified=True, если сервер ответил 304 на условный запрос)
         """
         # Стратегия по умолчанию: direct_first, чтобы не жечь ZenRows на JSON/YAML/простых доменах.
         strategy = getattr(Config, "ZENROWS_STRATEGY", "direct_first")
@@ -559,17 +865,26 @@ class ContentFetcher:
 
         skip_static = bool(getattr(Config, "ZENROWS_SKIP_STATIC", True))
         should_skip_zenrows = skip_static and _looks_static(url)
+        direct_result: Optional[FetchResult] = None
+        router = self._router if self._zenrows and not should_skip_zenrows else None
 
-        # 1) direct_first: пробуем прямой запрос
+        # 1) direct_first: пробуем прямой запрос (кроме хостов, которые стабильно его блокируют)
         if strategy != "zenrows_first" or should_skip_zenrows or not self._zenrows:
-            logger.debug("fetching_direct", url=url)
-            direct_result = await self._direct.fetch(url)
-            if direct_result.success and direct_result.content:
-                return direct_result.content
-            # если ZenRows не настроен или нельзя — сдаёмся
-            if not self._zenrows or should_skip_zenrows:
-                return None
-            # иначе пробуем ZenRows как fallback
+            if router is not None and router.should_skip_direct(url):
+                logger.debug("skipping_direct_learned_route", url=url)
+            else:
+                logger.debug("fetching_direct", url=url)
+                validators = self._validators.get(url) if self._validators else None
+                direct_result = await self._direct.fetch(url, validators=validators)
+                succeeded = direct_result.not_modified or (direct_result.success and direct_result.has_content)
+                if router is not None:
+                    router.record_direct(url, succeeded)
+                if succeeded:
+                    return direct_result
+                # если ZenRows не настроен или нельзя — сдаёмся
+                if not self._zenrows or should_skip_zenrows:
+                    return direct_result
+                # иначе пробуем ZenRows как fallback
 
         # 2) ZenRows (если доступен и не запрещён)
         if self._zenrows:
@@ -583,14 +898,68 @@ class ContentFetcher:
                     limit=limit,
                     usage=usage
                 )
-                return None
+                return direct_result or FetchResult(
+                    content=None,
+                    status_code=0,
+                    success=False,
+                    error="ZenRows daily limit exceeded",
+                    url=url
+                )
 
             logger.info("fetching_via_zenrows", url=url)
-            return await self._zenrows.fetch_with_fallback(url)
+            content, js_render = await self._zenrows.fetch_routed(
+                url, js_render=router.js_render(url) if router is not None else None
+            )
+            if router is not None:
+                router.record_zenrows(url, js_render)
+            return FetchResult(
+                content=content,
+                status_code=200 if content else 0,
+                success=bool(content),
+                error=None if content else "ZenRows fetch failed",
+                url=url
+            )
 
-        return None
+        return direct_result or FetchResult(
+            content=None,
+            status_code=0,
+            success=False,
+            error="No fetch strategy available",
+            url=url
+        )
+    
+    def commit_validators(self, results: Iterable[FetchResult]) -> None:
+        """
+        Фиксирует валидаторы успешно обработанных ответов и сохраняет их на диск.
+        Вызывается после обработки цикла, чтобы 304 никогда не скрывал необработанное изменение.
+        """
+        if not self._validators:
+            return
+        for result in results:
+            if result.not_modified or not result.success:
+                continue
+            self._validators.update(result.url, result.etag, result.last_modified, result.body_hash)
+        self._validators.save()
+    
+    def forget_validators(self, url: str) -> None:
+        """Сбрасывает валидаторы URL: следующий запрос будет безусловным"""
+        if not self._validators:
+            return
+        self._validators.discard(url)
+        self._validators.save()
+    
+    def save_rate_limits(self) -> None:
+        """Сохраняет выученные скорости хостов (между циклами и перезапусками)"""
+        if self._rate_limiter:
+            self._rate_limiter.save()
+    
+    def save_host_routes(self) -> None:
+        """Подводит итог цикла по маршрутам хостов (прямой запрос / ZenRows) и сохраняет их"""
+        if self._router is not None:
+            self._router.finish_cycle()
+            self._router.save()
     
-    async def fetch_many(self, urls: List[str]) -> dict[str, Optional[str]]:
+    async def fetch_many(self, urls: List[str]) -> dict[str, FetchResult]:
         """
         Получает контент нескольких URL параллельно
         
@@ -598,7 +967,7 @@ class ContentFetcher:
             urls: Список URL
             
         Returns:
-            Словарь {url: content}
+            Словарь {url: FetchResult}
         """
         tasks = [self.fetch(url) for url in urls]
         results = await asyncio.gather(*tasks)
@@ -606,6 +975,8 @@ class ContentFetcher:
     
     async def close(self) -> None:
         """Закрывает все соединения"""
+        self.save_rate_limits()
+        self.save_host_routes()
         await self._direct.close()
         if self._zenrows:
             await self._zenrows.close()
@@ -0,0 +1,322 @@
+"""
+Local change classifier
+Дешёвая детерминированная оценка diff перед AI: очевидно мелкие и очевидно крупные
+изменения решаются на месте, в модель уходят только неоднозначные
+"""
+
+import json
+import os
+import re
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from difflib import SequenceMatcher
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from api_watcher.config import Config
+from api_watcher.logging_config import get_logger
+from api_watcher.utils.noise_normalizer import DATE_PATTERN
+
+logger = get_logger(__name__)
+
+MINOR = 'minor'
+MAJOR = 'major'
+AMBIGUOUS = 'ambiguous'
+
+# Режимы: on — локальные решения заменяют AI, shadow — только записываются рядом с вердиктом AI
+MODE_ON = 'on'
+MODE_SHADOW = 'shadow'
+
+_TOKEN = re.compile(r'\w+|[^\w\s]')
+_WORD_CHAR = re.compile(r'\w')
+_DATE = re.compile(DATE_PATTERN, re.I)
+_ENDPOINT = re.compile(r'\b(GET|POST|PUT|PATCH|DELETE)\s+(/[^\s`|)"\']*)')
+# Имена параметров: `code`, snake_case, camelCase (ищутся только в коде, таблицах и inline-коде)
+_INLINE_CODE = re.compile(r'`([^`\n]+)`')
+_IDENTIFIER = re.compile(r'\b([a-z][a-z0-9]*(?:_[a-z0-9]+)+|[a-z]+(?:[A-Z][a-z0-9]*)+)\b')
+# Отрицания, модальность и обязательность: правка одного такого слова может быть ломающей
+REQUIREMENT_KEYWORDS = frozenset({
+    'not', 'no', 'never', 'must', 'should', 'shall', 'may',
+    'required', 'optional', 'mandatory', 'deprecated', 'removed',
+})
+
+
+@dataclass
+class ChangeSignals:
+    """Признаки diff, по которым принимается решение"""
+    changed_tokens: int = 0
+    total_tokens: int = 0
+    whitespace_only: bool = False
+    date_only: bool = False
+    punctuation_only: bool = False
+    code_changed: bool = False
+    table_changed: bool = False
+    numbers_changed: bool = False
+    added_params: List[str] = field(default_factory=list)
+    removed_params: List[str] = field(default_factory=list)
+    added_endpoints: List[str] = field(default_factory=list)
+    removed_endpoints: List[str] = field(default_factory=list)
+    keywords: List[str] = field(default_factory=list)
+
+    @property
+    def ratio(self) -> float:
+        return self.changed_tokens / self.total_tokens if self.total_tokens else 0.0
+
+    @property
+    def structural(self) -> bool:
+        """Затронуты код, таблицы, числа, параметры или эндпоинты"""
+        return bool(
+            self.code_changed or self.table_changed or self.numbers_changed
+            or self.added_params or self.removed_params
+            or self.added_endpoints or self.removed_endpoints
+        )
+
+
+@dataclass
+class ClassifierDecision:
+    verdict: str
+    reason: str
+    signals: ChangeSignals
+
+    @property
+    def is_local(self) -> bool:
+        """Решение принято без AI"""
+        return self.verdict != AMBIGUOUS
+
+    def analysis(self) -> Dict[str, Any]:
+        """Вердикт в формате analyze_changes (для MINOR / MAJOR)"""
+        if self.verdict == MINOR:
+            return {
+                'has_significant_changes': False,
+                'summary': f"Незначительные изменения ({self.reason})",
+                'severity': 'minor',
+                'key_changes': []
+            }
+        signals = self.signals
+        key_changes = [f"Удалён эндпоинт {e}" for e in signals.removed_endpoints]
+        key_changes += [f"Удалён параметр `{p}`" for p in signals.removed_params]
+        if key_changes:
+            summary = "Удалены эндпоинты или параметры: " + ", ".join(
+                signals.removed_endpoints + [f"`{p}`" for p in signals.removed_params]
+            )
+        else:
+            summary = f"Страница существенно переписана (изменено {signals.ratio:.0%} текста)"
+        return {
+            'has_significant_changes': True,
+            'summary': summary,
+            'severity': 'major',
+            'key_changes': key_changes[:10]
+        }
+
+
+def _code_lines(lines: List[str]) -> Set[int]:
+    """Строки кода в выводе html2text: отступ 4+ пробела или fenced-блок"""
+    result = set()
+    fenced = False
+    for i, line in enumerate(lines):
+        if line.lstrip().startswith('```'):
+            fenced = not fenced
+            result.add(i)
+        elif fenced or (line.strip() and (line.startswith('    ') or line.startswith('\t'))):
+            result.add(i)
+    return result
+
+
+def _parameters(lines: List[str], code: Set[int]) -> Set[str]:
+    """Имена параметров из строк кода, таблиц и inline-кода"""
+    names = set()
+    for i, line in enumerate(lines):
+        if i in code or '|' in line:
+            names.update(_IDENTIFIER.findall(line))
+        for snippet in _INLINE_CODE.findall(line):
+            names.update(_IDENTIFIER.findall(snippet))
+    return names
+
+
+def _endpoints(text: str) -> Set[str]:
+    return {f"{method} {path.rstrip('.,;:')}" for method, path in _ENDPOINT.findall(text)}
+
+
+def _changed_lines(old_lines: List[str], new_lines: List[str]) -> Tuple[List[int], List[int]]:
+    """Номера изменённых строк старого и нового текста"""
+    old_changed, new_changed = [], []
+    matcher = SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag != 'equal':
+            old_changed.extend(range(i1, i2))
+            new_changed.extend(range(j1, j2))
+    return old_changed, new_changed
+
+
+def change_signals(old_text: str, new_text: str) -> ChangeSignals:
+    """Считает признаки изменения между двумя текстами страницы"""
+    old_text, new_text = old_text or '', new_text or ''
+    signals = ChangeSignals(
+        total_tokens=max(len(_TOKEN.findall(old_text)), len(_TOKEN.findall(new_text)))
+    )
+    if old_text.split() == new_text.split():
+        signals.whitespace_only = True
+        return signals
+    signals.date_only = _DATE.sub('<date>', old_text).split() == _DATE.sub('<date>', new_text).split()
+
+    old_lines, new_lines = old_text.splitlines(), new_text.splitlines()
+    old_changed, new_changed = _changed_lines(old_lines, new_lines)
+
+    # Токены считаются только по изменённым строкам: diff всей страницы по токенам слишком дорог
+    old_tokens = _TOKEN.findall('\n'.join(old_lines[i] for i in old_changed))
+    new_tokens = _TOKEN.findall('\n'.join(new_lines[j] for j in new_changed))
+    matcher = SequenceMatcher(None, old_tokens, new_tokens, autojunk=False)
+    changed: List[str] = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            continue
+        signals.changed_tokens += max(i2 - i1, j2 - j1)
+        changed.extend(old_tokens[i1:i2] + new_tokens[j1:j2])
+    signals.numbers_changed = any(ch.isdigit() for token in changed for ch in token)
+    signals.punctuation_only = bool(changed) and not any(_WORD_CHAR.search(token) for token in changed)
+    signals.keywords = sorted({token.lower() for token in changed} & REQUIREMENT_KEYWORDS)
+
+    old_code, new_code = _code_lines(old_lines), _code_lines(new_lines)
+    signals.code_changed = any(i in old_code for i in old_changed) or any(j in new_code for j in new_changed)
+    signals.table_changed = (
+        any('|' in old_lines[i] for i in old_changed) or any('|' in new_lines[j] for j in new_changed)
+    )
+
+    old_params, new_params = _parameters(old_lines, old_code), _parameters(new_lines, new_code)
+    signals.added_params = sorted(new_params - old_params)
+    signals.removed_params = sorted(old_params - new_params)
+    old_endpoints, new_endpoints = _endpoints(old_text), _endpoints(new_text)
+    signals.added_endpoints = sorted(new_endpoints - old_endpoints)
+    signals.removed_endpoints = sorted(old_endpoints - new_endpoints)
+    return signals
+
+
+def classify_change(
+    old_text: str,
+    new_text: str,
+    minor_tokens: Optional[int] = None,
+    major_ratio: Optional[float] = None
+) -> ClassifierDecision:
+    """
+    MINOR: только пробелы, даты или знаки препинания (до minor_tokens токенов,
+    без кода, таблиц и имён параметров). Правка слов — даже одного — решается AI:
+    "required" -> "optional" или добавленное "not" меняют смысл.
+    MAJOR: удалены эндпоинты или параметры, либо изменено major_ratio текста и больше.
+    Остальное — AMBIGUOUS (решает AI).
+    """
+    minor_tokens = Config.CLASSIFIER_MINOR_TOKENS if minor_tokens is None else minor_tokens
+    major_ratio = Config.CLASSIFIER_MAJOR_RATIO if major_ratio is None else major_ratio
+    signals = change_signals(old_text, new_text)
+
+    if signals.whitespace_only:
+        return ClassifierDecision(MINOR, 'whitespace', signals)
+    if signals.date_only:
+        return ClassifierDecision(MINOR, 'date', signals)
+    if signals.removed_endpoints or signals.removed_params:
+        return ClassifierDecision(MAJOR, 'removed', signals)
+    # Маленькие страницы не считаем "переписанными": там любая правка — большая доля текста
+    if signals.ratio >= major_ratio and signals.changed_tokens > 10 * max(1, minor_tokens):
+        return ClassifierDecision(MAJOR, 'rewrite', signals)
+    if signals.keywords:
+        return ClassifierDecision(AMBIGUOUS, 'requirement_keywords', signals)
+    if signals.punctuation_only and signals.changed_tokens <= minor_tokens and not signals.structural:
+        return ClassifierDecision(MINOR, 'punctuation', signals)
+    return ClassifierDecision(AMBIGUOUS, 'needs_ai', signals)
+
+
+class ChangeClassifier:
+    """
+    Журнал решений локального классификатора.
+
+    Считает решения по типам и сэкономленные вызовы AI; в режиме shadow локальное
+    решение не применяется, а сверяется с вердиктом AI (согласие/расхождение),
+    чтобы настроить пороги перед включением. Последние max_decisions решений
+    хранятся в JSON файле рядом со снэпшотами, запись на диск — save().
+    """
+
+    def __init__(
+        self,
+        mode: str = MODE_ON,
+        state_file: str = "classifier_stats.json",
+        max_decisions: int = 500
+    ):
+        self.mode = mode
+        self.state_file = os.path.join(Config.SNAPSHOTS_DIR, state_file)
+        self.max_decisions = max_decisions
+        self._state: Dict[str, Any] = self._load()
+        self._state.setdefault('totals', {})
+        self._state.setdefault('decisions', [])
+        self._dirty = False
+
+    @classmethod
+    def from_config(cls) -> 'ChangeClassifier':
+        return cls(mode=Config.CHANGE_CLASSIFIER)
+
+    @property
+    def shadow(self) -> bool:
+        return self.mode == MODE_SHADOW
+
+    @property
+    def totals(self) -> Dict[str, int]:
+        return self._state['totals']
+
+    def _load(self) -> Dict[str, Any]:
+        """Загружает журнал из файла"""
+        if not os.path.exists(self.state_file):
+            return {}
+        try:
+            with open(self.state_file, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"failed_load_classifier_stats: {e}")
+            return {}
+
+    def _count(self, name: str) -> None:
+        self.totals[name] = self.totals.get(name, 0) + 1
+
+    def record(self, url: str, decision: ClassifierDecision, ai_result: Optional[Dict] = None) -> None:
+        """
+        Записывает решение; ai_result — вердикт AI, если он был запрошен
+        (неоднозначный случай или режим shadow)
+        """
+        self._count(decision.verdict)
+        ai_significant = None
+        if ai_result is None:
+            if decision.is_local:
+                self._count('ai_calls_saved')
+        else:
+            ai_significant = bool(ai_result.get('has_significant_changes'))
+            if decision.is_local:
+                agreed = (decision.verdict == MAJOR) == ai_significant
+                self._count('shadow_agreed' if agreed else 'shadow_disagreed')
+
+        signals = decision.signals
+        self._state['decisions'].append({
+            'url': url,
+            'at': datetime.now().isoformat(timespec='seconds'),
+            'verdict': decision.verdict,
+            'reason': decision.reason,
+            'changed_tokens': signals.changed_tokens,
+            'ratio': round(signals.ratio, 4),
+            'signals': [name for name, value in asdict(signals).items()
+                        if value is True or (isinstance(value, list) and value)],
+            'ai_significant': ai_significant
+        })
+        del self._state['decisions'][:-self.max_decisions]
+        self._dirty = True
+        logger.info("change_classified", url=url, verdict=decision.verdict, reason=decision.reason,
+                    changed_tokens=signals.changed_tokens, ai_significant=ai_significant)
+
+    def save(self) -> None:
+        """Сохраняет журнал в файл, если были новые решения"""
+        if not self._dirty:
+            return
+        logger.info("change_classifier_stats", mode=self.mode, **self.totals)
+        try:
+            os.makedirs(os.path.dirname(self.state_file) or '.', exist_ok=True)
+            tmp_path = f"{self.state_file}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(self._state, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.state_file)
+            self._dirty = False
+        except Exception as e:
+            logger.error(f"failed_save_classifier_stats: {e}")
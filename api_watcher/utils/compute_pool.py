@@ -0,0 +1,163 @@
+"""
+Compute pool for CPU-bound comparison work
+Выносит html2text и DeepDiff из event loop в пул процессов, чтобы сравнение не блокировало загрузку
+"""
+
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from api_watcher.config import Config
+from api_watcher.logging_config import get_logger
+from api_watcher.utils.section_index import PageSectionIndex
+from api_watcher.utils.simhash import simhash
+from api_watcher.utils.smart_comparator import SmartComparator
+
+logger = get_logger(__name__)
+
+# Компаратор воркера: создаётся один раз на процесс (html2text настраивается в конструкторе)
+_worker_comparator: Optional[SmartComparator] = None
+
+
+def _comparator() -> SmartComparator:
+    global _worker_comparator
+    if _worker_comparator is None:
+        _worker_comparator = SmartComparator()
+    return _worker_comparator
+
+
+# Задачи пула: функции уровня модуля, принимают и возвращают только picklable данные
+
+def html_to_text(html: str) -> str:
+    """HTML -> текст (html2text)"""
+    return _comparator().html_to_text(html)
+
+
+def compare_html_text(old_html: str, new_html: str, url: Optional[str] = None) -> Tuple[bool, str, str]:
+    """Сравнение HTML через нормализованный текст: (has_changes, old_text, new_text)"""
+    return _comparator().compare_html_text(old_html, new_html, url)
+
+
+def page_text(html: str, url: Optional[str] = None) -> str:
+    """Нормализованный текст HTML-страницы"""
+    return _comparator().page_text(html, url)
+
+
+def page_fingerprint(content: str, url: Optional[str] = None, is_text: bool = False) -> Tuple[str, int]:
+    """Нормализованный текст страницы (или раздела, is_text) и его SimHash: (text, fingerprint)"""
+    comparator = _comparator()
+    text = comparator.normalizer.normalize_text(content, url) if is_text else comparator.page_text(content, url)
+    return text, simhash(text)
+
+
+def section_index(html: str) -> PageSectionIndex:
+    """Индекс разделов страницы (BeautifulSoup); хранит только текст и смещения, поэтому пиклится"""
+    return PageSectionIndex(html)
+
+
+def compare_structured(kind: str, old_data: Any, new_data: Any) -> Tuple[bool, Optional[Dict]]:
+    """Структурное сравнение (DeepDiff) для 'openapi' или 'json': (has_changes, changes_dict)"""
+    comparator = _comparator()
+    if kind == 'openapi':
+        return comparator.compare_openapi(old_data, new_data)
+    return comparator.compare_json(old_data, new_data)
+
+
+class ComputeTimeoutError(Exception):
+    """Задача пула не уложилась в COMPUTE_TASK_TIMEOUT"""
+
+
+class ComputePool:
+    """
+    Пул процессов для тяжёлых сравнений.
+
+    - max_workers=0 отключает пул: задачи выполняются в текущем процессе (как раньше)
+    - маленькие входы (< inline_threshold символов) тоже считаются на месте: pickle дороже самой работы
+    - по таймауту пул пересоздаётся, чтобы зависшая задача не занимала воркер следующего цикла
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        task_timeout: Optional[float] = None,
+        inline_threshold: Optional[int] = None
+    ):
+        if max_workers is None:
+            max_workers = getattr(Config, "COMPUTE_WORKERS", 0)
+        self.max_workers = max(0, int(max_workers))
+        self.task_timeout = float(
+            task_timeout if task_timeout is not None else getattr(Config, "COMPUTE_TASK_TIMEOUT", 60)
+        )
+        self.inline_threshold = int(
+            inline_threshold if inline_threshold is not None else getattr(Config, "COMPUTE_INLINE_THRESHOLD", 20_000)
+        )
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_workers > 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            logger.info("compute_pool_started", workers=self.max_workers)
+        return self._executor
+
+    def _reset(self) -> None:
+        """
+        Останавливает текущий executor вместе с воркерами; новый будет создан при следующей задаче.
+
+        shutdown(wait=False) не прерывает задачу, уже выполняющуюся в воркере: зависший процесс
+        продолжал бы работать (и держать память) рядом с новым пулом, поэтому воркеры завершаются явно.
+        """
+        executor, self._executor = self._executor, None
+        if executor is None:
+            return
+        terminate_workers = getattr(executor, 'terminate_workers', None)  # Python 3.14+
+        if terminate_workers is not None:
+            terminate_workers()
+            return
+        processes = list((getattr(executor, '_processes', None) or {}).values())
+        for process in processes:
+            process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            process.join(timeout=1)
+            if process.is_alive():
+                process.kill()
+        logger.warning("compute_pool_reset", terminated=len(processes))
+
+    async def run(self, func: Callable, *args: Any, size: int = 0) -> Any:
+        """
+        Выполняет func(*args) в пуле процессов.
+
+        Args:
+            func: функция уровня модуля (должна пиклиться)
+            size: примерный объём входа в символах (для решения "пул или на месте")
+
+        Raises:
+            ComputeTimeoutError: задача не уложилась в task_timeout
+        """
+        if not self.enabled or size < self.inline_threshold:
+            return func(*args)
+
+        loop = asyncio.get_running_loop()
+        try:
+            future = loop.run_in_executor(self._get_executor(), func, *args)
+            return await asyncio.wait_for(future, timeout=self.task_timeout)
+        except asyncio.TimeoutError:
+            logger.error("compute_task_timeout", task=func.__name__, timeout=self.task_timeout, size=size)
+            self._reset()
+            raise ComputeTimeoutError(f"{func.__name__} exceeded {self.task_timeout}s")
+        except BrokenProcessPool:
+            logger.error("compute_pool_broken", task=func.__name__)
+            self._reset()
+            raise
+
+    def shutdown(self) -> None:
+        """Останавливает воркеры"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
@@ -10,6 +10,7 @@ from urllib.parse import urlparse
 import aiohttp
 
 from api_watcher.config import Config
+from api_watcher.utils.http_pool import get_http_pool
 
 logger = logging.getLogger(__name__)
 
@@ -60,7 +61,8 @@ class APIDocsFinder:
     
     async def __aenter__(self):
         """Async context manager entry"""
-        self.session = aiohttp.ClientSession(
+        # Сессия поверх общего пула: повторный поиск для того же хоста не открывает новые соединения
+        self.session = get_http_pool().session(
             timeout=aiohttp.ClientTimeout(total=30)
         )
         self._semaphore = asyncio.Semaphore(
@@ -7,6 +7,8 @@ import google.generativeai as genai
 from typing import Optional, Dict
 import logging
 
+from api_watcher.utils.prompt_diff import build_change_diff
+
 logger = logging.getLogger(__name__)
 
 
@@ -15,6 +17,7 @@ class GeminiAnalyzer:
     
     def __init__(self, api_key: str, model_name: str = 'gemini-pro'):
         genai.configure(api_key=api_key)
+        self.model_name = model_name
         self.model = genai.GenerativeModel(model_name)
     
     def analyze_changes(
@@ -39,25 +42,21 @@ class GeminiAnalyzer:
             context += f"API: {api_name}\n"
         if method_name:
             context += f"Method: {method_name}\n"
+        diff = build_change_diff(old_text, new_text) or "(различия только в пробелах и форматировании)"
         
         prompt = f"""Ты - эксперт по анализу изменений в API документации.
 
 {context}
 
-Сравни два текста документации (старый и новый) и определи:
+Изучи изменения в документации и определи:
 
 1. Есть ли СУЩЕСТВЕННЫЕ изменения? (игнорируй мелкие правки, опечатки, форматирование)
 2. Если есть существенные изменения - дай краткую сводку (2-3 предложения)
 3. Перечисли ключевые изменения списком
 
-СТАРАЯ ВЕРСИЯ:
----
-{old_text[:15000]}
----
-
-НОВАЯ ВЕРСИЯ:
+ИЗМЕНЕНИЯ (unified diff: "-" удалено, "+" добавлено, строки с пробелом — контекст, после @@ — раздел страницы):
 ---
-{new_text[:15000]}
+{diff}
 ---
 
 Ответь в формате JSON:
@@ -102,7 +101,8 @@ class GeminiAnalyzer:
                 'has_significant_changes': False,
                 'summary': f'Ошибка анализа: {str(e)}',
                 'key_changes': [],
-                'severity': 'error'
+                'severity': 'error',
+                'ai_error': True
             }
     
     def analyze_openapi_changes(
@@ -0,0 +1,152 @@
+"""
+Learned per-host fetch routing
+Запоминает хосты, которые блокируют прямые запросы, и режим ZenRows (с JS или без), который для них сработал
+"""
+
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
+from api_watcher.config import Config
+from api_watcher.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+ROUTE_DIRECT = 'direct'
+ROUTE_ZENROWS = 'zenrows'
+
+
+class HostRouter:
+    """
+    Таблица маршрутов по хостам для стратегии direct_first.
+
+    - исходы прямых запросов копятся в течение цикла и учитываются в finish_cycle():
+      хост получает не больше одной неудачи за цикл, сколько бы его страниц ни упало
+    - цикл считается неудачным для хоста, если ни один прямой запрос к нему не прошёл;
+      после min_failures таких циклов подряд (и маршрута zenrows) прямой запрос пропускается
+    - цикл только с успехами сбрасывает хост; смешанный цикл (часть страниц отдаётся напрямую,
+      часть блокируется) не меняет счётчик: пропускать прямой путь для всего хоста нельзя —
+      здоровые страницы ушли бы в платный ZenRows, — но и считать блокировку снятой рано
+    - раз в reprobe_interval прямой запрос пробуется снова: хост мог перестать блокировать
+    - запоминается js_render последнего успешного запроса ZenRows, чтобы начинать с него
+    - неудача ZenRows сбрасывает пропуск: в следующем цикле снова пробуем напрямую
+
+    Сохраняет состояние в JSON файл рядом со снэпшотами.
+    """
+
+    def __init__(
+        self,
+        state_file: str = "host_routes.json",
+        min_failures: Optional[int] = None,
+        reprobe_interval: Optional[timedelta] = None
+    ):
+        self.state_file = os.path.join(Config.SNAPSHOTS_DIR, state_file)
+        self.min_failures = max(1, int(
+            min_failures if min_failures is not None else getattr(Config, "ZENROWS_ROUTE_MIN_FAILURES", 2)
+        ))
+        self.reprobe_interval = reprobe_interval or timedelta(
+            hours=float(getattr(Config, "ZENROWS_ROUTE_REPROBE_HOURS", 24))
+        )
+        self._routes: Dict[str, Dict[str, Any]] = self._load()
+        # Исходы прямых запросов текущего цикла: host -> {'ok': n, 'failed': n}
+        self._cycle: Dict[str, Dict[str, int]] = {}
+        self._dirty = False
+
+    @staticmethod
+    def _host(url: str) -> str:
+        return (urlparse(url).hostname or '').lower()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        """Загружает маршруты из файла"""
+        if not os.path.exists(self.state_file):
+            return {}
+        try:
+            with open(self.state_file, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"failed_load_host_routes: {e}")
+            return {}
+
+    def _entry(self, url: str) -> Dict[str, Any]:
+        self._dirty = True
+        return self._routes.setdefault(self._host(url), {'route': ROUTE_DIRECT, 'direct_failures': 0})
+
+    def route(self, url: str) -> str:
+        entry = self._routes.get(self._host(url))
+        return entry['route'] if entry else ROUTE_DIRECT
+
+    def should_skip_direct(self, url: str, now: Optional[datetime] = None) -> bool:
+        """Хост стабильно требует ZenRows и время повторной проверки прямого пути ещё не пришло"""
+        entry = self._routes.get(self._host(url))
+        if not entry or entry.get('route') != ROUTE_ZENROWS:
+            return False
+        if int(entry.get('direct_failures', 0)) < self.min_failures or not entry.get('direct_checked_at'):
+            return False
+        try:
+            checked_at = datetime.fromisoformat(entry['direct_checked_at'])
+        except ValueError:
+            return False
+        return (now or datetime.now()) - checked_at < self.reprobe_interval
+
+    def js_render(self, url: str) -> Optional[bool]:
+        """Режим ZenRows, сработавший для хоста в прошлый раз (None — неизвестно)"""
+        entry = self._routes.get(self._host(url))
+        return entry.get('js_render') if entry else None
+
+    def record_direct(self, url: str, success: bool) -> None:
+        """Результат прямого запроса (только когда ZenRows доступен как запасной путь); учитывается в finish_cycle()"""
+        outcome = self._cycle.setdefault(self._host(url), {'ok': 0, 'failed': 0})
+        outcome['ok' if success else 'failed'] += 1
+
+    def finish_cycle(self, now: Optional[datetime] = None) -> None:
+        """Подводит итог цикла по каждому хосту: одна неудача, сброс или (для смешанного цикла) ничего"""
+        cycle, self._cycle = self._cycle, {}
+        checked_at = (now or datetime.now()).isoformat()
+        for host, outcome in cycle.items():
+            entry = self._routes.get(host)
+            if outcome['failed'] and outcome['ok']:
+                logger.info("host_route_mixed_cycle", host=host, ok=outcome['ok'], failed=outcome['failed'])
+                continue
+            if outcome['ok']:
+                if entry is not None:
+                    if entry.get('route') == ROUTE_ZENROWS:
+                        logger.info("host_route_direct_restored", host=host)
+                    self._routes.pop(host)
+                    self._dirty = True
+                continue
+            entry = self._routes.setdefault(host, {'route': ROUTE_DIRECT, 'direct_failures': 0})
+            entry['direct_failures'] = int(entry.get('direct_failures', 0)) + 1
+            entry['direct_checked_at'] = checked_at
+            self._dirty = True
+
+    def record_zenrows(self, url: str, js_render: Optional[bool]) -> None:
+        """Результат ZenRows: js_render сработавшего режима или None при неудаче"""
+        entry = self._entry(url)
+        if js_render is None:
+            # ZenRows тоже не помог — снимаем пропуск, чтобы следующий цикл начинал с прямого запроса
+            entry.pop('direct_checked_at', None)
+            return
+        if entry.get('route') != ROUTE_ZENROWS:
+            logger.info("host_route_zenrows_learned", host=self._host(url), js_render=js_render)
+        entry['route'] = ROUTE_ZENROWS
+        entry['js_render'] = js_render
+        entry['updated_at'] = datetime.now().isoformat()
+
+    def save(self) -> None:
+        """Сохраняет маршруты в файл, если были изменения"""
+        if not self._dirty:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.state_file) or '.', exist_ok=True)
+            tmp_path = f"{self.state_file}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(self._routes, f, indent=2)
+            os.replace(tmp_path, self.state_file)
+            self._dirty = False
+        except Exception as e:
+            logger.error(f"failed_save_host_routes: {e}")
+
+    def __len__(self) -> int:
+        return len(self._routes)
@@ -0,0 +1,166 @@
+"""
+Per-host scheduler for parallel URL processing
+Ограничение параллельности по хостам и справедливое чередование запросов
+"""
+
+import asyncio
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+
+
+def host_of(url: str) -> str:
+    """Возвращает хост URL в нижнем регистре (пустая строка, если разобрать не удалось)"""
+    try:
+        return (urlparse(url).hostname or '').lower()
+    except ValueError:
+        return ''
+
+
+def interleave_by_host(items: List[Any], url_getter: Callable[[Any], Optional[str]]) -> List[Any]:
+    """
+    Переупорядочивает элементы round-robin по хостам: a1, b1, c1, a2, b2, ...
+    Порядок внутри одного хоста сохраняется, поэтому якорные записи одной страницы
+    остаются рядом друг с другом в рамках своего хоста.
+    """
+    buckets: "OrderedDict[str, List[Any]]" = OrderedDict()
+    for item in items:
+        buckets.setdefault(host_of(url_getter(item) or ''), []).append(item)
+
+    queues = list(buckets.values())
+    ordered: List[Any] = []
+    while queues:
+        ordered.extend(queue.pop(0) for queue in queues)
+        queues = [queue for queue in queues if queue]
+    return ordered
+
+
+class HostScheduler:
+    """
+    Планировщик слотов: глобальный лимит + лимит на каждый хост.
+
+    Слот хоста берётся раньше глобального, поэтому задача, ждущая занятый хост,
+    не держит глобальный слот и не мешает запросам к другим хостам.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int,
+        per_host_limit: int,
+        host_limits: Optional[Dict[str, int]] = None,
+        min_interval: float = 0.0
+    ):
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.per_host_limit = max(1, int(per_host_limit))
+        self.host_limits = {host.lower(): max(1, int(limit)) for host, limit in (host_limits or {}).items()}
+        self.min_interval = max(0.0, float(min_interval))
+        self._global = asyncio.Semaphore(self.max_concurrent)
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._interval_locks: Dict[str, asyncio.Lock] = {}
+        self._last_start: Dict[str, float] = {}
+        self._active: Dict[str, int] = {}
+        self._released = asyncio.Event()
+
+    def limit_for(self, host: str) -> int:
+        """Лимит параллельности для хоста (не больше глобального)"""
+        return min(self.host_limits.get(host, self.per_host_limit), self.max_concurrent)
+
+    def _host_semaphore(self, host: str) -> asyncio.Semaphore:
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.limit_for(host))
+            self._host_semaphores[host] = semaphore
+        return semaphore
+
+    async def _respect_interval(self, host: str) -> None:
+        """Выдерживает минимальный интервал между стартами запросов к одному хосту"""
+        if self.min_interval <= 0:
+            return
+        lock = self._interval_locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            loop = asyncio.get_running_loop()
+            wait = self._last_start.get(host, 0.0) + self.min_interval - loop.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._last_start[host] = loop.time()
+
+    async def acquire(self, url: str) -> None:
+        """Занимает слот хоста и глобальный слот; освобождать через release(url)"""
+        host = host_of(url)
+        semaphore = self._host_semaphore(host)
+        await semaphore.acquire()
+        try:
+            await self._respect_interval(host)
+            await self._global.acquire()
+        except BaseException:
+            semaphore.release()
+            raise
+        self._active[host] = self._active.get(host, 0) + 1
+
+    def release(self, url: str) -> None:
+        """Освобождает слоты, занятые acquire(url)"""
+        host = host_of(url)
+        self._active[host] -= 1
+        self._global.release()
+        self._host_semaphores[host].release()
+        self._released.set()
+
+    @asynccontextmanager
+    async def slot(self, url: str) -> AsyncIterator[None]:
+        """Занимает слот хоста и глобальный слот на время обработки URL"""
+        await self.acquire(url)
+        try:
+            yield
+        finally:
+            self.release(url)
+
+    def _wait_for(self, host: str, now: float) -> Optional[float]:
+        """Сколько ждать до старта запроса к хосту (None — все слоты хоста заняты)"""
+        if self._host_semaphore(host).locked():
+            return None
+        if self.min_interval <= 0:
+            return 0.0
+        return max(0.0, self._last_start.get(host, float('-inf')) + self.min_interval - now)
+
+    async def dispatch(self, items: Iterable[Any], url_getter: Callable[[Any], Optional[str]]) -> AsyncIterator[Any]:
+        """
+        Выдаёт элементы по мере освобождения слотов, уже заняв слот для каждого
+        (потребитель вызывает release(url) после обработки).
+
+        Хосты перебираются round-robin, но хост с занятыми слотами или невыдержанным
+        интервалом пропускается: его следующий элемент не загораживает очередь
+        элементам свободных хостов.
+        """
+        buckets: "OrderedDict[str, List[Any]]" = OrderedDict()
+        for item in items:
+            buckets.setdefault(host_of(url_getter(item) or ''), []).append(item)
+
+        loop = asyncio.get_running_loop()
+        while buckets:
+            self._released.clear()
+            now = loop.time()
+            waits = {host: self._wait_for(host, now) for host in buckets}
+            ready = next((host for host, wait in waits.items() if wait == 0), None)
+            if ready is None:
+                pending = [wait for wait in waits.values() if wait is not None]
+                try:
+                    await asyncio.wait_for(self._released.wait(), min(pending) if pending else None)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            queue = buckets.pop(ready)
+            item = queue.pop(0)
+            if queue:
+                # Хост уходит в конец очереди — round-robin
+                buckets[ready] = queue
+            await self.acquire(url_getter(item) or '')
+            yield item
+
+    def stats(self) -> Dict[str, Any]:
+        """Текущая загрузка по хостам"""
+        return {
+            'hosts': len(self._host_semaphores),
+            'active': {host: count for host, count in self._active.items() if count},
+        }
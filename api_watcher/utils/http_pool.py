@@ -0,0 +1,162 @@
+"""
+Shared HTTP connection pool
+Один TCPConnector на процесс для всех асинхронных клиентов (загрузка, ZenRows, поиск документации, OpenRouter):
+DNS-кэш и keep-alive соединения переживают отдельные сессии, поэтому TLS-рукопожатие с хостом
+делается один раз, а не в каждом клиенте и каждом вызове find_api_documentation
+"""
+
+import asyncio
+import inspect
+from typing import Any, Dict, Optional
+
+import aiohttp
+
+from api_watcher.config import Config
+from api_watcher.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# happy_eyeballs_delay появился в aiohttp 3.10; на старых версиях используется поведение по умолчанию
+_HAPPY_EYEBALLS_SUPPORTED = 'happy_eyeballs_delay' in inspect.signature(aiohttp.TCPConnector).parameters
+
+
+class HTTPConnectionPool:
+    """
+    Общий пул соединений.
+
+    - session() создаёт лёгкую ClientSession поверх общего коннектора (connector_owner=False):
+      закрытие сессии клиента не рвёт соединения остальных
+    - коннектор создаётся лениво в текущем event loop и пересоздаётся, если loop сменился
+    - stats() — лимиты и счётчики запросов, новых/переиспользованных соединений и DNS-кэша
+    """
+
+    def __init__(
+        self,
+        limit: Optional[int] = None,
+        limit_per_host: Optional[int] = None,
+        dns_ttl: Optional[int] = None,
+        keepalive_timeout: Optional[float] = None,
+        happy_eyeballs_delay: Optional[float] = None
+    ):
+        self.limit = max(1, int(limit if limit is not None else Config.HTTP_POOL_LIMIT))
+        self.limit_per_host = max(0, int(
+            limit_per_host if limit_per_host is not None else Config.HTTP_POOL_LIMIT_PER_HOST
+        ))
+        self.dns_ttl = max(0, int(dns_ttl if dns_ttl is not None else Config.HTTP_DNS_CACHE_TTL))
+        self.keepalive_timeout = float(
+            keepalive_timeout if keepalive_timeout is not None else Config.HTTP_KEEPALIVE_TIMEOUT
+        )
+        self.happy_eyeballs_delay = float(
+            happy_eyeballs_delay if happy_eyeballs_delay is not None else Config.HTTP_HAPPY_EYEBALLS_DELAY
+        )
+        self._connector: Optional[aiohttp.TCPConnector] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._counters: Dict[str, int] = {
+            'sessions': 0,
+            'requests': 0,
+            'in_flight': 0,
+            'connections_created': 0,
+            'connections_reused': 0,
+            'connections_queued': 0,
+            'dns_cache_hits': 0,
+            'dns_cache_misses': 0,
+        }
+        self._trace = self._trace_config()
+
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        trace = aiohttp.TraceConfig()
+
+        def counter(name: str, step: int = 1):
+            async def handler(session, context, params) -> None:
+                self._counters[name] += step
+            return handler
+
+        trace.on_request_start.append(counter('requests'))
+        trace.on_request_start.append(counter('in_flight'))
+        trace.on_request_end.append(counter('in_flight', -1))
+        trace.on_request_exception.append(counter('in_flight', -1))
+        trace.on_connection_create_end.append(counter('connections_created'))
+        trace.on_connection_reuseconn.append(counter('connections_reused'))
+        trace.on_connection_queued_start.append(counter('connections_queued'))
+        trace.on_dns_cache_hit.append(counter('dns_cache_hits'))
+        trace.on_dns_cache_miss.append(counter('dns_cache_misses'))
+        return trace
+
+    def _make_connector(self) -> aiohttp.TCPConnector:
+        options: Dict[str, Any] = {
+            'limit': self.limit,
+            'limit_per_host': self.limit_per_host,
+            'use_dns_cache': self.dns_ttl > 0,
+            'ttl_dns_cache': self.dns_ttl or None,
+            'keepalive_timeout': self.keepalive_timeout,
+        }
+        if _HAPPY_EYEBALLS_SUPPORTED:
+            options['happy_eyeballs_delay'] = self.happy_eyeballs_delay or None
+        return aiohttp.TCPConnector(**options)
+
+    def connector(self) -> aiohttp.TCPConnector:
+        """Общий коннектор текущего event loop"""
+        loop = asyncio.get_running_loop()
+        if self._connector is None or self._connector.closed or self._loop is not loop:
+            # Коннектор другого (завершённого) loop закрыть уже нельзя — просто отпускаем его
+            self._connector = self._make_connector()
+            self._loop = loop
+            logger.debug(
+                "http_pool_created",
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                dns_ttl=self.dns_ttl,
+                keepalive_timeout=self.keepalive_timeout
+            )
+        return self._connector
+
+    def session(self, **kwargs) -> aiohttp.ClientSession:
+        """ClientSession поверх общего коннектора (kwargs — timeout, headers и т.п.)"""
+        self._counters['sessions'] += 1
+        trace_configs = list(kwargs.pop('trace_configs', None) or []) + [self._trace]
+        return aiohttp.ClientSession(
+            connector=self.connector(),
+            connector_owner=False,
+            trace_configs=trace_configs,
+            **kwargs
+        )
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Лимиты пула и счётчики из trace-событий aiohttp: запросы (всего и ещё ждущие ответа),
+        новые, переиспользованные и ждавшие свободного слота соединения, попадания в DNS-кэш.
+        Внутреннее состояние TCPConnector не читается — его атрибуты не входят в API aiohttp.
+        """
+        return {
+            'limit': self.limit,
+            'limit_per_host': self.limit_per_host,
+            **self._counters,
+        }
+
+    async def close(self) -> None:
+        """Закрывает коннектор (и все соединения) — при завершении процесса"""
+        connector, self._connector = self._connector, None
+        if connector is None or connector.closed:
+            return
+        if self._loop is asyncio.get_running_loop():
+            await connector.close()
+        self._loop = None
+
+
+_shared_pool: Optional[HTTPConnectionPool] = None
+
+
+def get_http_pool() -> HTTPConnectionPool:
+    """Пул соединений процесса (создаётся при первом обращении)"""
+    global _shared_pool
+    if _shared_pool is None:
+        _shared_pool = HTTPConnectionPool()
+    return _shared_pool
+
+
+async def close_http_pool() -> None:
+    """Закрывает общий пул; следующий get_http_pool() создаст новый"""
+    global _shared_pool
+    pool, _shared_pool = _shared_pool, None
+    if pool is not None:
+        await pool.close()
@@ -0,0 +1,164 @@
+"""
+Noise normalization before hashing and comparison
+Убирает из страниц то, что меняется без изменения документации: cache-busting, CSRF, build ID, даты "обновлено"
+"""
+
+import hashlib
+import json
+import os
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+
+from api_watcher.config import Config
+from api_watcher.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+SCOPE_HTML = 'html'
+SCOPE_TEXT = 'text'
+
+
+@dataclass(frozen=True)
+class NoiseRule:
+    """Замена по регулярному выражению; scope: html (сырой HTML) или text (текст после html2text)"""
+    name: str
+    pattern: 're.Pattern'
+    replacement: str = ''
+    scope: str = SCOPE_TEXT
+
+    def apply(self, value: str) -> str:
+        return self.pattern.sub(self.replacement, value)
+
+
+def _rule(name: str, pattern: str, replacement: str = '', scope: str = SCOPE_TEXT, flags: int = 0) -> NoiseRule:
+    return NoiseRule(name, re.compile(pattern, flags), replacement, scope)
+
+
+_MONTH = r'(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\.?'
+DATE_PATTERN = (
+    r'(?:\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}(?::\d{2})?(?:\.\d+)?(?:Z|[+-]\d{2}:?\d{2})?)?'
+    rf'|{_MONTH}\s+\d{{1,2}},?\s+\d{{4}}'
+    rf'|\d{{1,2}}\s+{_MONTH}\s+\d{{4}}'
+    r'|\d{1,2}[./]\d{1,2}[./]\d{2,4})'
+)
+
+# Встроенные правила: только то, что заведомо не является содержимым документации
+BUILTIN_RULES: List[NoiseRule] = [
+    # main.css?v=123, app.js?ver=1700000000
+    _rule('asset_cache_buster',
+          r'''((?:src|href)=["'][^"'?#\s]+\.(?:js|mjs|css|png|jpe?g|gif|svg|webp|ico|woff2?|ttf))\?[^"'#\s]*''',
+          r'\1', SCOPE_HTML, re.I),
+    # main.3f9a2b1c.js, chunk-4e5d6f7a8b.css
+    _rule('hashed_asset_name', r'([\w/])[.-][0-9a-f]{8,}(\.(?:js|mjs|css)\b)', r'\1\2', SCOPE_HTML),
+    _rule('next_build_id', r'"buildId"\s*:\s*"[^"]*"', '"buildId":""', SCOPE_HTML),
+    _rule('next_static_dir', r'/_next/static/(?!chunks/|css/|media/)[\w-]{8,}/', '/_next/static/_/', SCOPE_HTML),
+    _rule('csrf_token',
+          r'<(?:meta|input)\b[^>]*(?:csrf|xsrf|authenticity_token|__RequestVerificationToken)[^>]*>',
+          '', SCOPE_HTML, re.I),
+    _rule('nonce_attr', r'''\snonce=["'][^"']*["']''', '', SCOPE_HTML, re.I),
+    _rule('integrity_attr', r'''\sintegrity=["'][^"']*["']''', '', SCOPE_HTML, re.I),
+    _rule('adsense_slot', r'<ins\b[^>]*adsbygoogle[^>]*>.*?</ins>', '', SCOPE_HTML, re.I | re.S),
+    # Текстовые правила применяются и к HTML (перед хешированием), и к тексту
+    _rule('last_updated',
+          rf'(\b(?:last\s+(?:updated|modified|edited|reviewed)|updated(?:\s+on)?|published|обновлено)\s*:?\s*){DATE_PATTERN}',
+          r'\1<date>', SCOPE_TEXT, re.I),
+    _rule('timestamp', r'\b\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(?::\d{2})?(?:\.\d+)?(?:Z|[+-]\d{2}:?\d{2})?\b',
+          '<timestamp>', SCOPE_TEXT),
+    _rule('copyright_year', r'((?:©|&copy;|\(c\)|copyright)\s*)(?:\d{4}\s*[-–]\s*)?\d{4}', r'\1<year>', SCOPE_TEXT, re.I),
+]
+
+
+def _host_matches(host: str, pattern: str) -> bool:
+    """developers.hubspot.com подходит под 'developers.hubspot.com' и 'hubspot.com'"""
+    return host == pattern or host.endswith('.' + pattern)
+
+
+def load_host_rules(path: str) -> Dict[str, List[NoiseRule]]:
+    """
+    Правила для отдельных хостов из JSON файла:
+    {"docs.slack.dev": [{"name": "...", "pattern": "...", "replace": "", "scope": "html"}]}
+    """
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            raw = json.load(f)
+    except Exception as e:
+        logger.error(f"failed_load_noise_rules: {e}")
+        return {}
+
+    rules: Dict[str, List[NoiseRule]] = {}
+    for host, items in raw.items():
+        for item in items:
+            try:
+                rules.setdefault(host.lower(), []).append(_rule(
+                    item.get('name', 'custom'),
+                    item['pattern'],
+                    item.get('replace', ''),
+                    item.get('scope', SCOPE_TEXT),
+                    re.I if item.get('ignore_case') else 0
+                ))
+            except (KeyError, re.error) as e:
+                logger.error(f"invalid_noise_rule: host={host} error={e}")
+    return rules
+
+
+class NoiseNormalizer:
+    """
+    Применяет встроенные правила и правила хоста страницы.
+
+    normalize_html() — для хеша сырого HTML (правила html и text),
+    normalize_text() — для текста после html2text и разделов страниц (только text).
+    """
+
+    def __init__(
+        self,
+        host_rules: Optional[Dict[str, List[NoiseRule]]] = None,
+        builtin_rules: Optional[Iterable[NoiseRule]] = None,
+        enabled: bool = True
+    ):
+        self.enabled = enabled
+        self.builtin_rules = list(BUILTIN_RULES if builtin_rules is None else builtin_rules)
+        self.host_rules = host_rules or {}
+
+    @property
+    def version(self) -> str:
+        """Хеш набора правил: текст, нормализованный другими правилами, не сравним с текущим"""
+        rules = list(self.builtin_rules) + [r for host in sorted(self.host_rules) for r in self.host_rules[host]]
+        spec = repr((self.enabled, sorted(self.host_rules), [
+            (r.name, r.pattern.pattern, r.pattern.flags, r.replacement, r.scope) for r in rules
+        ]))
+        return hashlib.sha256(spec.encode('utf-8')).hexdigest()[:12]
+
+    @classmethod
+    def from_config(cls) -> 'NoiseNormalizer':
+        return cls(
+            host_rules=load_host_rules(Config.NOISE_RULES_FILE),
+            enabled=Config.NOISE_NORMALIZATION
+        )
+
+    def _rules(self, url: Optional[str], scopes: Iterable[str]) -> List[NoiseRule]:
+        rules = list(self.builtin_rules)
+        host = (urlparse(url).hostname or '').lower() if url else ''
+        if host:
+            for pattern, extra in self.host_rules.items():
+                if _host_matches(host, pattern):
+                    rules.extend(extra)
+        # HTML-правила раньше текстовых: сначала убираем разметку-шум, затем даты в её тексте
+        return sorted((r for r in rules if r.scope in scopes), key=lambda r: r.scope != SCOPE_HTML)
+
+    def _apply(self, value: Optional[str], url: Optional[str], scopes: Iterable[str]) -> str:
+        value = value or ''
+        if not self.enabled:
+            return value
+        for rule in self._rules(url, tuple(scopes)):
+            value = rule.apply(value)
+        return value
+
+    def normalize_html(self, html: Optional[str], url: Optional[str] = None) -> str:
+        return self._apply(html, url, (SCOPE_HTML, SCOPE_TEXT))
+
+    def normalize_text(self, text: Optional[str], url: Optional[str] = None) -> str:
+        return self._apply(text, url, (SCOPE_TEXT,))
@@ -3,13 +3,57 @@ OpenRouter AI Analyzer for API changes
 Анализ изменений через OpenRouter API
 """
 
+import asyncio
 import logging
 import json
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
+
+import aiohttp
 import requests
 
+from api_watcher.config import Config
+from api_watcher.utils.http_pool import get_http_pool
+from api_watcher.utils.prompt_diff import build_change_diff
+
 logger = logging.getLogger(__name__)
 
+_DIFF_LEGEND = 'unified diff: "-" удалено, "+" добавлено, строки с пробелом — контекст, после @@ — раздел страницы'
+
+_SIGNIFICANCE_CRITERIA = """Критерии значимости:
+- major: breaking changes, удаление методов, изменение параметров
+- moderate: новые методы, изменение поведения
+- minor: исправления опечаток, форматирование
+
+Если изменения незначительные (даты, версии, мелкие правки) - has_significant_changes: false"""
+
+# Элемент пакетного анализа: (old_text, new_text, api_name, method_name)
+ChangeItem = Tuple[str, str, Optional[str], Optional[str]]
+
+
+def _change_context(api_name: Optional[str], method_name: Optional[str]) -> str:
+    context = f"API: {api_name}" if api_name else "API Documentation"
+    if method_name:
+        context += f", Method: {method_name}"
+    return context
+
+
+def _extract_json(response: str) -> str:
+    """JSON из ответа модели (модель может обернуть его в markdown блок)"""
+    if '```json' in response:
+        return response.split('```json')[1].split('```')[0].strip()
+    if '```' in response:
+        return response.split('```')[1].split('```')[0].strip()
+    return response.strip()
+
+
+def _with_defaults(result: Dict) -> Dict:
+    """Дополняет вердикт недостающими полями"""
+    result.setdefault('has_significant_changes', True)
+    result.setdefault('summary', 'Обнаружены изменения')
+    result.setdefault('severity', 'moderate')
+    result.setdefault('key_changes', [])
+    return result
+
 
 class OpenRouterAnalyzer:
     """Анализ изменений API через OpenRouter"""
@@ -36,16 +80,8 @@ class OpenRouterAnalyzer:
         self.app_name = app_name
         self.api_url = "https://openrouter.ai/api/v1/chat/completions"
     
-    def _make_request(self, messages: List[Dict[str, str]]) -> Optional[str]:
-        """
-        Выполняет запрос к OpenRouter API
-        
-        Args:
-            messages: Список сообщений для модели
-            
-        Returns:
-            Ответ модели или None при ошибке
-        """
+    def _build_headers(self) -> Dict[str, str]:
+        """Заголовки запроса к OpenRouter"""
         headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
@@ -56,17 +92,29 @@ class OpenRouterAnalyzer:
             headers["HTTP-Referer"] = self.site_url
         if self.app_name:
             headers["X-Title"] = self.app_name
-        
-        payload = {
+        return headers
+    
+    def _build_payload(self, messages: List[Dict[str, str]]) -> Dict[str, Any]:
+        return {
             "model": self.model,
             "messages": messages
         }
+    
+    def _make_request(self, messages: List[Dict[str, str]]) -> Optional[str]:
+        """
+        Выполняет запрос к OpenRouter API
         
+        Args:
+            messages: Список сообщений для модели
+            
+        Returns:
+            Ответ модели или None при ошибке
+        """
         try:
             response = requests.post(
                 self.api_url,
-                headers=headers,
-                json=payload,
+                headers=self._build_headers(),
+                json=self._build_payload(messages),
                 timeout=60
             )
             response.raise_for_status()
@@ -105,19 +153,26 @@ class OpenRouterAnalyzer:
                 'key_changes': List[str]
             }
         """
-        context = f"API: {api_name}" if api_name else "API Documentation"
-        if method_name:
-            context += f", Method: {method_name}"
+        messages = self._changes_messages(old_text, new_text, api_name, method_name)
+        return self._parse_changes_response(self._make_request(messages))
+    
+    def _changes_messages(
+        self,
+        old_text: str,
+        new_text: str,
+        api_name: Optional[str],
+        method_name: Optional[str]
+    ) -> List[Dict[str, str]]:
+        """Промпт анализа изменений текста документации"""
+        context = _change_context(api_name, method_name)
+        diff = build_change_diff(old_text, new_text) or "(различия только в пробелах и форматировании)"
         
         prompt = f"""Проанализируй изменения в документации API.
 
 {context}
 
-СТАРАЯ ВЕРСИЯ:
-{old_text[:3000]}
-
-НОВАЯ ВЕРСИЯ:
-{new_text[:3000]}
+ИЗМЕНЕНИЯ ({_DIFF_LEGEND}):
+{diff}
 
 Ответь в формате JSON:
 {{
@@ -127,53 +182,28 @@ class OpenRouterAnalyzer:
     "key_changes": ["изменение 1", "изменение 2", ...]
 }}
 
-Критерии значимости:
-- major: breaking changes, удаление методов, изменение параметров
-- moderate: новые методы, изменение поведения
-- minor: исправления опечаток, форматирование
-
-Если изменения незначительные (даты, версии, мелкие правки) - has_significant_changes: false"""
+{_SIGNIFICANCE_CRITERIA}"""
 
-        messages = [
+        return [
             {
                 "role": "user",
                 "content": prompt
             }
         ]
-        
-        response = self._make_request(messages)
-        
+    
+    def _parse_changes_response(self, response: Optional[str]) -> Dict:
+        """Разбирает JSON ответ модели; при ошибке возвращает консервативный результат"""
         if not response:
             return {
                 'has_significant_changes': True,
                 'summary': 'Обнаружены изменения (AI анализ недоступен)',
                 'severity': 'moderate',
-                'key_changes': []
+                'key_changes': [],
+                'ai_error': True
             }
         
         try:
-            # Пытаемся извлечь JSON из ответа
-            # Модель может обернуть JSON в markdown блок
-            if '```json' in response:
-                json_str = response.split('```json')[1].split('```')[0].strip()
-            elif '```' in response:
-                json_str = response.split('```')[1].split('```')[0].strip()
-            else:
-                json_str = response.strip()
-            
-            result = json.loads(json_str)
-            
-            # Валидация результата
-            if 'has_significant_changes' not in result:
-                result['has_significant_changes'] = True
-            if 'summary' not in result:
-                result['summary'] = 'Обнаружены изменения'
-            if 'severity' not in result:
-                result['severity'] = 'moderate'
-            if 'key_changes' not in result:
-                result['key_changes'] = []
-            
-            return result
+            return _with_defaults(json.loads(_extract_json(response)))
             
         except json.JSONDecodeError as e:
             logger.error(f"❌ Ошибка парсинга JSON ответа: {e}")
@@ -183,8 +213,85 @@ class OpenRouterAnalyzer:
                 'has_significant_changes': True,
                 'summary': 'Обнаружены изменения (ошибка парсинга AI ответа)',
                 'severity': 'moderate',
-                'key_changes': []
+                'key_changes': [],
+                'ai_error': True
+            }
+    
+    def analyze_changes_batch(self, items: List[ChangeItem]) -> List[Optional[Dict]]:
+        """
+        Анализирует несколько изменений одним запросом
+        
+        Args:
+            items: (old_text, new_text, api_name, method_name) для каждого изменения
+            
+        Returns:
+            Вердикты в порядке items (формат как у analyze_changes); None для элементов,
+            которых нет в ответе или весь ответ не разобран — их анализируют по одному
+        """
+        messages = self._batch_messages(items)
+        return self._parse_batch_response(self._make_request(messages), len(items))
+    
+    def _batch_messages(self, items: List[ChangeItem]) -> List[Dict[str, str]]:
+        """Промпт пакетного анализа: бюджет diff делится между элементами"""
+        budget = min(Config.AI_DIFF_TOKEN_BUDGET, Config.AI_BATCH_TOKEN_BUDGET // max(1, len(items)))
+        sections = []
+        for number, (old_text, new_text, api_name, method_name) in enumerate(items, 1):
+            diff = build_change_diff(old_text, new_text, token_budget=budget) \
+                or "(различия только в пробелах и форматировании)"
+            sections.append(f"### ИЗМЕНЕНИЕ {number}\n{_change_context(api_name, method_name)}\n{diff}")
+        changes = "\n\n".join(sections)
+        
+        prompt = f"""Проанализируй независимые изменения в документации API ({len(items)} шт.).
+Каждое изменение оценивай отдельно.
+
+ИЗМЕНЕНИЯ ({_DIFF_LEGEND}):
+
+{changes}
+
+Ответь в формате JSON, ровно один элемент results на каждое изменение, id — номер изменения:
+{{
+    "results": [
+        {{
+            "id": 1,
+            "has_significant_changes": true/false,
+            "summary": "краткое описание изменений на русском",
+            "severity": "minor/moderate/major",
+            "key_changes": ["изменение 1", "изменение 2", ...]
+        }}
+    ]
+}}
+
+{_SIGNIFICANCE_CRITERIA}"""
+
+        return [
+            {
+                "role": "user",
+                "content": prompt
             }
+        ]
+    
+    def _parse_batch_response(self, response: Optional[str], count: int) -> List[Optional[Dict]]:
+        """Раскладывает вердикты пакетного ответа по номерам изменений"""
+        verdicts: List[Optional[Dict]] = [None] * count
+        if not response:
+            return verdicts
+        try:
+            data = json.loads(_extract_json(response))
+        except json.JSONDecodeError as e:
+            logger.error(f"❌ Ошибка парсинга JSON ответа (пакет из {count}): {e}")
+            return verdicts
+        
+        results = data.get('results', []) if isinstance(data, dict) else data
+        for result in results if isinstance(results, list) else []:
+            if not isinstance(result, dict):
+                continue
+            try:
+                index = int(result.pop('id')) - 1
+            except (KeyError, TypeError, ValueError):
+                continue
+            if 0 <= index < count and verdicts[index] is None:
+                verdicts[index] = _with_defaults(result)
+        return verdicts
     
     def analyze_openapi_changes(
         self,
@@ -201,6 +308,11 @@ class OpenRouterAnalyzer:
         Returns:
             Текстовое описание изменений
         """
+        messages = self._openapi_messages(changes, api_name)
+        return self._openapi_summary(self._make_request(messages), changes)
+    
+    def _openapi_messages(self, changes: Dict, api_name: Optional[str]) -> List[Dict[str, str]]:
+        """Промпт сводки изменений OpenAPI"""
         context = f"API: {api_name}" if api_name else "OpenAPI Specification"
         
         prompt = f"""Проанализируй изменения в OpenAPI спецификации.
@@ -214,15 +326,15 @@ class OpenRouterAnalyzer:
 Укажи самые важные изменения: новые/удаленные endpoints, изменения в параметрах, breaking changes.
 Ответь только текстом, без JSON."""
 
-        messages = [
+        return [
             {
                 "role": "user",
                 "content": prompt
             }
         ]
-        
-        response = self._make_request(messages)
-        
+    
+    def _openapi_summary(self, response: Optional[str], changes: Dict) -> str:
+        """Сводка из ответа модели или простое описание, если AI недоступен"""
         if not response:
             # Fallback на простое описание
             summary_parts = []
@@ -249,3 +361,103 @@ class OpenRouterAnalyzer:
             'provider': 'OpenRouter',
             'api_url': self.api_url
         }
+
+
+class AsyncOpenRouterAnalyzer(OpenRouterAnalyzer):
+    """
+    Асинхронный анализатор OpenRouter (aiohttp).
+
+    Одна сессия на весь процесс (keep-alive к openrouter.ai), число одновременных
+    запросов ограничено семафором, у каждого запроса свой таймаут.
+    Промпты и разбор ответов общие с OpenRouterAnalyzer.
+    """
+    
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "anthropic/claude-3.5-sonnet",
+        site_url: Optional[str] = None,
+        app_name: Optional[str] = "API Watcher",
+        max_concurrent: Optional[int] = None,
+        timeout: Optional[float] = None
+    ):
+        super().__init__(api_key, model, site_url, app_name)
+        self.max_concurrent = max(1, int(
+            max_concurrent if max_concurrent is not None else getattr(Config, "OPENROUTER_MAX_CONCURRENT", 2)
+        ))
+        self.timeout = aiohttp.ClientTimeout(total=float(
+            timeout if timeout is not None else getattr(Config, "OPENROUTER_TIMEOUT", 60)
+        ))
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+    
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Получает или создает сессию"""
+        if self._session is None or self._session.closed:
+            self._session = get_http_pool().session(
+                timeout=self.timeout,
+                headers=self._build_headers()
+            )
+        return self._session
+    
+    async def _make_request_async(self, messages: List[Dict[str, str]]) -> Optional[str]:
+        """
+        Выполняет запрос к OpenRouter API, не блокируя event loop
+        
+        Returns:
+            Ответ модели или None при ошибке
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        
+        async with self._semaphore:
+            try:
+                session = await self._get_session()
+                async with session.post(self.api_url, json=self._build_payload(messages)) as response:
+                    if response.status >= 400:
+                        body = await response.text()
+                        logger.error(f"❌ Ошибка запроса к OpenRouter: HTTP {response.status}: {body[:200]}")
+                        return None
+                    data = await response.json(content_type=None)
+                return data['choices'][0]['message']['content']
+                
+            except asyncio.TimeoutError:
+                logger.error(f"❌ Таймаут запроса к OpenRouter ({self.timeout.total}s)")
+                return None
+            except aiohttp.ClientError as e:
+                logger.error(f"❌ Ошибка запроса к OpenRouter: {e}")
+                return None
+            except (KeyError, IndexError, TypeError, ValueError) as e:
+                logger.error(f"❌ Ошибка парсинга ответа OpenRouter: {e}")
+                return None
+    
+    async def analyze_changes(
+        self,
+        old_text: str,
+        new_text: str,
+        api_name: Optional[str] = None,
+        method_name: Optional[str] = None
+    ) -> Dict:
+        """Асинхронная версия OpenRouterAnalyzer.analyze_changes"""
+        # Diff больших страниц считается в потоке, чтобы не держать event loop
+        messages = await asyncio.to_thread(self._changes_messages, old_text, new_text, api_name, method_name)
+        return self._parse_changes_response(await self._make_request_async(messages))
+    
+    async def analyze_changes_batch(self, items: List[ChangeItem]) -> List[Optional[Dict]]:
+        """Асинхронная версия OpenRouterAnalyzer.analyze_changes_batch"""
+        messages = await asyncio.to_thread(self._batch_messages, items)
+        return self._parse_batch_response(await self._make_request_async(messages), len(items))
+    
+    async def analyze_openapi_changes(
+        self,
+        changes: Dict,
+        api_name: Optional[str] = None
+    ) -> str:
+        """Асинхронная версия OpenRouterAnalyzer.analyze_openapi_changes"""
+        messages = self._openapi_messages(changes, api_name)
+        return self._openapi_summary(await self._make_request_async(messages), changes)
+    
+    async def close(self) -> None:
+        """Закрывает сессию"""
+        if self._session and not self._session.closed:
+            await self._session.close()
@@ -0,0 +1,170 @@
+"""
+Staged pipeline with bounded queues
+Конвейер из стадий: у каждой свой пул воркеров, между стадиями ограниченные очереди (backpressure)
+"""
+
+import asyncio
+from dataclasses import dataclass
+from typing import Any, AsyncIterable, Awaitable, Callable, Dict, Iterable, List, Optional, Union
+
+from api_watcher.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class Stage:
+    """
+    Стадия конвейера.
+
+    handler получает элемент и возвращает его (или новый) для следующей стадии;
+    None снимает элемент с конвейера.
+
+    С batch_size > 1 handler получает список до batch_size элементов (неполный пакет
+    уходит, если за batch_wait секунд новых элементов не пришло) и возвращает список.
+    """
+    name: str
+    handler: Callable[[Any], Awaitable[Any]]
+    workers: int = 1
+    batch_size: int = 1
+    batch_wait: float = 0
+
+
+class StagedPipeline:
+    """
+    Прогоняет элементы через последовательность стадий.
+
+    - очередь перед каждой стадией ограничена queue_size: медленная стадия тормозит предыдущие,
+      а не копит работу в памяти
+    - исключение в обработчике передаётся в on_error(stage_name, item, error), элемент снимается
+    - stats() показывает глубину очередей и число обработанных элементов по стадиям
+    """
+
+    def __init__(
+        self,
+        stages: List[Stage],
+        queue_size: int = 32,
+        on_error: Optional[Callable[[str, Any, Exception], None]] = None,
+        stats_interval: float = 0
+    ):
+        self.stages = stages
+        self.queue_size = max(1, queue_size)
+        self.on_error = on_error
+        self.stats_interval = stats_interval
+        self._queues: List[asyncio.Queue] = []
+        self._max_depth: Dict[str, int] = {}
+        self._processed: Dict[str, int] = {}
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Глубина очереди (текущая и максимальная) и число обработанных элементов по стадиям"""
+        return {
+            stage.name: {
+                'depth': queue.qsize(),
+                'max_depth': self._max_depth.get(stage.name, 0),
+                'processed': self._processed.get(stage.name, 0),
+                'workers': stage.workers,
+            }
+            for stage, queue in zip(self.stages, self._queues)
+        }
+
+    async def _put(self, index: int, item: Any) -> None:
+        queue = self._queues[index]
+        await queue.put(item)
+        name = self.stages[index].name
+        self._max_depth[name] = max(self._max_depth.get(name, 0), queue.qsize())
+
+    async def _take(self, stage: Stage, inbox: asyncio.Queue) -> List[Any]:
+        """Следующий элемент, для пакетной стадии — пакет до batch_size элементов"""
+        items = [await inbox.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + stage.batch_wait
+        while len(items) < stage.batch_size:
+            if not inbox.empty():
+                items.append(inbox.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                items.append(await asyncio.wait_for(inbox.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return items
+
+    async def _worker(self, index: int, done: List[Any]) -> None:
+        stage = self.stages[index]
+        inbox = self._queues[index]
+        batched = stage.batch_size > 1
+        while True:
+            items = await self._take(stage, inbox)
+            try:
+                try:
+                    if batched:
+                        results = await stage.handler(items) or []
+                    else:
+                        results = [await stage.handler(items[0])]
+                except Exception as e:
+                    logger.error("pipeline_stage_error", stage=stage.name, error=str(e), items=len(items))
+                    if self.on_error:
+                        for item in items:
+                            self.on_error(stage.name, item, e)
+                    results = []
+                self._processed[stage.name] = self._processed.get(stage.name, 0) + len(items)
+                for result in results:
+                    if result is None:
+                        continue
+                    if index + 1 < len(self.stages):
+                        await self._put(index + 1, result)
+                    else:
+                        done.append(result)
+            finally:
+                for _ in items:
+                    inbox.task_done()
+
+    async def _report(self) -> None:
+        while True:
+            await asyncio.sleep(self.stats_interval)
+            logger.info("pipeline_queues", **{name: s['depth'] for name, s in self.stats().items()})
+
+    async def run(self, items: Union[Iterable[Any], AsyncIterable[Any]]) -> List[Any]:
+        """
+        Прогоняет элементы через все стадии.
+
+        items может быть асинхронным итератором: тогда элементы подаются в первую стадию
+        по мере их появления (например, когда планировщик выдаёт свободный слот).
+
+        Returns:
+            Элементы, прошедшие последнюю стадию (в порядке завершения)
+        """
+        self._queues = [asyncio.Queue(maxsize=self.queue_size) for _ in self.stages]
+        self._max_depth = {}
+        self._processed = {}
+        done: List[Any] = []
+
+        tasks = [
+            asyncio.create_task(self._worker(index, done))
+            for index, stage in enumerate(self.stages)
+            for _ in range(max(1, stage.workers))
+        ]
+        if self.stats_interval > 0:
+            tasks.append(asyncio.create_task(self._report()))
+
+        try:
+            if isinstance(items, AsyncIterable):
+                async for item in items:
+                    await self._put(0, item)
+            else:
+                for item in items:
+                    await self._put(0, item)
+            # Стадия i получает элементы только от стадии i-1: после её join очередь i полна окончательно
+            for queue in self._queues:
+                await queue.join()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        logger.info("pipeline_finished", **{
+            name: f"{s['processed']} done, max queue {s['max_depth']}" for name, s in self.stats().items()
+        })
+        return done
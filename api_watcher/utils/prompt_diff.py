@@ -0,0 +1,83 @@
+"""
+Diff-focused input for AI prompts
+Вместо обрезанных полных текстов модель получает только изменённые фрагменты в пределах бюджета токенов
+"""
+
+from difflib import SequenceMatcher
+from typing import List, Optional
+
+from api_watcher.config import Config
+
+# Грубая оценка без токенайзера: ~4 символа на токен
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _heading_before(lines: List[str], index: int) -> Optional[str]:
+    """Ближайший markdown-заголовок (html2text) выше строки index"""
+    for line in reversed(lines[:index + 1]):
+        if line.lstrip().startswith('#'):
+            return line.strip()
+    return None
+
+
+def _format_hunk(old_lines: List[str], new_lines: List[str], group) -> str:
+    first, last = group[0], group[-1]
+    heading = _heading_before(new_lines, first[3]) or _heading_before(old_lines, first[1])
+    header = f"@@ -{first[1] + 1},{last[2] - first[1]} +{first[3] + 1},{last[4] - first[3]} @@"
+    if heading:
+        header += f" {heading}"
+    out = [header]
+    for tag, i1, i2, j1, j2 in group:
+        if tag == 'equal':
+            out.extend(f" {line}" for line in old_lines[i1:i2])
+            continue
+        if tag in ('replace', 'delete'):
+            out.extend(f"-{line}" for line in old_lines[i1:i2])
+        if tag in ('replace', 'insert'):
+            out.extend(f"+{line}" for line in new_lines[j1:j2])
+    return '\n'.join(out)
+
+
+def build_change_diff(
+    old_text: str,
+    new_text: str,
+    token_budget: Optional[int] = None,
+    context_lines: Optional[int] = None
+) -> str:
+    """
+    Unified diff изменённых фрагментов с context_lines строками контекста.
+
+    Заголовок каждого фрагмента содержит ближайший раздел страницы. Фрагменты
+    добавляются по порядку, пока укладываются в token_budget; фрагмент, который
+    не помещается даже один, обрезается, об остальных сообщается одной строкой.
+    """
+    token_budget = token_budget or Config.AI_DIFF_TOKEN_BUDGET
+    context_lines = Config.AI_DIFF_CONTEXT_LINES if context_lines is None else context_lines
+    old_lines = (old_text or '').splitlines()
+    new_lines = (new_text or '').splitlines()
+
+    matcher = SequenceMatcher(None, old_lines, new_lines)
+    groups = list(matcher.get_grouped_opcodes(context_lines))
+    if not groups:
+        return ''
+
+    budget_chars = token_budget * CHARS_PER_TOKEN
+    hunks: List[str] = []
+    used = 0
+    for group in groups:
+        hunk = _format_hunk(old_lines, new_lines, group)
+        if used + len(hunk) > budget_chars:
+            if not hunks:
+                hunks.append(hunk[:budget_chars] + "\n[...фрагмент обрезан]")
+            break
+        hunks.append(hunk)
+        used += len(hunk) + 1
+
+    omitted = len(groups) - len(hunks)
+    if omitted:
+        hunks.append(f"[...ещё {omitted} изменённых фрагментов не поместились]")
+    return '\n'.join(hunks)
@@ -0,0 +1,174 @@
+"""
+Adaptive per-host rate limiter (AIMD token bucket)
+Адаптивный лимитер запросов по хостам: снижает скорость на 429/503, учитывает Retry-After
+"""
+
+import asyncio
+import json
+import os
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+from api_watcher.config import Config
+from api_watcher.logging_config import get_logger
+from api_watcher.utils.host_scheduler import host_of
+
+logger = get_logger(__name__)
+
+# Статусы, означающие "сервер просит притормозить"
+THROTTLE_STATUS_CODES = {429, 503}
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Разбирает заголовок Retry-After (секунды или HTTP-дата).
+
+    Returns:
+        Задержка в секундах (>= 0) или None, если заголовка нет / он некорректный
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+@dataclass
+class _HostState:
+    """Состояние token bucket одного хоста"""
+    rate: float
+    tokens: float = 1.0
+    updated: Optional[float] = None
+    blocked_until: float = 0.0
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+class HostRateLimiter:
+    """
+    Token bucket на каждый хост со скоростью, подбираемой по AIMD:
+    - успех: скорость растёт аддитивно (+increase запросов/сек)
+    - 429/503: скорость падает мультипликативно (*decrease), Retry-After блокирует хост
+
+    Выученные скорости сохраняются в JSON файл и переживают перезапуск процесса.
+    """
+
+    def __init__(
+        self,
+        state_file: str = "host_rates.json",
+        initial_rate: Optional[float] = None,
+        min_rate: Optional[float] = None,
+        max_rate: Optional[float] = None,
+        increase: Optional[float] = None,
+        decrease: Optional[float] = None,
+        burst: Optional[float] = None
+    ):
+        self.state_file = os.path.join(Config.SNAPSHOTS_DIR, state_file)
+        self.min_rate = float(min_rate if min_rate is not None else getattr(Config, "HOST_RATE_MIN", 0.1))
+        self.max_rate = float(max_rate if max_rate is not None else getattr(Config, "HOST_RATE_MAX", 10.0))
+        self.initial_rate = self._clamp(
+            float(initial_rate if initial_rate is not None else getattr(Config, "HOST_RATE_INITIAL", 2.0))
+        )
+        self.increase = float(increase if increase is not None else getattr(Config, "HOST_RATE_INCREASE", 0.1))
+        self.decrease = float(decrease if decrease is not None else getattr(Config, "HOST_RATE_DECREASE", 0.5))
+        self.burst = max(1.0, float(burst if burst is not None else getattr(Config, "HOST_RATE_BURST", 2.0)))
+        self._hosts: Dict[str, _HostState] = {}
+        self._dirty = False
+        for host, rate in self._load().items():
+            self._hosts[host] = _HostState(rate=self._clamp(rate))
+
+    def _clamp(self, rate: float) -> float:
+        return min(self.max_rate, max(self.min_rate, rate))
+
+    def _load(self) -> Dict[str, float]:
+        """Загружает выученные скорости из файла"""
+        if not os.path.exists(self.state_file):
+            return {}
+        try:
+            with open(self.state_file, 'r') as f:
+                data = json.load(f)
+            return {host: float(entry['rate']) for host, entry in data.items()}
+        except Exception as e:
+            logger.error(f"failed_load_host_rates: {e}")
+            return {}
+
+    def save(self) -> None:
+        """Сохраняет выученные скорости в файл, если они менялись"""
+        if not self._dirty:
+            return
+        data = {
+            host: {'rate': round(state.rate, 4), 'updated_at': datetime.now().isoformat()}
+            for host, state in self._hosts.items()
+        }
+        try:
+            os.makedirs(os.path.dirname(self.state_file) or '.', exist_ok=True)
+            tmp_path = f"{self.state_file}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp_path, self.state_file)
+            self._dirty = False
+        except Exception as e:
+            logger.error(f"failed_save_host_rates: {e}")
+
+    def _state(self, host: str) -> _HostState:
+        state = self._hosts.get(host)
+        if state is None:
+            state = _HostState(rate=self.initial_rate)
+            self._hosts[host] = state
+        return state
+
+    def rate_for(self, url: str) -> float:
+        """Текущая скорость (запросов/сек) для хоста URL"""
+        return self._state(host_of(url)).rate
+
+    async def acquire(self, url: str) -> None:
+        """Ждёт, пока хост URL разрешит следующий запрос (токен + Retry-After)"""
+        state = self._state(host_of(url))
+        async with state.lock:
+            loop = asyncio.get_running_loop()
+            while True:
+                now = loop.time()
+                if state.blocked_until > now:
+                    await asyncio.sleep(state.blocked_until - now)
+                    continue
+                if state.updated is not None:
+                    state.tokens = min(self.burst, state.tokens + (now - state.updated) * state.rate)
+                state.updated = now
+                if state.tokens >= 1.0:
+                    state.tokens -= 1.0
+                    return
+                await asyncio.sleep((1.0 - state.tokens) / state.rate)
+
+    def on_success(self, url: str) -> None:
+        """Аддитивное увеличение скорости после успешного ответа"""
+        state = self._state(host_of(url))
+        new_rate = self._clamp(state.rate + self.increase)
+        if new_rate != state.rate:
+            state.rate = new_rate
+            self._dirty = True
+
+    def on_throttle(self, url: str, retry_after: Optional[float] = None) -> None:
+        """Мультипликативное снижение скорости на 429/503; Retry-After блокирует хост"""
+        host = host_of(url)
+        state = self._state(host)
+        state.rate = self._clamp(state.rate * self.decrease)
+        state.tokens = min(state.tokens, 0.0)
+        self._dirty = True
+        if retry_after:
+            loop = asyncio.get_running_loop()
+            state.blocked_until = max(state.blocked_until, loop.time() + retry_after)
+        logger.warning("host_throttled", host=host, rate=round(state.rate, 3), retry_after=retry_after)
+
+    def stats(self) -> Dict[str, Any]:
+        """Выученные скорости по хостам"""
+        return {host: round(state.rate, 3) for host, state in self._hosts.items()}
@@ -0,0 +1,217 @@
+"""
+Section index of an HTML page
+Разбирает страницу один раз и выдаёт текст раздела по якорю (#id или #:~:text=...)
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import unquote
+
+from bs4 import BeautifulSoup, Tag, NavigableString
+from bs4.element import Comment, Declaration, Doctype, ProcessingInstruction
+
+from api_watcher.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+HEADING_LEVELS = {'h1': 1, 'h2': 2, 'h3': 3, 'h4': 4, 'h5': 5, 'h6': 6}
+
+SKIP_TAGS = {'script', 'style', 'noscript', 'template', 'head', 'svg'}
+
+# Теги, которые визуально разрывают строку (для текстовых фрагментов это граница слова)
+BLOCK_TAGS = {
+    'address', 'article', 'aside', 'blockquote', 'br', 'dd', 'details', 'div', 'dl', 'dt',
+    'fieldset', 'figcaption', 'figure', 'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+    'header', 'hr', 'li', 'main', 'nav', 'ol', 'p', 'pre', 'section', 'summary', 'table',
+    'tbody', 'td', 'tfoot', 'th', 'thead', 'tr', 'ul',
+}
+
+_WS_RE = re.compile(r'\s+')
+_SKIP_STRINGS = (Comment, Declaration, Doctype, ProcessingInstruction)
+
+
+@dataclass
+class TextDirective:
+    """Разобранная директива text fragment: #:~:text=[prefix-,]start[,end][,-suffix]"""
+    start: str
+    end: Optional[str] = None
+    prefix: Optional[str] = None
+    suffix: Optional[str] = None
+
+
+def parse_text_fragment(fragment: str) -> Optional[TextDirective]:
+    """
+    Разбирает text fragment (первую директиву text=).
+    Специальные символы (',', '-', '&') внутри текста закодированы, поэтому делим до unquote.
+    """
+    if not fragment.startswith(':~:'):
+        return None
+    for directive in fragment[3:].split('&'):
+        if not directive.startswith('text='):
+            continue
+        parts = directive[5:].split(',')
+        prefix = suffix = None
+        if parts and parts[0].endswith('-'):
+            prefix = unquote(parts.pop(0)[:-1])
+        if parts and parts[-1].startswith('-'):
+            suffix = unquote(parts.pop()[1:])
+        if not parts or not parts[0]:
+            return None
+        start = unquote(parts[0])
+        end = unquote(parts[1]) if len(parts) > 1 and parts[1] else None
+        return TextDirective(start=start, end=end, prefix=prefix, suffix=suffix)
+    return None
+
+
+def _text_pattern(text: str) -> str:
+    """Регулярка для поиска текста без учёта регистра и разницы в пробелах"""
+    words = _WS_RE.split(text.strip())
+    return r'\s+'.join(re.escape(word) for word in words if word)
+
+
+class PageSectionIndex:
+    """
+    Индекс разделов страницы.
+
+    При построении страница один раз линеаризуется в текст (блоки разделены переводом строки),
+    а для заголовков и элементов с id запоминаются смещения в этом тексте.
+    Раздел — это фрагмент текста от заголовка до следующего заголовка того же или более высокого уровня.
+    """
+
+    def __init__(self, html: str):
+        self._parts: List[str] = []
+        self._length = 0
+        self._last = ''
+        self.headings: List[Tuple[int, int]] = []  # (offset, level)
+        self.anchors: Dict[str, Tuple[int, int, Optional[int], bool]] = {}  # id -> (start, end, level, block)
+
+        soup = BeautifulSoup(html, 'html.parser')
+        try:
+            self._walk(soup)
+        except RecursionError:
+            logger.warning("section_index_too_deep")
+        self.text = ''.join(self._parts)
+        self._parts = []
+
+    def _append_text(self, value: str) -> None:
+        value = _WS_RE.sub(' ', value)
+        if value.startswith(' ') and (not self._last or self._last in ' \n'):
+            value = value[1:]
+        if not value:
+            return
+        self._parts.append(value)
+        self._length += len(value)
+        self._last = value[-1]
+
+    def _break(self) -> None:
+        if not self._last or self._last == '\n':
+            return
+        if self._last == ' ':
+            # Заменяем хвостовой пробел на перевод строки: длина (и смещения) не меняются
+            self._parts[-1] = self._parts[-1][:-1] + '\n'
+        else:
+            self._parts.append('\n')
+            self._length += 1
+        self._last = '\n'
+
+    def _walk(self, node: Tag) -> None:
+        for child in node.children:
+            if isinstance(child, NavigableString):
+                if not isinstance(child, _SKIP_STRINGS):
+                    self._append_text(str(child))
+                continue
+            if not isinstance(child, Tag) or child.name in SKIP_TAGS:
+                continue
+
+            is_block = child.name in BLOCK_TAGS
+            if is_block:
+                self._break()
+            start = self._length
+            level = HEADING_LEVELS.get(child.name)
+            if level:
+                self.headings.append((start, level))
+
+            self._walk(child)
+
+            if is_block:
+                self._break()
+            anchor = child.get('id') or (child.get('name') if child.name == 'a' else None)
+            if anchor and anchor not in self.anchors:
+                self.anchors[anchor] = (start, self._length, level, is_block)
+
+    def _next_heading(self, offset: int, max_level: int = 6) -> int:
+        """Смещение следующего заголовка (уровня <= max_level) строго после offset"""
+        for heading_offset, level in self.headings:
+            if heading_offset > offset and level <= max_level:
+                return heading_offset
+        return len(self.text)
+
+    def _enclosing_start(self, offset: int) -> int:
+        """Смещение заголовка, в разделе которого лежит offset"""
+        start = 0
+        for heading_offset, _ in self.headings:
+            if heading_offset > offset:
+                break
+            start = heading_offset
+        return start
+
+    def _slice(self, start: int, end: int) -> Optional[str]:
+        section = self.text[start:end].strip()
+        return section or None
+
+    def _section_by_id(self, anchor: str) -> Optional[str]:
+        entry = self.anchors.get(anchor) or self.anchors.get(unquote(anchor))
+        if entry is None:
+            return None
+        start, end, level, is_block = entry
+        if level:
+            return self._slice(start, self._next_heading(start, level))
+        if not is_block or end <= start:
+            # Пустой маркер (<a name>, <span id>) — раздел начинается с него
+            return self._slice(start, self._next_heading(start))
+        return self._slice(start, end)
+
+    def _find(self, text: str, context: Optional[str], after: int, context_before: bool) -> Optional[re.Match]:
+        pattern = _text_pattern(text)
+        if not pattern:
+            return None
+        if context and _text_pattern(context):
+            if context_before:
+                full = rf'(?:{_text_pattern(context)})\s*({pattern})'
+            else:
+                full = rf'({pattern})\s*(?:{_text_pattern(context)})'
+            match = re.compile(full, re.IGNORECASE).search(self.text, after)
+            if match:
+                return match
+        match = re.compile(f'({pattern})', re.IGNORECASE).search(self.text, after)
+        return match
+
+    def _section_by_text(self, directive: TextDirective) -> Optional[str]:
+        start_match = self._find(directive.start, directive.prefix, 0, context_before=True)
+        if start_match is None:
+            return None
+        match_start, match_end = start_match.start(1), start_match.end(1)
+        if directive.end:
+            end_match = self._find(directive.end, directive.suffix, match_end, context_before=False)
+            if end_match is None:
+                return None
+            match_end = end_match.end(1)
+        return self._slice(self._enclosing_start(match_start), self._next_heading(max(match_start, match_end - 1)))
+
+    def section(self, fragment: str) -> Optional[str]:
+        """
+        Возвращает текст раздела по якорю URL.
+
+        Args:
+            fragment: часть URL после '#' (id элемента или text fragment)
+
+        Returns:
+            Текст раздела или None, если якорь на странице не найден
+        """
+        if not fragment:
+            return None
+        directive = parse_text_fragment(fragment)
+        if directive is not None:
+            return self._section_by_text(directive)
+        return self._section_by_id(fragment)
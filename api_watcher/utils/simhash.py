@@ -0,0 +1,100 @@
+"""
+SimHash fingerprints
+Локально-чувствительный отпечаток текста: у похожих текстов отпечатки отличаются в немногих битах
+"""
+
+import hashlib
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from api_watcher.config import Config
+
+FINGERPRINT_BITS = 64
+
+_WORD = re.compile(r'\w+')
+
+
+def _shingles(text: str, size: int) -> List[str]:
+    """Перекрывающиеся последовательности из size слов (короткий текст — одна последовательность)"""
+    words = _WORD.findall((text or '').lower())
+    if len(words) <= size:
+        return [' '.join(words)] if words else []
+    return [' '.join(words[i:i + size]) for i in range(len(words) - size + 1)]
+
+
+def simhash(text: Optional[str], shingle_size: Optional[int] = None) -> int:
+    """
+    64-битный SimHash по шинглам слов. Пустой текст даёт 0.
+    Правка одного слова меняет не больше shingle_size шинглов из всех, поэтому
+    расстояние Хэмминга растёт вместе с долей изменённого текста.
+    """
+    shingles = _shingles(text, shingle_size or Config.SIMHASH_SHINGLE_SIZE)
+    if not shingles:
+        return 0
+    rows = [
+        format(int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=8).digest(), 'big'), '064b')
+        for s in shingles
+    ]
+    # Суммы по битам через столбцы строк '0101...': подсчёт идёт в C, а не в цикле по 64 битам на шингл
+    half = len(rows) / 2
+    return int(''.join('1' if column.count('1') > half else '0' for column in zip(*rows)), 2)
+
+
+def to_hex(fingerprint: int) -> str:
+    """Отпечаток для хранения в БД (беззнаковые 64 бита не помещаются в BIGINT)"""
+    return f"{fingerprint:016x}"
+
+
+def from_hex(value: Optional[str]) -> Optional[int]:
+    """Отпечаток из БД; None для снэпшотов без отпечатка"""
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        return int(value, 16)
+    except ValueError:
+        return None
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+def similarity(a: int, b: int) -> float:
+    """1.0 — отпечатки совпадают, 0.0 — отличаются все биты"""
+    return 1 - hamming_distance(a, b) / FINGERPRINT_BITS
+
+
+def find_near_duplicates(fingerprints: Dict[str, int], max_distance: int) -> List[Tuple[str, str, int]]:
+    """
+    Пары ключей с расстоянием не больше max_distance: [(a, b, distance)].
+
+    Отпечаток делится на max_distance + 1 полос: у пары на таком расстоянии хотя бы
+    одна полоса совпадает целиком, поэтому сравниваются только ключи из общих корзин.
+    Пустые тексты (отпечаток 0) не учитываются.
+    """
+    bands = max(1, min(max_distance + 1, FINGERPRINT_BITS))
+    width = FINGERPRINT_BITS // bands
+    buckets: Dict[Tuple[int, int], List[str]] = defaultdict(list)
+    for key, fingerprint in fingerprints.items():
+        if not fingerprint:
+            continue
+        for band in range(bands):
+            shift = band * width
+            # Последняя полоса забирает оставшиеся биты
+            bits = FINGERPRINT_BITS - shift if band == bands - 1 else width
+            buckets[(band, (fingerprint >> shift) & ((1 << bits) - 1))].append(key)
+
+    seen = set()
+    pairs: List[Tuple[str, str, int]] = []
+    for keys in buckets.values():
+        for i, a in enumerate(keys):
+            for b in keys[i + 1:]:
+                pair = (a, b) if a < b else (b, a)
+                if pair in seen:
+                    continue
+                seen.add(pair)
+                distance = hamming_distance(fingerprints[a], fingerprints[b])
+                if distance <= max_distance:
+                    pairs.append((*pair, distance))
+    return sorted(pairs)
@@ -10,9 +10,13 @@ import html2text
 import logging
 
 from api_watcher.config import Config
+from api_watcher.utils.noise_normalizer import NoiseNormalizer
 
 logger = logging.getLogger(__name__)
 
+# Большой текст хешируется окнами: content.encode() целиком дал бы ещё одну полную копию страницы
+_HASH_WINDOW_CHARS = 1 << 20
+
 
 class SmartComparator:
     """Умный компаратор с поддержкой разных типов контента"""
@@ -22,6 +26,21 @@ class SmartComparator:
         self.html_converter.ignore_links = False
         self.html_converter.ignore_images = True
         self.html_converter.ignore_emphasis = False
+        self.normalizer = NoiseNormalizer.from_config()
+        self.text_version = self._text_version()
+    
+    def _text_version(self) -> str:
+        """
+        Тег формата текста страницы (page_text): версия html2text, его настройки и правила шума.
+        Сохранённый text_content с тем же тегом можно сравнивать без повторной конвертации.
+        """
+        converter = self.html_converter
+        settings = repr((
+            converter.ignore_links, converter.ignore_images, converter.ignore_emphasis, converter.body_width,
+            getattr(Config, "MAX_HTML_TO_TEXT_CHARS", 500_000), self.normalizer.version
+        ))
+        digest = hashlib.sha256(settings.encode('utf-8')).hexdigest()[:12]
+        return f"html2text-{'.'.join(map(str, html2text.__version__))}:{digest}"
     
     def html_to_text(self, html: str) -> str:
         """Конвертирует HTML в читаемый текст"""
@@ -43,7 +62,21 @@ class SmartComparator:
     
     def calculate_hash(self, content: str) -> str:
         """Вычисляет хеш контента для быстрого сравнения"""
-        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+        if len(content) <= _HASH_WINDOW_CHARS:
+            return hashlib.sha256(content.encode('utf-8')).hexdigest()
+        digest = hashlib.sha256()
+        for start in range(0, len(content), _HASH_WINDOW_CHARS):
+            digest.update(content[start:start + _HASH_WINDOW_CHARS].encode('utf-8'))
+        return digest.hexdigest()
+    
+    def normalized_hash(self, content: str, url: Optional[str] = None, is_text: bool = False) -> str:
+        """
+        Хеш HTML (или текста раздела) после нормализации шума:
+        страница, у которой поменялись только токены/даты/ссылки на ассеты, даёт тот же хеш
+        """
+        if is_text:
+            return self.calculate_hash(self.normalizer.normalize_text(content, url))
+        return self.calculate_hash(self.normalizer.normalize_html(content, url))
     
     def compare_openapi(
         self,
@@ -134,19 +167,24 @@ class SmartComparator:
         
         return old_hash != new_hash
     
+    def page_text(self, html: str, url: Optional[str] = None) -> str:
+        """Нормализованный текст HTML-страницы: шум убирается до и после html2text"""
+        return self.normalizer.normalize_text(self.html_to_text(self.normalizer.normalize_html(html, url)), url)
+    
     def compare_html_text(
         self,
         old_html: str,
-        new_html: str
+        new_html: str,
+        url: Optional[str] = None
     ) -> Tuple[bool, str, str]:
         """
-        Сравнивает HTML, конвертируя в текст
+        Сравнивает HTML, конвертируя в текст (шум убирается до и после html2text)
         
         Returns:
-            (has_changes, old_text, new_text)
+            (has_changes, old_text, new_text) — тексты уже нормализованы
         """
-        old_text = self.html_to_text(old_html)
-        new_text = self.html_to_text(new_html)
+        old_text = self.page_text(old_html, url)
+        new_text = self.page_text(new_html, url)
         
         has_changes = self.quick_compare(old_text, new_text)
         
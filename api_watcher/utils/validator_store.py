@@ -0,0 +1,94 @@
+"""
+HTTP validator store for conditional GET
+Хранит ETag / Last-Modified и хеш тела для каждого URL между циклами
+"""
+
+import json
+import os
+from datetime import datetime
+from typing import Dict, Optional, Any
+
+from api_watcher.config import Config
+from api_watcher.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+class HTTPValidatorStore:
+    """
+    Хранилище валидаторов (ETag / Last-Modified) для условных запросов.
+    SHA-256 тела ответа служит валидатором для серверов без 304: то же тело — страница не менялась.
+    Сохраняет состояние в JSON файл рядом со снэпшотами.
+
+    Валидаторы фиксируются только после успешной обработки страницы
+    (см. APIWatcher), иначе 304 мог бы скрыть изменение, которое мы так и не сохранили.
+    """
+
+    def __init__(self, state_file: str = "http_validators.json"):
+        self.state_file = os.path.join(Config.SNAPSHOTS_DIR, state_file)
+        self._validators: Dict[str, Dict[str, Any]] = self._load()
+        self._dirty = False
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        """Загружает валидаторы из файла"""
+        if not os.path.exists(self.state_file):
+            return {}
+        try:
+            with open(self.state_file, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"failed_load_http_validators: {e}")
+            return {}
+
+    def get(self, url: str) -> Optional[Dict[str, str]]:
+        """Возвращает сохранённые валидаторы для URL (или None)"""
+        entry = self._validators.get(url)
+        if not entry:
+            return None
+        validators = {
+            key: entry[key]
+            for key in ('etag', 'last_modified', 'body_hash')
+            if entry.get(key)
+        }
+        return validators or None
+
+    def update(
+        self,
+        url: str,
+        etag: Optional[str],
+        last_modified: Optional[str],
+        body_hash: Optional[str] = None
+    ) -> None:
+        """Запоминает валидаторы для URL (без записи на диск, см. save())"""
+        if not etag and not last_modified and not body_hash:
+            self.discard(url)
+            return
+        self._validators[url] = {
+            'etag': etag,
+            'last_modified': last_modified,
+            'body_hash': body_hash,
+            'updated_at': datetime.now().isoformat()
+        }
+        self._dirty = True
+
+    def discard(self, url: str) -> None:
+        """Удаляет валидаторы URL (следующий запрос будет безусловным)"""
+        if self._validators.pop(url, None) is not None:
+            self._dirty = True
+
+    def save(self) -> None:
+        """Сохраняет валидаторы в файл, если были изменения"""
+        if not self._dirty:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.state_file) or '.', exist_ok=True)
+            tmp_path = f"{self.state_file}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(self._validators, f, indent=2)
+            os.replace(tmp_path, self.state_file)
+            self._dirty = False
+        except Exception as e:
+            logger.error(f"failed_save_http_validators: {e}")
+
+    def __len__(self) -> int:
+        return len(self._validators)
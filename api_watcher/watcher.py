@@ -6,14 +6,20 @@ Refactoring: Repository pattern, Notifier adapters, Async fetch, SRP compliance
 import json
 import asyncio
 import os
-from typing import Dict, List, Optional
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import urldefrag, unquote
 from datetime import datetime
 
 from api_watcher.config import Config
-from api_watcher.storage.repository import SQLAlchemySnapshotRepository, SnapshotRepository
-from api_watcher.utils.async_fetcher import ContentFetcher
+from api_watcher.storage.repository import SnapshotRepository, create_repository, resolve
+from api_watcher.storage.database import Snapshot
+from api_watcher.utils.async_fetcher import ContentFetcher, FetchResult
+from api_watcher.utils.host_scheduler import HostScheduler, interleave_by_host
+from api_watcher.utils.http_pool import close_http_pool, get_http_pool
 from api_watcher.utils.gemini_analyzer import GeminiAnalyzer
-from api_watcher.utils.openrouter_analyzer import OpenRouterAnalyzer
+from api_watcher.utils.openrouter_analyzer import AsyncOpenRouterAnalyzer
 from api_watcher.utils.smart_comparator import SmartComparator
 from api_watcher.notifier.base import NotifierManager
 from api_watcher.notifier.adapters import (
@@ -23,7 +29,13 @@ from api_watcher.notifier.adapters import (
     ConsoleAdapter
 )
 from api_watcher.services.content_processor import ContentProcessor
-from api_watcher.services.change_detector import ChangeDetector
+from api_watcher.services.change_detector import ChangeDetector, Detection
+from api_watcher.services.page_group import PageGroup, SECTION_CONTENT_TYPE
+from api_watcher.utils.compute_pool import ComputePool, ComputeTimeoutError, page_fingerprint
+from api_watcher.utils.ai_cache import AIAnalysisCache
+from api_watcher.utils.change_classifier import ChangeClassifier
+from api_watcher.utils.pipeline import Stage, StagedPipeline
+from api_watcher.utils.simhash import find_near_duplicates, from_hex, to_hex
 from api_watcher.logging_config import setup_from_config, get_logger
 
 # Initialize structured logging
@@ -54,6 +66,17 @@ def _release_lockfile(fd: Optional[int], lock_path: str) -> None:
             pass
 
 
+@dataclass
+class _CycleJob:
+    """One entry of the urls file travelling through the cycle pipeline"""
+    index: int
+    url: str
+    api_name: Optional[str]
+    method_name: Optional[str]
+    fetch_result: Optional[FetchResult] = None
+    detection: Optional[Detection] = None
+
+
 class APIWatcher:
     """
     Orchestrator for API monitoring.
@@ -69,9 +92,7 @@ class APIWatcher:
         self.config = Config
         
         # Repository (DI or default)
-        self.repository = repository or SQLAlchemySnapshotRepository(
-            self.config.DATABASE_URL
-        )
+        self.repository = repository or create_repository(self.config.DATABASE_URL)
         
         # Async Fetcher (DI or default)
         self.fetcher = fetcher or ContentFetcher(
@@ -85,13 +106,24 @@ class APIWatcher:
         
         # AI Analyzer
         self.ai_analyzer = self._create_ai_analyzer()
+        self.ai_cache = AIAnalysisCache() if self.ai_analyzer and self.config.AI_CACHE_ENABLED else None
+        # Local pre-classifier: only ambiguous changes reach the analyzer
+        self.change_classifier = (
+            ChangeClassifier.from_config() if self.ai_analyzer and self.config.CHANGE_CLASSIFIER != 'off' else None
+        )
+        
+        # Process pool for html2text/DeepDiff, so comparisons overlap with fetch I/O
+        self.compute_pool = ComputePool()
         
         # Services
         self.content_processor = ContentProcessor(self.notifiers)
         self.change_detector = ChangeDetector(
             repository=self.repository,
             notifiers=self.notifiers,
-            ai_analyzer=self.ai_analyzer
+            ai_analyzer=self.ai_analyzer,
+            compute_pool=self.compute_pool,
+            ai_cache=self.ai_cache,
+            classifier=self.change_classifier
         )
         
         # Comparator (still needed for initial snapshot hash calculation in some cases, 
@@ -100,6 +132,12 @@ class APIWatcher:
         
         # Request cache for deduplication within a single cycle
         self._request_cache: Dict[str, asyncio.Task] = {}
+        # Base URLs whose processing failed in this cycle: their validators are not committed
+        self._failed_base_urls: Set[str] = set()
+        # Parsed pages shared by all anchored entries of a base URL within a single cycle
+        self._page_groups: Dict[str, PageGroup] = {}
+        # Baseline snapshots of the cycle, loaded in one query; each entry is consumed once
+        self._baselines: Dict[str, Optional[Snapshot]] = {}
     
     def _create_notifier_manager(self) -> NotifierManager:
         """Creates notifier manager based on config"""
@@ -136,11 +174,13 @@ class APIWatcher:
         """Creates AI analyzer (OpenRouter priority, Gemini fallback)"""
         if self.config.is_openrouter_configured():
             logger.info(f"✅ OpenRouter AI (model: {self.config.OPENROUTER_MODEL})")
-            return OpenRouterAnalyzer(
+            return AsyncOpenRouterAnalyzer(
                 self.config.OPENROUTER_API_KEY,
                 self.config.OPENROUTER_MODEL,
                 self.config.OPENROUTER_SITE_URL,
-                self.config.OPENROUTER_APP_NAME
+                self.config.OPENROUTER_APP_NAME,
+                max_concurrent=self.config.OPENROUTER_MAX_CONCURRENT,
+                timeout=self.config.OPENROUTER_TIMEOUT
             )
         elif self.config.is_gemini_configured():
             logger.info("✅ Gemini AI (fallback)")
@@ -150,7 +190,7 @@ class APIWatcher:
             )
         return None
     
-    async def fetch_content(self, url: str) -> Optional[str]:
+    async def fetch_content(self, url: str) -> Optional[FetchResult]:
         """
         Async fetch content with deduplication.
         If multiple URLs point to the same page (e.g. different anchors),
@@ -182,78 +222,244 @@ class APIWatcher:
             # They will receive the same exception/None result.
             return None
     
+    def _release_page(self, base_url: str) -> None:
+        """
+        Drops the text of a page whose entries are all processed. Only the fetch
+        metadata (status, validators) is kept until the end of the cycle, so pages
+        do not pile up in memory over a long cycle.
+        """
+        self._page_groups.pop(base_url, None)
+        task = self._request_cache.get(base_url)
+        if task is not None and task.done() and not task.cancelled() and task.exception() is None:
+            result = task.result()
+            if result is not None:
+                result.release_body()
+    
+    async def _start_cycle(self, urls_data: List[Dict]) -> None:
+        """Resets per-cycle caches and preloads the baseline snapshots of all entries in one query"""
+        self._request_cache.clear()
+        self._failed_base_urls.clear()
+        self._page_groups.clear()
+        
+        urls = [item.get('url') for item in urls_data if item.get('url')]
+        try:
+            latest = await resolve(self.repository.get_latest_many(urls))
+            self._baselines = {url: latest.get(url) for url in urls}
+        except Exception as e:
+            logger.error(f"❌ Failed to preload baselines: {e}")
+            self._baselines = {}
+    
+    async def _get_baseline(self, url: str) -> Optional[Snapshot]:
+        """Latest snapshot for the URL: preloaded for this cycle, or read from the repository"""
+        if url in self._baselines:
+            return self._baselines.pop(url)
+        return await resolve(self.repository.get_latest(url))
+    
+    def _finish_cycle(self) -> None:
+        """
+        Persists per-cycle fetch state.
+        Commits ETag/Last-Modified of pages processed without errors in this cycle:
+        a page that failed mid-processing keeps its old validators, so the next
+        cycle re-downloads it instead of getting a 304 for an unprocessed change.
+        Learned per-host rates and fetch routes are saved so the next cycle starts at them,
+        as are the AI verdicts cached during the cycle and the classifier log.
+        Shared connection pool stats are logged to show connection reuse.
+        """
+        results = []
+        for base_url, task in self._request_cache.items():
+            if base_url in self._failed_base_urls or not task.done() or task.cancelled():
+                continue
+            if task.exception() is None and task.result() is not None:
+                results.append(task.result())
+        self.fetcher.commit_validators(results)
+        self.fetcher.save_rate_limits()
+        self.fetcher.save_host_routes()
+        if self.ai_cache is not None:
+            self.ai_cache.save()
+        if self.change_classifier is not None:
+            self.change_classifier.save()
+        logger.info("http_pool_stats", **get_http_pool().stats())
+        self._page_groups.clear()
+        self._baselines.clear()
+    
     async def process_url(
         self,
         url: str,
         api_name: Optional[str] = None,
         method_name: Optional[str] = None
     ) -> Dict:
-        """Async process URL"""
+        """Async process URL: runs all cycle stages for one entry in sequence"""
         logger.info(f"\n{'='*60}")
         logger.info(f"🔍 Processing: {api_name or url}")
         logger.info(f"{'='*60}")
         
-        # 1. Fetch content
-        new_html = await self.fetch_content(url)
+        fetch_result = await self.fetch_content(url)
+        detection = await self._prepare_entry(url, api_name, method_name, fetch_result)
+        await self.change_detector.analyze(detection)
+        await self.change_detector.persist(detection)
+        self.change_detector.notify(detection)
+        return self._entry_result(url, detection)
+    
+    def _entry_result(self, url: str, detection: Detection) -> Dict:
+        """Final result of an entry; failed entries keep their page's validators uncommitted"""
+        if detection.result.get('error'):
+            self._failed_base_urls.add(url.split('#')[0])
+        return detection.result
+    
+    async def _prepare_entry(
+        self,
+        url: str,
+        api_name: Optional[str],
+        method_name: Optional[str],
+        fetch_result: Optional[FetchResult]
+    ) -> Detection:
+        """
+        Validate, parse and diff stage: turns a fetched page into a Detection.
+        AI analysis, DB writes and notifications are left to the following stages.
+        """
+        # 304 Not Modified (or the same body hash as last cycle): nothing to validate, convert or diff
+        if fetch_result is not None and fetch_result.not_modified:
+            if await self._get_baseline(url) is None:
+                # Validators without a baseline (e.g. DB was reset): drop them, full fetch next cycle
+                logger.warning(f"⚠️ 304 without baseline snapshot for {url}")
+                self.fetcher.forget_validators(url.split('#')[0])
+                return Detection.final({'url': url, 'has_changes': False, 'error': 'Not modified, no baseline snapshot'})
+            logger.info(f"✅ Not modified ({fetch_result.status_code}): {url}")
+            return Detection.final({'url': url, 'has_changes': False, 'not_modified': True})
+        
+        new_html = fetch_result.content if fetch_result else None
         if not new_html:
             logger.error(f"❌ Failed to fetch content for {url}")
-            return {'url': url, 'has_changes': False, 'error': 'Failed to fetch'}
+            return Detection.final({'url': url, 'has_changes': False, 'error': 'Failed to fetch'})
+        
+        # 2. Page-level stage: validation and type detection run once per base URL
+        page = self._get_page_group(url, new_html)
         
-        # 2. Validate and fallback
-        if not self.content_processor.is_valid_response(new_html, url):
+        # 3. Validate and fallback
+        if not page.is_valid:
             logger.warning(f"⚠️ Invalid response from {url}")
+            # Never let a 304 vouch for an invalid page next cycle
+            self._failed_base_urls.add(url.split('#')[0])
             
             new_url = await self.content_processor.try_find_new_documentation(url, api_name, method_name)
             
             if new_url:
-                new_html_from_new_url = await self.fetch_content(new_url)
+                new_result = await self.fetch_content(new_url)
+                new_html_from_new_url = new_result.content if new_result else None
+                new_page = self._get_page_group(new_url, new_html_from_new_url) if new_html_from_new_url else None
                 
-                if new_html_from_new_url and self.content_processor.is_valid_response(new_html_from_new_url, new_url):
+                if new_page and new_page.is_valid:
                     logger.info(f"✅ Content from new URL: {new_url}")
                     url = new_url
-                    new_html = new_html_from_new_url
+                    page = new_page
                 else:
-                    return {'url': url, 'has_changes': False, 'error': 'New URL also failed'}
+                    return Detection.final({'url': url, 'has_changes': False, 'error': 'New URL also failed'})
             else:
-                return {'url': url, 'has_changes': False, 'error': 'No alternative found'}
-        
-        # 3. Detect content type
-        content_type = self.content_processor.detect_content_type(url, new_html)
-        logger.info(f"📄 Content type: {content_type}")
+                return Detection.final({'url': url, 'has_changes': False, 'error': 'No alternative found'})
         
         # 4. Get latest snapshot
-        old_snapshot = self.repository.get_latest(url)
+        old_snapshot = await self._get_baseline(url)
+        
+        # 5. Entry content: the page itself, or only its section for anchored entries
+        try:
+            new_html, content_type = await self._entry_content(url, page, old_snapshot)
+        except ComputeTimeoutError as e:
+            logger.error(f"❌ Section indexing timed out for {url}: {e}")
+            return Detection.final({'url': url, 'has_changes': False, 'error': str(e)})
+        logger.info(f"📄 Content type: {content_type}")
         
         if not old_snapshot:
             logger.info(f"📝 First snapshot for {url}")
-            text_content = self.comparator.html_to_text(new_html) if content_type == 'html' else new_html
-            content_hash = self.comparator.calculate_hash(new_html)
-            
-            self.repository.save(
+            return await self._baseline_detection(url, new_html, content_type, api_name, method_name, is_first_snapshot=True)
+        
+        if (old_snapshot.content_type == SECTION_CONTENT_TYPE) != (content_type == SECTION_CONTENT_TYPE):
+            # Entry switched between whole-page and section tracking: the two are not comparable
+            logger.info(f"📝 Re-baselining {url} as {content_type}")
+            return await self._baseline_detection(url, new_html, content_type, api_name, method_name, is_first_snapshot=False)
+        
+        # 6. Compare (AI, persistence and notification happen in later stages)
+        return await self.change_detector.compare(
+            old_snapshot, new_html, content_type, url, api_name, method_name
+        )
+    
+    def _get_page_group(self, url: str, content: str) -> PageGroup:
+        """Returns the per-cycle page group for the base URL, building it on first use"""
+        base_url = url.split('#')[0]
+        page = self._page_groups.get(base_url)
+        if page is None or page.content is not content:
+            page = PageGroup(base_url, content, self.content_processor, self.compute_pool)
+            self._page_groups[base_url] = page
+        return page
+    
+    async def _entry_content(self, url: str, page: PageGroup, old_snapshot) -> Tuple[str, str]:
+        """
+        Resolves what an entry tracks: the section for anchored HTML entries, the whole page otherwise.
+        If a tracked section disappears, a marker is returned so the removal is reported as a change.
+        """
+        section = await page.section_for(url)
+        if section is not None:
+            return section, SECTION_CONTENT_TYPE
+        
+        fragment = urldefrag(url).fragment
+        if fragment and page.content_type == 'html':
+            if old_snapshot is not None and old_snapshot.content_type == SECTION_CONTENT_TYPE:
+                logger.warning(f"⚠️ Tracked section not found on page: {url}")
+                return f"[section not found: {unquote(fragment)}]", SECTION_CONTENT_TYPE
+            logger.warning(f"⚠️ Anchor not found, tracking whole page: {url}")
+        return page.content, page.content_type
+    
+    async def _baseline_detection(
+        self,
+        url: str,
+        content: str,
+        content_type: str,
+        api_name: Optional[str],
+        method_name: Optional[str],
+        is_first_snapshot: bool
+    ) -> Detection:
+        """Snapshot to store without change detection (first snapshot or re-baseline)"""
+        text_content, simhash, text_version = content, None, None
+        if content_type in ('html', SECTION_CONTENT_TYPE):
+            is_section = content_type == SECTION_CONTENT_TYPE
+            try:
+                text, fingerprint = await self.compute_pool.run(
+                    page_fingerprint, content, url, is_section, size=len(content)
+                )
+            except ComputeTimeoutError as e:
+                logger.error(f"❌ HTML conversion timed out for {url}: {e}")
+                return Detection.final({'url': url, 'has_changes': False, 'error': str(e)})
+            if not is_section:
+                text_content, text_version = text, self.comparator.text_version
+            simhash = to_hex(fingerprint)
+            content_hash = self.comparator.normalized_hash(content, url, is_text=is_section)
+        else:
+            content_hash = self.comparator.calculate_hash(content)
+        
+        if is_first_snapshot:
+            result = {'url': url, 'has_changes': False, 'is_first_snapshot': True}
+        else:
+            result = {'url': url, 'has_changes': False, 'rebaselined': True}
+        return Detection(
+            url=url,
+            result=result,
+            snapshot=dict(
                 url=url,
-                raw_html=new_html,
+                raw_html=content,
                 text_content=text_content,
                 api_name=api_name,
                 method_name=method_name,
                 content_type=content_type,
                 content_hash=content_hash,
-                has_changes=False
+                has_changes=False,
+                simhash=simhash,
+                text_version=text_version
             )
-            
-            return {'url': url, 'has_changes': False, 'is_first_snapshot': True}
-        
-        # 5. Detect changes
-        return self.change_detector.detect_changes(
-            old_snapshot, new_html, content_type, url, api_name, method_name
         )
     
     async def process_urls_file(self, urls_file: str) -> List[Dict]:
         """Async process URLs from file"""
         logger.info(f"📂 Loading URLs from {urls_file}")
         
-        # Clear request cache for new cycle
-        self._request_cache.clear()
-        
         try:
             with open(urls_file, 'r', encoding='utf-8') as f:
                 urls_data = json.load(f)
@@ -261,6 +467,8 @@ class APIWatcher:
             logger.error(f"❌ Error reading file {urls_file}: {e}")
             return []
         
+        await self._start_cycle(urls_data)
+        
         results = []
         for item in urls_data:
             url = item.get('url')
@@ -273,27 +481,38 @@ class APIWatcher:
             result = await self.process_url(url, api_name, method_name)
             results.append(result)
         
+        self._finish_cycle()
         return results
     
     async def process_urls_parallel(
         self, 
         urls_file: str, 
         max_concurrent: int = 10,
-        delay_between_requests: float = 0.2
+        delay_between_requests: float = 0.2,
+        per_host_limit: Optional[int] = None
     ) -> List[Dict]:
         """
-        Parallel URL processing with rate limiting
+        Parallel URL processing with per-host rate limiting
+        
+        URLs are interleaved round-robin across hosts, so a vendor with many
+        entries cannot occupy every slot while other hosts sit idle. The
+        scheduler takes a host's slot before the entry enters the fetch queue,
+        so an entry of a busy host never blocks entries of idle hosts.
+        
+        Entries flow through a staged pipeline (fetch -> process -> analyze ->
+        persist -> notify) with bounded queues between stages: fetching keeps
+        going while AI calls and DB writes run, but only up to
+        Config.PIPELINE_QUEUE_SIZE pages wait in front of a slow stage.
         
         Args:
             urls_file: Path to JSON file with URLs
-            max_concurrent: Maximum concurrent requests (default: 3 to avoid rate limiting)
-            delay_between_requests: Delay in seconds between starting new requests
+            max_concurrent: Maximum concurrent requests overall
+            delay_between_requests: Minimum delay in seconds between starting requests to the same host
+            per_host_limit: Maximum concurrent requests per host (default: Config.PER_HOST_MAX_CONCURRENT,
+                per-host overrides come from Config.HOST_CONCURRENCY)
         """
         logger.info(f"📂 Loading URLs from {urls_file} (parallel, max={max_concurrent})")
         
-        # Clear request cache for new cycle
-        self._request_cache.clear()
-        
         try:
             with open(urls_file, 'r', encoding='utf-8') as f:
                 urls_data = json.load(f)
@@ -301,39 +520,124 @@ class APIWatcher:
             logger.error(f"❌ Error reading file {urls_file}: {e}")
             return []
         
-        semaphore = asyncio.Semaphore(max_concurrent)
-        results = []
+        await self._start_cycle(urls_data)
         
-        async def process_with_semaphore(item, index):
-            # Add delay to avoid rate limiting
-            if delay_between_requests > 0 and index > 0:
-                await asyncio.sleep(delay_between_requests * (index % max_concurrent))
-            
-            async with semaphore:
-                url = item.get('url')
-                if not url:
-                    return None
-                try:
-                    return await self.process_url(
-                        url,
-                        item.get('api_name'),
-                        item.get('method_name')
-                    )
-                except Exception as e:
-                    logger.error(f"❌ Error processing {url}: {e}")
-                    return {'url': url, 'has_changes': False, 'error': str(e)}
-        
-        tasks = [process_with_semaphore(item, i) for i, item in enumerate(urls_data)]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        # Filter out None and exceptions
-        return [r for r in results if r is not None and not isinstance(r, Exception)]
+        scheduler = HostScheduler(
+            max_concurrent=max_concurrent,
+            per_host_limit=per_host_limit or self.config.PER_HOST_MAX_CONCURRENT,
+            host_limits=self.config.get_host_concurrency(),
+            min_interval=delay_between_requests
+        )
+        
+        ordered = interleave_by_host(urls_data, lambda item: item.get('url'))
+        jobs = [
+            _CycleJob(index, item.get('url'), item.get('api_name'), item.get('method_name'))
+            for index, item in enumerate(ordered)
+            if item.get('url')
+        ]
+        results: List[Optional[Dict]] = [None] * len(ordered)
+        # Entries per page still to be processed: the page's text is dropped after the last one
+        unprocessed = Counter(job.url.split('#')[0] for job in jobs)
+        
+        def finish(job: _CycleJob, result: Dict) -> None:
+            results[job.index] = result
+            if result.get('error'):
+                self._failed_base_urls.add(job.url.split('#')[0])
+        
+        async def fetch(job: _CycleJob) -> _CycleJob:
+            # The slot was taken by scheduler.dispatch before the job entered the queue
+            try:
+                logger.info(f"🔍 Processing: {job.api_name or job.url}")
+                job.fetch_result = await self.fetch_content(job.url)
+            finally:
+                scheduler.release(job.url)
+            return job
+        
+        async def process(job: _CycleJob) -> _CycleJob:
+            base_url = job.url.split('#')[0]
+            try:
+                job.detection = await self._prepare_entry(job.url, job.api_name, job.method_name, job.fetch_result)
+            finally:
+                job.fetch_result = None
+                unprocessed[base_url] -= 1
+                if unprocessed[base_url] == 0:
+                    self._release_page(base_url)
+            return job
+        
+        async def analyze(job: _CycleJob) -> _CycleJob:
+            await self.change_detector.analyze(job.detection)
+            return job
+        
+        async def analyze_batch(batch: List[_CycleJob]) -> List[_CycleJob]:
+            # Changes collected within AI_BATCH_WAIT go to the model in one request
+            await self.change_detector.analyze_many([job.detection for job in batch])
+            return batch
+        
+        async def persist(batch: List[_CycleJob]) -> List[_CycleJob]:
+            # Single worker: the sync repository's SQLAlchemy session is not thread-safe.
+            # One transaction per batch; if it fails, every entry of the batch is reported as failed
+            await self.change_detector.persist_many([job.detection for job in batch])
+            return batch
+        
+        async def notify(job: _CycleJob) -> None:
+            await asyncio.to_thread(self.change_detector.notify, job.detection)
+            finish(job, job.detection.result)
+        
+        def on_error(stage: str, job: _CycleJob, error: Exception) -> None:
+            logger.error(f"❌ Error processing {job.url} ({stage}): {error}")
+            finish(job, {'url': job.url, 'has_changes': False, 'error': str(error)})
+        
+        # Without an analyzer there is nothing to batch, so the stage does not wait
+        ai_batch_size = self.config.AI_BATCH_SIZE if self.ai_analyzer else 1
+        pipeline = StagedPipeline(
+            [
+                Stage('fetch', fetch, workers=max_concurrent),
+                Stage('process', process, workers=self.config.PIPELINE_PROCESS_WORKERS),
+                Stage(
+                    'analyze', analyze_batch if ai_batch_size > 1 else analyze,
+                    workers=self.config.PIPELINE_AI_WORKERS,
+                    batch_size=ai_batch_size,
+                    batch_wait=self.config.AI_BATCH_WAIT
+                ),
+                Stage(
+                    'persist', persist, workers=1,
+                    batch_size=self.config.SNAPSHOT_WRITE_BATCH_SIZE,
+                    batch_wait=self.config.SNAPSHOT_WRITE_BATCH_WAIT
+                ),
+                Stage('notify', notify, workers=self.config.PIPELINE_NOTIFY_WORKERS),
+            ],
+            queue_size=self.config.PIPELINE_QUEUE_SIZE,
+            on_error=on_error,
+            stats_interval=self.config.PIPELINE_STATS_INTERVAL
+        )
+        try:
+            await pipeline.run(scheduler.dispatch(jobs, lambda job: job.url))
+        finally:
+            self._finish_cycle()
+        
+        return [r for r in results if r is not None]
     
-    def send_weekly_digest(self):
-        """Sends weekly digest"""
+    async def find_duplicate_pages(self, max_distance: Optional[int] = None) -> List[Tuple[str, str, int]]:
+        """
+        Tracked URLs whose latest snapshots are near-duplicates (SimHash distance <= max_distance).
+        Reads only the stored fingerprints, no page content.
+        """
+        if max_distance is None:
+            max_distance = self.config.SIMHASH_DUPLICATE_DISTANCE
+        stored = await resolve(self.repository.get_latest_fingerprints())
+        fingerprints = {url: from_hex(value) for url, value in stored.items()}
+        duplicates = find_near_duplicates(
+            {url: fp for url, fp in fingerprints.items() if fp is not None}, max_distance
+        )
+        for a, b, distance in duplicates:
+            logger.info(f"🔁 Near-duplicate pages ({distance} bits): {a} ~ {b}")
+        return duplicates
+
+    async def send_weekly_digest(self):
+        """Sends weekly digest (awaited on the watcher's loop: the async repository's engine is bound to it)"""
         logger.info("📊 Generating weekly digest...")
         
-        snapshots = self.repository.get_with_changes(days=self.config.CHECK_INTERVAL_DAYS)
+        snapshots = await resolve(self.repository.get_with_changes(days=self.config.CHECK_INTERVAL_DAYS))
         
         changes = []
         for snapshot in snapshots:
@@ -350,7 +654,11 @@ class APIWatcher:
     async def cleanup(self):
         """Cleanup resources"""
         await self.fetcher.close()
-        self.repository.close()
+        if isinstance(self.ai_analyzer, AsyncOpenRouterAnalyzer):
+            await self.ai_analyzer.close()
+        await close_http_pool()
+        self.compute_pool.shutdown()
+        await resolve(self.repository.close())
 
 
 async def main():